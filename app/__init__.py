@@ -7,8 +7,10 @@ from flask_wtf.csrf import CSRFProtect
 import logging
 from dotenv import load_dotenv
 from flask_cors import CORS
+from app import assets, metrics
+from app.database import RoutingSession, configure_engine, create_replica_engines, engine_options
 
-db = SQLAlchemy()
+db = SQLAlchemy(session_options={'class_': RoutingSession})
 login_manager = LoginManager()
 migrate = Migrate()
 csrf = CSRFProtect()
@@ -17,7 +19,7 @@ load_dotenv()
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-def create_app():
+def create_app(test_config=None):
     app = Flask(__name__, static_folder='static', static_url_path='/static')
 
     instance_path = os.path.join(app.root_path, 'instance')
@@ -35,14 +37,28 @@ def create_app():
         raise ImportError(f"Failed to load configuration: {e}")
     except AttributeError as e:
         raise ValueError(f"Configuration error: {e}. Ensure Config class has required attributes.")
+    if test_config:
+        app.config.update(test_config)
+    # Pool settings for server databases; explicit SQLALCHEMY_ENGINE_OPTIONS still win
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = {
+        **engine_options(app.config['SQLALCHEMY_DATABASE_URI'], app.config),
+        **app.config.get('SQLALCHEMY_ENGINE_OPTIONS', {}),
+    }
 
     try:
         db.init_app(app)
+        with app.app_context():
+            for engine in db.engines.values():
+                configure_engine(engine, app.config)
+        # Views decorated with @read_only spread their reads across these
+        app.extensions['replica_engines'] = create_replica_engines(app.config)
         login_manager.init_app(app)
         login_manager.login_view = 'main.login_page'
         login_manager.session_protection = 'strong'
         csrf.init_app(app)
         migrate.init_app(app, db)
+        assets.init_app(app)
+        metrics.init_app(app)
         CORS(app, supports_credentials=True)
         app.config['SESSION_COOKIE_SECURE'] = False  # Set to True in production with HTTPS
         app.config['SESSION_COOKIE_HTTPONLY'] = True
@@ -55,6 +71,9 @@ def create_app():
     from app.routes import main as main_blueprint
     app.register_blueprint(main_blueprint)
 
+    from app.commands import register_commands
+    register_commands(app)
+
     @login_manager.user_loader
     def load_user(user_id):
         logger.debug(f"Loading user with ID: {user_id}")
@@ -0,0 +1,155 @@
+import gzip
+import hashlib
+import mimetypes
+import os
+import re
+
+from flask import current_app, request, url_for
+
+try:
+    import brotli
+except ImportError:  # Optional; gzip alone still covers every browser
+    brotli = None
+
+try:
+    from PIL import Image
+except ImportError:  # Optional; only needed by `flask optimize-images`
+    Image = None
+
+# Fingerprinted URLs never change content, so browsers and CDNs may keep them for a year
+IMMUTABLE_MAX_AGE = 365 * 24 * 3600
+# Text assets worth compressing; images and fonts are compressed already
+COMPRESSIBLE_TYPES = ('text/css', 'text/javascript', 'application/javascript', 'image/svg+xml', 'image/x-icon',
+                      'image/vnd.microsoft.icon')
+MIN_COMPRESS_BYTES = 1024
+# Uploads are named after their SHA-256 (see app.uploads) and are immutable by construction
+HASHED_UPLOAD = re.compile(r'^uploads/[0-9a-f]{64}(-\w+)?\.\w+$')
+# Widths written by `flask optimize-images`, e.g. images/handyverse-hero-420.webp;
+# the hero is shown at most 420 CSS pixels wide, so these cover 1x-3x screens
+RESPONSIVE_WIDTHS = (420, 840, 1260)
+
+
+class Asset:
+    def __init__(self, path, digest, mimetype):
+        self.path = path
+        self.digest = digest
+        self.mimetype = mimetype
+        # Content-Encoding -> precompressed body
+        self.encodings = {}
+
+
+class AssetManifest:
+    """Content hashes of every file under the static folder, computed at startup.
+
+    ``url_for('static', filename=...)`` gets a ``?v=<hash>`` fingerprint for
+    files in the manifest, and requests carrying the current fingerprint are
+    served with a one-year ``immutable`` Cache-Control. A deploy changes the
+    hash of every edited file, so clients fetch it again without anyone
+    bumping version numbers by hand. Compressible text assets are gzipped
+    (and brotli-compressed when the ``brotli`` package is installed) once,
+    here, instead of on every request.
+    """
+
+    def __init__(self, static_folder, skip_dirs=('uploads',)):
+        self.static_folder = static_folder
+        self.assets = {}
+        for root, dirs, files in os.walk(static_folder):
+            dirs[:] = [d for d in dirs if not d.startswith('.') and
+                       os.path.relpath(os.path.join(root, d), static_folder) not in skip_dirs]
+            for name in files:
+                if name.startswith('.'):
+                    continue
+                path = os.path.join(root, name)
+                self.assets[os.path.relpath(path, static_folder).replace(os.sep, '/')] = self._load(path)
+
+    def _load(self, path):
+        with open(path, 'rb') as f:
+            data = f.read()
+        mimetype = mimetypes.guess_type(path)[0] or 'application/octet-stream'
+        asset = Asset(path, hashlib.sha256(data).hexdigest()[:12], mimetype)
+        if mimetype in COMPRESSIBLE_TYPES and len(data) >= MIN_COMPRESS_BYTES:
+            asset.encodings['gzip'] = gzip.compress(data, compresslevel=9, mtime=0)
+            if brotli is not None:
+                asset.encodings['br'] = brotli.compress(data)
+        return asset
+
+    def fingerprint(self, filename):
+        asset = self.assets.get(filename)
+        return asset.digest if asset else None
+
+    def srcset(self, filename):
+        """Return a srcset of the resized WebP copies of an image, or '' if it has none."""
+        stem = os.path.splitext(filename)[0]
+        candidates = []
+        for width in RESPONSIVE_WIDTHS:
+            variant = f'{stem}-{width}.webp'
+            if variant in self.assets:
+                candidates.append(f"{url_for('static', filename=variant)} {width}w")
+        return ', '.join(candidates)
+
+
+def get_manifest():
+    return current_app.extensions['asset_manifest']
+
+
+def _add_fingerprint(endpoint, values):
+    if endpoint == 'static' and 'v' not in values:
+        digest = get_manifest().fingerprint(values.get('filename'))
+        if digest:
+            values['v'] = digest
+
+
+def _preferred_encoding(asset):
+    accepted = request.accept_encodings
+    for encoding in ('br', 'gzip'):
+        if encoding in asset.encodings and accepted[encoding]:
+            return encoding
+    return None
+
+
+def serve_static(filename):
+    """Flask's static view, plus fingerprint-aware caching and precompressed bodies."""
+    asset = get_manifest().assets.get(filename)
+    encoding = _preferred_encoding(asset) if asset else None
+    if encoding:
+        response = current_app.response_class(asset.encodings[encoding], mimetype=asset.mimetype)
+        response.headers['Content-Encoding'] = encoding
+        response.set_etag(f'{asset.digest}-{encoding}')
+    else:
+        response = current_app.send_static_file(filename)
+    if asset and asset.encodings:
+        response.vary.add('Accept-Encoding')
+    if (asset and request.args.get('v') == asset.digest) or HASHED_UPLOAD.match(filename):
+        response.cache_control.public = True
+        response.cache_control.max_age = IMMUTABLE_MAX_AGE
+        response.cache_control.immutable = True
+    return response.make_conditional(request)
+
+
+def init_app(app):
+    if not app.static_folder or not os.path.isdir(app.static_folder):
+        return
+    app.extensions['asset_manifest'] = AssetManifest(app.static_folder)
+    app.url_defaults(_add_fingerprint)
+    app.view_functions['static'] = serve_static
+    app.jinja_env.globals['asset_srcset'] = lambda filename: get_manifest().srcset(filename)
+
+
+def resize_image(path, widths=RESPONSIVE_WIDTHS, quality=80):
+    """Write ``<stem>-<width>.webp`` copies of an image; returns the paths written.
+
+    Widths at or above the original's are skipped; upscaling only adds bytes.
+    """
+    if Image is None:
+        raise RuntimeError("Resizing images requires the 'Pillow' package")
+    written = []
+    with Image.open(path) as image:
+        image = image.convert('RGBA' if image.mode in ('RGBA', 'LA', 'P') else 'RGB')
+        for width in widths:
+            if width >= image.width:
+                continue
+            height = round(image.height * width / image.width)
+            target = f'{os.path.splitext(path)[0]}-{width}.webp'
+            image.resize((width, height), Image.LANCZOS).save(target, 'WEBP', quality=quality, method=6)
+            written.append(target)
+    return written
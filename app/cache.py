@@ -0,0 +1,260 @@
+import functools
+import hashlib
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict
+
+from flask import current_app, g, has_app_context, request, session as client_session
+from flask_login import current_user
+from flask_wtf.csrf import generate_csrf
+
+from app import db
+from app.database import use_primary
+
+try:
+    import redis
+except ImportError:  # Optional; only needed when RESPONSE_CACHE_URL points at Redis
+    redis = None
+
+logger = logging.getLogger(__name__)
+
+# Session.info key collecting the cache tags touched by the current transaction
+CHANGED_TAGS_KEY = 'changed_cache_tags'
+# Stands in for the per-session CSRF token in cached HTML; swapped back on every hit
+CSRF_PLACEHOLDER = '__cached_csrf_token__'
+# Only these User columns appear in cached responses; other user updates (logins,
+# password rehashes) must not flush the cache
+USER_CACHED_COLUMNS = ('name', 'profile_pic', 'profile_pic_thumb')
+
+
+class MemoryCache:
+    """In-process LRU cache with per-entry expiry.
+
+    Invalidation works by tag generations: each cached key embeds the current
+    generation of the tags it depends on, so bumping a tag orphans every
+    entry built from it and LRU eviction reclaims them. The cache is per
+    process; other workers only see each other's writes once their entries
+    expire, so keep the TTL short or use ``RedisCache`` with several workers.
+    """
+
+    def __init__(self, max_entries=1000):
+        self._max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._generations = {}
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            value, expires = entry
+            if expires <= time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl):
+        with self._lock:
+            self._entries[key] = (value, time.monotonic() + ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self._max_entries:
+                self._entries.popitem(last=False)
+
+    def generations(self, tags):
+        with self._lock:
+            return [self._generations.get(tag, 0) for tag in tags]
+
+    def invalidate(self, *tags):
+        with self._lock:
+            for tag in tags:
+                self._generations[tag] = self._generations.get(tag, 0) + 1
+
+
+class RedisCache:
+    """Cache shared by every worker, on Redis or any server speaking its protocol.
+
+    Tag generations are Redis counters, so an invalidation in one process is
+    seen by all of them. Connection errors are logged and treated as misses;
+    the cache never takes a page down with it.
+    """
+
+    def __init__(self, client, prefix='handyverse:cache:'):
+        self._client = client
+        self._prefix = prefix
+
+    @classmethod
+    def from_url(cls, url, **kwargs):
+        if redis is None:
+            raise RuntimeError("RESPONSE_CACHE_URL is a Redis URL but the 'redis' package is not installed")
+        return cls(redis.Redis.from_url(url), **kwargs)
+
+    def get(self, key):
+        try:
+            value = self._client.get(self._prefix + key)
+        except redis.RedisError as e:
+            logger.warning(f"Response cache read failed: {str(e)}")
+            return None
+        return json.loads(value) if value is not None else None
+
+    def set(self, key, value, ttl):
+        try:
+            self._client.setex(self._prefix + key, max(int(ttl), 1), json.dumps(value))
+        except redis.RedisError as e:
+            logger.warning(f"Response cache write failed: {str(e)}")
+
+    def generations(self, tags):
+        if not tags:
+            return []
+        try:
+            values = self._client.mget([f'{self._prefix}gen:{tag}' for tag in tags])
+        except redis.RedisError as e:
+            logger.warning(f"Response cache read failed: {str(e)}")
+            return None
+        return [int(value or 0) for value in values]
+
+    def invalidate(self, *tags):
+        try:
+            for tag in tags:
+                self._client.incr(f'{self._prefix}gen:{tag}')
+        except redis.RedisError as e:
+            logger.error(f"Response cache invalidation failed: {str(e)}")
+
+
+def response_cache():
+    """Return the current app's response cache, creating it on first use."""
+    if 'response_cache' not in current_app.extensions:
+        url = current_app.config.get('RESPONSE_CACHE_URL')
+        if url:
+            cache = RedisCache.from_url(url)
+        else:
+            cache = MemoryCache(max_entries=current_app.config.get('RESPONSE_CACHE_MAX_ENTRIES', 1000))
+        current_app.extensions['response_cache'] = cache
+    return current_app.extensions['response_cache']
+
+
+def _cache_key(tags, generations):
+    query = '&'.join(f'{name}={value}' for name, value in sorted(request.args.items(multi=True)))
+    versions = '.'.join(f'{tag}{generation}' for tag, generation in zip(tags, generations))
+    digest = hashlib.sha1(f'{request.path}?{query}'.encode()).hexdigest()
+    return f'view:{request.endpoint}:{versions}:{digest}'
+
+
+def _entry_from_response(response):
+    body = response.get_data(as_text=True)
+    token = g.get(current_app.config.get('WTF_CSRF_FIELD_NAME', 'csrf_token'))
+    if token:
+        body = body.replace(token, CSRF_PLACEHOLDER)
+    return {
+        'body': body,
+        'headers': [
+            (name, value) for name, value in response.headers.items()
+            if name.lower() not in ('content-length', 'set-cookie', 'vary')
+        ],
+        'etag': hashlib.sha1(body.encode()).hexdigest(),
+        'last_modified': time.time(),
+    }
+
+
+def _response_from_entry(entry):
+    body = entry['body']
+    if CSRF_PLACEHOLDER in body:
+        body = body.replace(CSRF_PLACEHOLDER, generate_csrf())
+    return current_app.response_class(body, headers=entry['headers'])
+
+
+def cached(*tags, ttl=None, anonymous_only=False):
+    """Cache a GET view's response, keyed by path and query string.
+
+    ``tags`` name the tables the response is built from (see ``CACHED_TABLES``);
+    committing a change to any of them invalidates it. Responses carry a
+    weak ETag and Last-Modified, and conditional requests get a 304.
+
+    ``anonymous_only`` views render per-user markup, so they are cached only
+    for anonymous visitors and marked private. Their CSRF token is swapped
+    out before storing and a fresh one for the visitor's session put back on
+    every hit; hence the weak ETag.
+
+    Misses render from the primary even in ``read_only`` views, so a fill
+    right after an invalidation cannot store a replica's stale rows.
+    """
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapper(*args, **kwargs):
+            if not _cacheable(anonymous_only):
+                return view(*args, **kwargs)
+            cache = response_cache()
+            generations = cache.generations(tags)
+            if generations is None:
+                return view(*args, **kwargs)
+            key = _cache_key(tags, generations)
+            entry = cache.get(key)
+            if entry is None:
+                # A lagging replica would be cached under the new generation for the whole TTL
+                use_primary()
+                response = current_app.make_response(view(*args, **kwargs))
+                if response.status_code != 200 or response.is_streamed:
+                    return response
+                entry = _entry_from_response(response)
+                cache.set(key, entry, ttl or current_app.config.get('RESPONSE_CACHE_TTL', 60))
+            response = _response_from_entry(entry)
+            response.set_etag(entry['etag'], weak=True)
+            response.last_modified = entry['last_modified']
+            if anonymous_only:
+                response.cache_control.private = True
+                response.vary.add('Cookie')
+            else:
+                response.cache_control.public = True
+            response.cache_control.no_cache = True
+            return response.make_conditional(request)
+        return wrapper
+    return decorator
+
+
+def _cacheable(anonymous_only):
+    if request.method not in ('GET', 'HEAD') or current_app.config.get('RESPONSE_CACHE_TTL', 60) <= 0:
+        return False
+    if anonymous_only and current_user.is_authenticated:
+        return False
+    # A page rendered with flashed messages consumes them; never cache or replay it
+    return '_flashes' not in client_session
+
+
+# --- invalidation ---
+
+# Table name -> tag of every model whose rows appear in cached responses
+CACHED_TABLES = ('artisan', 'review', 'job_post', 'user')
+
+
+def _changed_tag(obj):
+    table = getattr(obj, '__tablename__', None)
+    if table not in CACHED_TABLES:
+        return None
+    if table == 'user':
+        # New users show up through their reviews, artisan profile or jobs, which carry their own tags
+        state = db.inspect(obj)
+        if state.pending or not any(state.attrs[name].history.has_changes() for name in USER_CACHED_COLUMNS):
+            return None
+    return table
+
+
+@db.event.listens_for(db.session, 'after_flush')
+def _collect_changed_tags(session, flush_context):
+    tags = {_changed_tag(obj) for obj in (*session.new, *session.dirty, *session.deleted)} - {None}
+    if tags:
+        session.info.setdefault(CHANGED_TAGS_KEY, set()).update(tags)
+
+
+@db.event.listens_for(db.session, 'after_commit')
+def _invalidate_changed_tags(session):
+    tags = session.info.pop(CHANGED_TAGS_KEY, None)
+    if tags and has_app_context():
+        response_cache().invalidate(*tags)
+
+
+@db.event.listens_for(db.session, 'after_rollback')
+def _discard_changed_tags(session):
+    session.info.pop(CHANGED_TAGS_KEY, None)
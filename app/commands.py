@@ -0,0 +1,282 @@
+import contextlib
+import os
+import time
+from datetime import datetime, timedelta
+
+import click
+
+from app import db
+
+# Batches report at most this often, so small batches do not flood the terminal
+PROGRESS_INTERVAL = 2.0
+
+
+class BatchProgress:
+    """Echo rows processed, throughput and the id to resume from as a batch job runs."""
+
+    def __init__(self, label, total=None, unit='rows'):
+        self.label = label
+        self.total = total
+        self.unit = unit
+        self.done = 0
+        self.last_id = None
+        self._start = self._reported = time.monotonic()
+
+    def update(self, count, last_id=None):
+        self.done += count
+        if last_id is not None:
+            self.last_id = last_id
+        now = time.monotonic()
+        if now - self._reported >= PROGRESS_INTERVAL:
+            self._reported = now
+            click.echo(self._line(now))
+
+    def finish(self, summary=None):
+        line = self._line(time.monotonic())
+        click.echo(f'{line}; {summary}.' if summary else f'{line}.')
+
+    def _line(self, now):
+        rate = self.done / max(now - self._start, 1e-6)
+        done = f'{self.done}/{self.total}' if self.total is not None else str(self.done)
+        line = f'{self.label}: {done} {self.unit}, {rate:.0f} {self.unit}/s'
+        return f'{line}, last id {self.last_id}' if self.last_id is not None else line
+
+
+def _count(model, *criteria):
+    return db.session.execute(db.select(db.func.count(model.id)).where(*criteria)).scalar()
+
+
+def _keyset_batches(query, id_column, batch_size, after_id=0):
+    """Yield ``(ids, rows)`` for ``query`` in ascending id batches.
+
+    Each batch is its own short query instead of one long-lived server-side
+    cursor, so the caller can commit between batches and restart from the
+    last id it reported.
+    """
+    while True:
+        rows = db.session.execute(
+            query.where(id_column > after_id).order_by(id_column).limit(batch_size)
+        ).all()
+        if not rows:
+            return
+        ids = [row[0] for row in rows]
+        yield ids, rows
+        after_id = ids[-1]
+
+
+def register_commands(app):
+    @app.cli.command('backfill-conversations')
+    @click.option('--batch-size', default=1000, show_default=True, help='Messages read per batch.')
+    def backfill_conversations(batch_size):
+        """Rebuild the conversation summary table from existing messages."""
+        from app.models import Conversation, Message
+
+        latest = {}
+        rows = db.session.execute(
+            db.select(Message.id, Message.sender_id, Message.recipient_id, Message.content, Message.timestamp)
+            .order_by(Message.id.asc())
+            .execution_options(yield_per=batch_size)
+        )
+        for row in rows:
+            latest[Conversation.pair(row.sender_id, row.recipient_id)] = row
+
+        # Unread state was never tracked per message, so backfilled rows start as read
+        db.session.execute(db.delete(Conversation))
+        pairs = list(latest.items())
+        for start in range(0, len(pairs), batch_size):
+            db.session.execute(db.insert(Conversation), [
+                {
+                    'user_a_id': user_a,
+                    'user_b_id': user_b,
+                    'last_message_id': row.id,
+                    'last_message_snippet': (row.content or '')[:Conversation.SNIPPET_LENGTH],
+                    'last_message_at': row.timestamp,
+                    'unread_a': 0,
+                    'unread_b': 0,
+                }
+                for (user_a, user_b), row in pairs[start:start + batch_size]
+            ])
+        db.session.commit()
+        click.echo(f'Rebuilt {len(pairs)} conversations.')
+
+    @app.cli.command('recount-ratings')
+    def recount_ratings():
+        """Recompute every artisan's rating totals from the review table."""
+        from app.cache import response_cache
+        from app.models import Artisan, Review
+
+        reviews = db.select(Review).where(Review.artisan_id == Artisan.id)
+        db.session.execute(
+            db.update(Artisan).values(
+                rating_sum=reviews.with_only_columns(db.func.coalesce(db.func.sum(Review.rating), 0)).scalar_subquery(),
+                rating_count=reviews.with_only_columns(db.func.count(Review.id)).scalar_subquery()
+            )
+        )
+        db.session.commit()
+        # Bulk UPDATEs bypass the session's change tracking; only a shared cache reaches the workers
+        response_cache().invalidate('artisan')
+        click.echo('Rating totals recomputed.')
+
+    @app.cli.command('rebuild-search-index')
+    @click.option('--batch-size', default=1000, show_default=True, help='Rows indexed per batch.')
+    def rebuild_search_index(batch_size):
+        """Re-index every artisan and job post for full-text search."""
+        from app.search import SEARCH_INDEXES
+
+        connection = db.session.connection()
+        for index in SEARCH_INDEXES:
+            index.create(connection)
+            click.echo(f'{index.table}: indexed {index.rebuild(connection, batch_size=batch_size)} rows.')
+        db.session.commit()
+
+    @app.cli.command('geocode-locations')
+    @click.option('--batch-size', default=1000, show_default=True, help='Rows resolved per batch.')
+    @click.option('--table', 'tables', multiple=True, type=click.Choice(['user', 'artisan', 'job_post']),
+                  help='Only these tables (default: all).')
+    @click.option('--after-id', default=0, show_default=True, help='Resume after this id.')
+    def geocode_locations(batch_size, tables, after_id):
+        """Fill in missing coordinates from location text using the offline gazetteer."""
+        from app.cache import response_cache
+        from app.geocode import geocoder
+        from app.models import Artisan, JobPost, User
+
+        resolve = geocoder().resolve
+        for model in (User, Artisan, JobPost):
+            if tables and model.__tablename__ not in tables:
+                continue
+            missing = (model.latitude.is_(None), model.location.isnot(None))
+            progress = BatchProgress(model.__tablename__, _count(model, *missing, model.id > after_id))
+            unknown = 0
+            for ids, rows in _keyset_batches(
+                db.select(model.id, model.location).where(*missing), model.id, batch_size, after_id
+            ):
+                updates = []
+                for row in rows:
+                    point = resolve(row.location)
+                    if point is None:
+                        unknown += 1
+                        continue
+                    updates.append({'id': row.id, 'latitude': point[0], 'longitude': point[1]})
+                # Bulk UPDATE by primary key, sent as one executemany
+                if updates:
+                    db.session.execute(db.update(model), updates)
+                db.session.commit()
+                progress.update(len(rows), ids[-1])
+            progress.finish(f'{unknown} unknown locations')
+        response_cache().invalidate('artisan', 'job_post')
+
+    @app.cli.command('purge-notifications')
+    @click.option('--days', default=90, show_default=True, help='Delete read notifications older than this.')
+    @click.option('--include-unread', is_flag=True, help='Delete unread notifications past the cutoff too.')
+    @click.option('--batch-size', default=5000, show_default=True, help='Rows deleted per transaction.')
+    @click.option('--after-id', default=0, show_default=True, help='Resume after this id.')
+    def purge_notifications(days, include_unread, batch_size, after_id):
+        """Delete old notifications in short transactions."""
+        from app.models import Notification
+        from app.notifications import unread_counter
+
+        expired = [Notification.timestamp < datetime.utcnow() - timedelta(days=days)]
+        if not include_unread:
+            expired.append(Notification.is_read == True)  # noqa: E712
+        progress = BatchProgress('notification', _count(Notification, *expired, Notification.id > after_id))
+        for ids, rows in _keyset_batches(
+            db.select(Notification.id, Notification.user_id).where(*expired), Notification.id, batch_size, after_id
+        ):
+            db.session.execute(db.delete(Notification).where(Notification.id.in_(ids)))
+            db.session.commit()
+            if include_unread:
+                unread_counter().invalidate(*{row.user_id for row in rows})
+            progress.update(len(ids), ids[-1])
+        progress.finish()
+
+    @app.cli.command('archive-messages')
+    @click.option('--days', default=365, show_default=True, help='Archive messages older than this.')
+    @click.option('--batch-size', default=2000, show_default=True, help='Messages moved per transaction.')
+    @click.option('--before-id', type=int, help='Resume below this id.')
+    def archive_messages(days, batch_size, before_id):
+        """Move old messages into message_archive.
+
+        Newest first, so replies leave before their parents. Messages that
+        are still a conversation's latest message, or that have live
+        replies, stay where they are. Chat history pages read the archive
+        too, so archived messages remain visible under "load older".
+        """
+        from app.models import Conversation, Message, MessageArchive
+
+        reply = db.aliased(Message)
+        archivable = (
+            Message.timestamp < datetime.utcnow() - timedelta(days=days),
+            ~db.select(Conversation.id).where(Conversation.last_message_id == Message.id).exists(),
+            ~db.select(reply.id).where(reply.parent_id == Message.id).exists(),
+        )
+        below = [Message.id < before_id] if before_id else []
+        # No total: parents only become archivable once their replies have gone
+        progress = BatchProgress('message')
+        columns = ['id', 'sender_id', 'recipient_id', 'content', 'timestamp', 'parent_id']
+        while True:
+            ids = db.session.execute(
+                db.select(Message.id).where(*archivable, *below).order_by(Message.id.desc()).limit(batch_size)
+            ).scalars().all()
+            if not ids:
+                break
+            # Copy and delete in one transaction so a failure leaves each message in exactly one table
+            db.session.execute(db.insert(MessageArchive).from_select(
+                columns, db.select(*(getattr(Message, column) for column in columns)).where(Message.id.in_(ids))
+            ))
+            db.session.execute(db.delete(Message).where(Message.id.in_(ids)))
+            db.session.commit()
+            below = [Message.id < ids[-1]]
+            progress.update(len(ids), ids[-1])
+        progress.finish()
+
+    @app.cli.command('cleanup-uploads')
+    @click.option('--grace-minutes', default=60, show_default=True,
+                  help='Keep files modified this recently; their upload may not have committed yet.')
+    @click.option('--dry-run', is_flag=True, help='List orphaned files without deleting them.')
+    @click.option('--batch-size', default=5000, show_default=True, help='Rows read per round trip.')
+    @click.option('--path', 'upload_path', type=click.Path(file_okay=False),
+                  help='Upload directory (default: static/uploads).')
+    def cleanup_uploads(grace_minutes, dry_run, batch_size, upload_path):
+        """Delete uploaded files that no user's profile picture refers to."""
+        from app.models import User
+
+        upload_path = upload_path or os.path.join(app.root_path, 'static', 'uploads')
+        referenced = set()
+        rows = db.session.execute(
+            db.select(User.profile_pic, User.profile_pic_thumb)
+            .where(db.or_(User.profile_pic.isnot(None), User.profile_pic_thumb.isnot(None)))
+            .execution_options(yield_per=batch_size)
+        )
+        for row in rows:
+            referenced.update(os.path.basename(path.split('?', 1)[0]) for path in row if path)
+
+        cutoff = time.time() - grace_minutes * 60
+        progress = BatchProgress('uploads', unit='files')
+        removed = freed = 0
+        with os.scandir(upload_path) if os.path.isdir(upload_path) else contextlib.nullcontext(()) as entries:
+            for entry in entries:
+                progress.update(1)
+                if not entry.is_file() or entry.name in referenced or entry.stat().st_mtime > cutoff:
+                    continue
+                size = entry.stat().st_size
+                if dry_run:
+                    click.echo(f'Would remove {entry.name} ({size // 1024} KB).')
+                else:
+                    os.remove(entry.path)
+                removed += 1
+                freed += size
+        progress.finish(f'{"would remove" if dry_run else "removed"} {removed} files, {freed // 1024} KB')
+
+    @app.cli.command('optimize-images')
+    @click.argument('filenames', nargs=-1)
+    def optimize_images(filenames):
+        """Write resized WebP copies of static images for responsive srcsets.
+
+        FILENAMES are relative to the static folder and default to the hero image.
+        The copies are picked up by the asset manifest on the next start.
+        """
+        from app.assets import resize_image
+
+        for filename in filenames or ('images/handyverse-hero.png',):
+            for path in resize_image(os.path.join(app.static_folder, filename)):
+                click.echo(f'Wrote {os.path.relpath(path, app.static_folder)} ({os.path.getsize(path) // 1024} KB).')
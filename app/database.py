@@ -0,0 +1,131 @@
+import functools
+import random
+import time
+
+from flask import current_app, g, has_request_context, session as client_session
+from flask_sqlalchemy.session import Session
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import make_url
+
+# Client session key holding the time until which reads stay on the primary
+PRIMARY_PIN_KEY = '_primary_until'
+
+
+def is_sqlite_file(url):
+    url = make_url(url)
+    return url.get_backend_name() == 'sqlite' and url.database not in (None, '', ':memory:')
+
+
+def engine_options(url, config):
+    """Return SQLAlchemy engine options for a database URL.
+
+    Server databases get a tuned connection pool. SQLite keeps SQLAlchemy's
+    own pool choice (a static pool for in-memory databases cannot take pool
+    sizing) and is tuned with pragmas instead, see ``configure_engine``.
+    """
+    if make_url(url).get_backend_name() == 'sqlite':
+        return {}
+    return {
+        'pool_size': config['DB_POOL_SIZE'],
+        'max_overflow': config['DB_MAX_OVERFLOW'],
+        'pool_timeout': config['DB_POOL_TIMEOUT'],
+        'pool_recycle': config['DB_POOL_RECYCLE'],
+        'pool_pre_ping': config['DB_POOL_PRE_PING'],
+    }
+
+
+def sqlite_pragmas(config):
+    return [
+        # WAL lets readers keep reading while a writer commits
+        ('journal_mode', config['SQLITE_JOURNAL_MODE']),
+        # NORMAL only syncs at checkpoints in WAL mode; still safe against corruption
+        ('synchronous', config['SQLITE_SYNCHRONOUS']),
+        # Wait for a competing writer instead of failing with "database is locked"
+        ('busy_timeout', config['SQLITE_BUSY_TIMEOUT_MS']),
+        # Negative cache_size is in KiB rather than pages
+        ('cache_size', -config['SQLITE_CACHE_SIZE_KB']),
+        ('mmap_size', config['SQLITE_MMAP_SIZE']),
+        ('temp_store', 'MEMORY'),
+    ]
+
+
+def configure_engine(engine, config):
+    """Apply per-connection pragmas to a file-backed SQLite engine."""
+    if engine.dialect.name != 'sqlite' or not is_sqlite_file(engine.url):
+        return
+    pragmas = sqlite_pragmas(config)
+
+    @event.listens_for(engine, 'connect')
+    def _set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for name, value in pragmas:
+                cursor.execute(f'PRAGMA {name}={value}')
+        finally:
+            cursor.close()
+
+
+def create_replica_engines(config):
+    """Create an engine per configured read replica, set up like the primary.
+
+    These are kept out of SQLALCHEMY_BINDS: Flask-SQLAlchemy would treat each
+    bind as a schema to create and drop, and replicas only mirror the primary.
+    """
+    engines = []
+    for url in config.get('SQLALCHEMY_REPLICA_URIS') or []:
+        engine = create_engine(url, **engine_options(url, config))
+        configure_engine(engine, config)
+        engines.append(engine)
+    return engines
+
+
+def use_primary():
+    """Keep this request's reads on the primary, even inside ``read_only`` views."""
+    g.use_primary = True
+
+
+def read_only(view):
+    """Serve a view's reads from a read replica when one is configured.
+
+    Clients that wrote within the last ``REPLICA_PIN_SECONDS`` stay on the
+    primary, so they always see their own writes despite replication lag.
+    So do requests that called ``use_primary()``.
+    """
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        replicas = current_app.extensions.get('replica_engines')
+        if replicas and not g.get('use_primary') and client_session.get(PRIMARY_PIN_KEY, 0) <= time.time():
+            g.replica_engine = random.choice(replicas)
+        return view(*args, **kwargs)
+    return wrapper
+
+
+class RoutingSession(Session):
+    """Session that sends reads in ``read_only`` views to the request's replica.
+
+    Flushes and any statement that is not a plain SELECT go to the primary
+    and pin the session there for the rest of the request, so a read-only
+    view that also writes (e.g. marking messages read) reads its own writes.
+    """
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and has_request_context():
+            # Core UPDATE/DELETEs outside read_only views (e.g. mark_read) must pin the client too
+            reads_only = not self._flushing and (clause is None or getattr(clause, 'is_select', False))
+            if not reads_only:
+                self.info['wrote'] = True
+            elif g.get('replica_engine') is not None and not self.info.get('wrote'):
+                return g.replica_engine
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+@event.listens_for(RoutingSession, 'after_flush')
+def _mark_session_wrote(session, flush_context):
+    session.info['wrote'] = True
+
+
+@event.listens_for(RoutingSession, 'after_commit')
+def _pin_client_to_primary(session):
+    # Keep this client's next reads on the primary until replicas have caught up
+    if session.info.get('wrote') and has_request_context() and current_app.config.get('SQLALCHEMY_REPLICA_URIS'):
+        client_session[PRIMARY_PIN_KEY] = time.time() + current_app.config.get('REPLICA_PIN_SECONDS', 5)
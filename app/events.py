@@ -0,0 +1,146 @@
+import json
+import logging
+import queue
+import threading
+import time
+from collections import defaultdict
+
+from flask import current_app
+
+try:
+    import redis
+except ImportError:  # Optional; only needed when EVENT_BROKER_URL points at Redis
+    redis = None
+
+logger = logging.getLogger(__name__)
+
+
+class EventBroker:
+    """In-process pub/sub delivering per-user events to connected clients.
+
+    Each open stream or long-poll request subscribes a bounded queue for its
+    user. Events are hints ("something new arrived"); clients re-sync through
+    the regular endpoints, so an event dropped for a slow consumer is only a
+    delay, never data loss. Events only reach subscribers in the publishing
+    process; use ``RedisEventBroker`` with several workers.
+    """
+
+    # Whether events published in one worker process reach streams held by the others
+    shared = False
+
+    def __init__(self, max_queue_size=100):
+        self._max_queue_size = max_queue_size
+        self._lock = threading.Lock()
+        self._subscribers = defaultdict(set)
+
+    def subscribe(self, user_id):
+        q = queue.Queue(maxsize=self._max_queue_size)
+        with self._lock:
+            self._subscribers[user_id].add(q)
+        return q
+
+    def unsubscribe(self, user_id, q):
+        with self._lock:
+            subscribers = self._subscribers.get(user_id)
+            if subscribers is not None:
+                subscribers.discard(q)
+                if not subscribers:
+                    del self._subscribers[user_id]
+
+    def publish(self, user_id, event, data):
+        return self._deliver(user_id, event, data)
+
+    def _deliver(self, user_id, event, data):
+        """Queue an event for this process's subscribers; returns how many there were."""
+        with self._lock:
+            subscribers = list(self._subscribers.get(user_id, ()))
+        for q in subscribers:
+            try:
+                q.put_nowait((event, data))
+            except queue.Full:
+                pass  # Slow consumer; it will catch up on its next re-sync
+        return len(subscribers)
+
+    def subscriber_count(self, user_id=None):
+        with self._lock:
+            if user_id is not None:
+                return len(self._subscribers.get(user_id, ()))
+            return sum(len(s) for s in self._subscribers.values())
+
+
+class RedisEventBroker(EventBroker):
+    """Event broker shared by every worker through a Redis pub/sub channel.
+
+    ``publish`` sends the event to the channel; each process runs one
+    listener thread, started with its first subscriber, that hands channel
+    events to its own queues. While Redis is unreachable events are only
+    delivered locally and the listener keeps reconnecting.
+    """
+
+    shared = True
+    RECONNECT_SECONDS = 1
+
+    def __init__(self, client, channel='handyverse:events', max_queue_size=100):
+        super().__init__(max_queue_size)
+        self._client = client
+        self._channel = channel
+        self._listener = None
+
+    @classmethod
+    def from_url(cls, url, **kwargs):
+        if redis is None:
+            raise RuntimeError("EVENT_BROKER_URL is a Redis URL but the 'redis' package is not installed")
+        return cls(redis.Redis.from_url(url), **kwargs)
+
+    def subscribe(self, user_id):
+        self._start_listener()
+        return super().subscribe(user_id)
+
+    def publish(self, user_id, event, data):
+        """Send an event to every process; returns how many processes received it."""
+        try:
+            return self._client.publish(self._channel, json.dumps([user_id, event, data]))
+        except redis.RedisError as e:
+            logger.warning(f"Event broker publish failed, delivering locally: {str(e)}")
+            return self._deliver(user_id, event, data)
+
+    def _start_listener(self):
+        # Started lazily so that it runs in the worker process, not in a pre-fork parent
+        with self._lock:
+            if self._listener is None or not self._listener.is_alive():
+                self._listener = threading.Thread(target=self._listen, name='event-broker', daemon=True)
+                self._listener.start()
+
+    def _listen(self):
+        while True:
+            pubsub = self._client.pubsub(ignore_subscribe_messages=True)
+            try:
+                pubsub.subscribe(self._channel)
+                for message in pubsub.listen():
+                    try:
+                        user_id, event, data = json.loads(message['data'])
+                    except (TypeError, ValueError):
+                        logger.warning(f"Ignoring malformed event on {self._channel}: {message['data']!r}")
+                        continue
+                    self._deliver(user_id, event, data)
+            except redis.RedisError as e:
+                logger.warning(f"Event broker connection lost, reconnecting: {str(e)}")
+                time.sleep(self.RECONNECT_SECONDS)
+            finally:
+                pubsub.close()
+
+
+def get_broker():
+    """Return the current app's event broker, creating it on first use."""
+    if 'event_broker' not in current_app.extensions:
+        url = current_app.config.get('EVENT_BROKER_URL')
+        current_app.extensions['event_broker'] = RedisEventBroker.from_url(url) if url else EventBroker()
+    return current_app.extensions['event_broker']
+
+
+def publish(user_id, event, data):
+    return get_broker().publish(user_id, event, data)
+
+
+def format_sse(event, data):
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
@@ -0,0 +1,72 @@
+import math
+from datetime import datetime
+
+from app import db
+from app.geo import haversine, job_index
+from app.models import JobPost
+from app.search import job_search
+
+# Jobs considered per source (nearby, per skill, or most recent)
+FEED_CANDIDATES = 500
+FEED_RADIUS_KM = 50
+# Distance at which the distance score has decayed to 1/e
+DISTANCE_SCALE_KM = 15
+# A job's recency score halves every RECENCY_HALF_LIFE_DAYS
+RECENCY_HALF_LIFE_DAYS = 7
+DISTANCE_WEIGHT = 0.4
+SKILL_WEIGHT = 0.4
+RECENCY_WEIGHT = 0.2
+
+
+def artisan_skills(skills):
+    """Split an artisan's comma-separated skills into individual trades."""
+    return [skill.strip() for skill in (skills or '').split(',') if skill.strip()]
+
+
+def rank_jobs(artisan, limit=20, now=None):
+    """Return ``[(job_id, score, distance_km or None), ...]`` best first for an artisan.
+
+    Candidates come from indexes only: jobs near the artisan from the job
+    coordinate index, and jobs matching each of their skills from the job
+    search index. Falls back to the most recent jobs when neither yields
+    anything (no coordinates, no matching skills). Each candidate is then
+    scored on distance, skill match and age; the weights add up to 1.
+    """
+    now = now or datetime.utcnow()
+    has_location = artisan.latitude is not None and artisan.longitude is not None
+    candidates = set()
+    if has_location:
+        candidates.update(job_id for job_id, _ in job_index().nearest(
+            artisan.latitude, artisan.longitude, radius_km=FEED_RADIUS_KM, limit=FEED_CANDIDATES
+        ))
+    connection = db.session.connection()
+    skilled = set()
+    for skill in artisan_skills(artisan.skills):
+        skilled.update(job_search.search(connection, skill, limit=FEED_CANDIDATES))
+    candidates |= skilled
+    if not candidates:
+        candidates.update(db.session.execute(
+            db.select(JobPost.id).order_by(JobPost.timestamp.desc(), JobPost.id.desc()).limit(FEED_CANDIDATES)
+        ).scalars())
+    if not candidates:
+        return []
+
+    rows = db.session.execute(
+        db.select(JobPost.id, JobPost.timestamp, JobPost.latitude, JobPost.longitude)
+        .where(JobPost.id.in_(candidates))
+    ).all()
+    ranked = []
+    for row in rows:
+        distance = None
+        score = 0.0
+        if has_location and row.latitude is not None and row.longitude is not None:
+            distance = haversine(artisan.latitude, artisan.longitude, row.latitude, row.longitude)
+            score += DISTANCE_WEIGHT * math.exp(-distance / DISTANCE_SCALE_KM)
+        if row.id in skilled:
+            score += SKILL_WEIGHT
+        if row.timestamp is not None:
+            age_days = max((now - row.timestamp).total_seconds(), 0) / 86400
+            score += RECENCY_WEIGHT * 0.5 ** (age_days / RECENCY_HALF_LIFE_DAYS)
+        ranked.append((row.id, score, distance))
+    ranked.sort(key=lambda item: (-item[1], -item[0]))
+    return ranked[:limit]
@@ -1,5 +1,5 @@
 from flask_wtf import FlaskForm
-from wtforms import StringField, TextAreaField, DecimalField, SubmitField
+from wtforms import StringField, TextAreaField, DecimalField, SubmitField, HiddenField
 from wtforms.validators import DataRequired, Optional, Length
 from flask_wtf.file import FileField, FileAllowed, FileRequired
 
@@ -23,4 +23,7 @@ class JobPostForm(FlaskForm):
     description = TextAreaField('Description', validators=[DataRequired(), Length(max=1000)])
     location = StringField('Location', validators=[Optional(), Length(max=100)])
     budget = StringField('Budget (₦)', validators=[Optional(), Length(max=20)])
+    # Filled in by the browser's geolocation; used to match the job with nearby artisans
+    latitude = HiddenField()
+    longitude = HiddenField()
     submit = SubmitField('Post Job')
\ No newline at end of file
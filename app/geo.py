@@ -0,0 +1,201 @@
+import math
+import threading
+import time
+
+import numpy as np
+from flask import current_app
+
+EARTH_RADIUS_KM = 6371
+
+# Size of one spatial grid cell in degrees (~28km of latitude). GeoIndex sorts
+# its rows by cell so radius searches only touch nearby rows.
+GRID_CELL_DEG = 0.25
+GRID_COLUMNS = int(360 / GRID_CELL_DEG)
+
+# Above this many cells a box query is no better than scanning every row
+MAX_QUERY_CELLS = 400
+
+
+def haversine(lat1, lon1, lat2, lon2):
+    """Great-circle distance in km between two points."""
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    dphi = math.radians(lat2 - lat1)
+    dlambda = math.radians(lon2 - lon1)
+    a = math.sin(dphi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(dlambda / 2) ** 2
+    return EARTH_RADIUS_KM * 2 * math.atan2(math.sqrt(a), math.sqrt(1 - a))
+
+
+def _row_col(lat, lng):
+    row = int(math.floor((min(max(lat, -90.0), 90.0) + 90) / GRID_CELL_DEG))
+    col = int(math.floor((min(max(lng, -180.0), 180.0) + 180) / GRID_CELL_DEG)) % GRID_COLUMNS
+    return row, col
+
+
+def grid_cell(lat, lng):
+    """Return the integer grid cell id for a coordinate, or None if unset."""
+    if lat is None or lng is None:
+        return None
+    row, col = _row_col(lat, lng)
+    return row * GRID_COLUMNS + col
+
+
+def bounding_box(lat, lng, radius_km):
+    """Return (min_lat, max_lat, min_lng, max_lng) enclosing a radius around a point."""
+    dlat = math.degrees(radius_km / EARTH_RADIUS_KM)
+    cos_lat = math.cos(math.radians(lat))
+    if cos_lat < 1e-6:
+        dlng = 180.0
+    else:
+        dlng = min(180.0, math.degrees(radius_km / (EARTH_RADIUS_KM * cos_lat)))
+    return (
+        max(lat - dlat, -90.0),
+        min(lat + dlat, 90.0),
+        max(lng - dlng, -180.0),
+        min(lng + dlng, 180.0),
+    )
+
+
+def cell_ranges_for_box(min_lat, max_lat, min_lng, max_lng):
+    """Return ``[(first_cell, last_cell), ...]`` per grid row covering a bounding box.
+
+    Cells within one grid row have consecutive ids, so each row is a single
+    range. Returns None when the box spans more than MAX_QUERY_CELLS cells.
+    """
+    min_row, min_col = _row_col(min_lat, min_lng)
+    max_row, max_col = _row_col(max_lat, max_lng)
+    if max_lng >= 180.0:
+        max_col = GRID_COLUMNS - 1
+    if (max_row - min_row + 1) * (max_col - min_col + 1) > MAX_QUERY_CELLS:
+        return None
+    return [
+        (row * GRID_COLUMNS + min_col, row * GRID_COLUMNS + max_col)
+        for row in range(min_row, max_row + 1)
+    ]
+
+
+
+def haversine_many(lat, lng, lats, lngs):
+    """Vectorized haversine from one point to arrays of points (all in degrees)."""
+    phi1 = math.radians(lat)
+    phi2 = np.radians(lats)
+    dphi = phi2 - phi1
+    dlambda = np.radians(lngs) - math.radians(lng)
+    a = np.sin(dphi / 2) ** 2 + math.cos(phi1) * np.cos(phi2) * np.sin(dlambda / 2) ** 2
+    return EARTH_RADIUS_KM * 2 * np.arctan2(np.sqrt(a), np.sqrt(1 - a))
+
+
+class GeoIndex:
+    """In-memory coordinate index answering radius and nearest-k queries.
+
+    ``loader`` returns ``(id, latitude, longitude)`` rows. Rows are kept in
+    contiguous arrays sorted by grid cell, so a query only computes distances
+    for the cells around the search point. The index is rebuilt lazily after
+    ``invalidate()`` or once ``ttl`` seconds have passed.
+    """
+
+    def __init__(self, loader, ttl=None):
+        self._loader = loader
+        self._ttl = ttl
+        self._lock = threading.Lock()
+        self._snapshot = None
+        self._built_at = 0.0
+
+    def invalidate(self):
+        self._snapshot = None
+
+    def __len__(self):
+        return len(self._get_snapshot()[0])
+
+    def _is_expired(self):
+        return self._ttl is not None and time.monotonic() - self._built_at > self._ttl
+
+    def _get_snapshot(self):
+        # Read once: invalidate() on another thread may reset self._snapshot at any point
+        snapshot = self._snapshot
+        if snapshot is None or self._is_expired():
+            with self._lock:
+                snapshot = self._snapshot
+                if snapshot is None or self._is_expired():
+                    snapshot = self._build()
+                    self._snapshot = snapshot
+                    self._built_at = time.monotonic()
+        return snapshot
+
+    def _build(self):
+        rows = self._loader()
+        ids = np.fromiter((r[0] for r in rows), dtype=np.int64, count=len(rows))
+        lats = np.fromiter((r[1] for r in rows), dtype=np.float64, count=len(rows))
+        lngs = np.fromiter((r[2] for r in rows), dtype=np.float64, count=len(rows))
+        row_idx = np.floor((np.clip(lats, -90.0, 90.0) + 90) / GRID_CELL_DEG).astype(np.int64)
+        col_idx = np.floor((np.clip(lngs, -180.0, 180.0) + 180) / GRID_CELL_DEG).astype(np.int64) % GRID_COLUMNS
+        cells = row_idx * GRID_COLUMNS + col_idx
+        order = np.argsort(cells, kind='stable')
+        return (
+            np.ascontiguousarray(ids[order]),
+            np.ascontiguousarray(lats[order]),
+            np.ascontiguousarray(lngs[order]),
+            np.ascontiguousarray(cells[order]),
+        )
+
+    def _candidates(self, snapshot, lat, lng, radius_km):
+        ids, lats, lngs, cells = snapshot
+        if radius_km is None:
+            return np.arange(len(ids))
+        min_lat, max_lat, min_lng, max_lng = bounding_box(lat, lng, radius_km)
+        ranges = cell_ranges_for_box(min_lat, max_lat, min_lng, max_lng)
+        if ranges is None:
+            return np.arange(len(ids))
+        starts = np.searchsorted(cells, [lo for lo, _ in ranges], side='left')
+        ends = np.searchsorted(cells, [hi for _, hi in ranges], side='right')
+        slices = [np.arange(s, e) for s, e in zip(starts, ends) if e > s]
+        return np.concatenate(slices) if slices else np.empty(0, dtype=np.int64)
+
+    def nearest(self, lat, lng, radius_km=None, limit=None):
+        """Return ``[(id, distance_km), ...]`` nearest first, within ``radius_km``."""
+        snapshot = self._get_snapshot()
+        ids, lats, lngs, _ = snapshot
+        idx = self._candidates(snapshot, lat, lng, radius_km)
+        if len(idx) == 0:
+            return []
+        dist = haversine_many(lat, lng, lats[idx], lngs[idx])
+        if radius_km is not None:
+            keep = dist <= radius_km
+            idx, dist = idx[keep], dist[keep]
+        if limit is not None and len(dist) > limit:
+            top = np.argpartition(dist, limit - 1)[:limit]
+            idx, dist = idx[top], dist[top]
+        order = np.argsort(dist, kind='stable')
+        return [(int(i), float(d)) for i, d in zip(ids[idx[order]], dist[order])]
+
+
+def _load_artisan_coordinates():
+    from app import db
+    from app.models import Artisan
+    return db.session.query(Artisan.id, Artisan.latitude, Artisan.longitude).filter(
+        Artisan.latitude.isnot(None), Artisan.longitude.isnot(None)
+    ).all()
+
+
+def _load_job_coordinates():
+    from app import db
+    from app.models import JobPost
+    return db.session.query(JobPost.id, JobPost.latitude, JobPost.longitude).filter(
+        JobPost.latitude.isnot(None), JobPost.longitude.isnot(None)
+    ).all()
+
+
+def _get_index(name, loader):
+    indexes = current_app.extensions.setdefault('geo_indexes', {})
+    if name not in indexes:
+        indexes[name] = GeoIndex(loader, ttl=current_app.config.get('GEO_INDEX_TTL'))
+    return indexes[name]
+
+
+def artisan_index():
+    """Return the current app's artisan coordinate index."""
+    return _get_index('artisan', _load_artisan_coordinates)
+
+
+def job_index():
+    """Return the current app's job post coordinate index."""
+    return _get_index('job', _load_job_coordinates)
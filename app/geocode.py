@@ -0,0 +1,137 @@
+import csv
+import os
+import re
+import unicodedata
+from functools import lru_cache
+from typing import NamedTuple
+
+from flask import current_app
+
+# Bundled city/area table; GEOCODER_GAZETTEER can point at a larger extract with the same columns
+DEFAULT_GAZETTEER = os.path.join(os.path.dirname(__file__), 'data', 'gazetteer.csv')
+
+_NON_WORD = re.compile(r'[^a-z0-9]+')
+
+
+class Place(NamedTuple):
+    name: str
+    state: str
+    latitude: float
+    longitude: float
+
+
+def tokenize(text):
+    """Lower-case, accent-free word tokens of a place string."""
+    text = unicodedata.normalize('NFKD', text or '').encode('ascii', 'ignore').decode('ascii')
+    return _NON_WORD.sub(' ', text.lower()).split()
+
+
+class PlaceTrie:
+    """Prefix tree over the word tokens of place names.
+
+    ``longest_match`` walks the tokens of a location string from a given
+    position, so "Ikeja GRA" finds "Ikeja" and "Victoria Island" wins over
+    a shorter name that happens to be its prefix.
+    """
+
+    _END = None
+
+    def __init__(self):
+        self._root = {}
+
+    def add(self, tokens, place):
+        node = self._root
+        for token in tokens:
+            node = node.setdefault(token, {})
+        node.setdefault(self._END, []).append(place)
+
+    def longest_match(self, tokens, start=0):
+        """Return ``(places, length)`` for the longest name starting at ``tokens[start]``."""
+        node = self._root
+        best = ([], 0)
+        for i in range(start, len(tokens)):
+            node = node.get(tokens[i])
+            if node is None:
+                break
+            if self._END in node:
+                best = (node[self._END], i + 1 - start)
+        return best
+
+
+class Geocoder:
+    """Resolve free-text locations ("Yaba, Lagos") to coordinates from a local gazetteer.
+
+    Comma-separated parts are tried most specific (first) to least; within a
+    part the longest known place name wins. Names shared by several states
+    are settled by the other places mentioned, so "Surulere, Lagos" and
+    "Surulere, Oyo" resolve differently. Results, including misses, are kept
+    in an LRU cache since the same few hundred strings repeat across rows.
+    """
+
+    def __init__(self, places, cache_size=4096):
+        self._trie = PlaceTrie()
+        for place, names in places:
+            for name in names:
+                tokens = tokenize(name)
+                if tokens:
+                    self._trie.add(tokens, place)
+        self._cached_resolve = lru_cache(maxsize=cache_size)(self._resolve)
+
+    @classmethod
+    def from_csv(cls, path, cache_size=4096):
+        """Load a gazetteer with name, aliases (``|``-separated), state, latitude and longitude columns."""
+        places = []
+        with open(path, newline='', encoding='utf-8') as f:
+            for row in csv.DictReader(f):
+                place = Place(row['name'], row['state'], float(row['latitude']), float(row['longitude']))
+                aliases = [alias for alias in (row.get('aliases') or '').split('|') if alias]
+                places.append((place, [row['name'], *aliases]))
+        return cls(places, cache_size=cache_size)
+
+    def resolve(self, text):
+        """Return ``(latitude, longitude)`` for a location string, or None if no place is known."""
+        if not text or not text.strip():
+            return None
+        place = self._cached_resolve(text.strip())
+        return (place.latitude, place.longitude) if place else None
+
+    def cache_info(self):
+        return self._cached_resolve.cache_info()
+
+    def _matches(self, tokens):
+        matches = []
+        i = 0
+        while i < len(tokens):
+            places, length = self._trie.longest_match(tokens, i)
+            if length:
+                matches.append((length, places))
+                i += length
+            else:
+                i += 1
+        return matches
+
+    def _resolve(self, text):
+        parts = [self._matches(tokenize(part)) for part in text.split(',')]
+        parts = [matches for matches in parts if matches]
+        if not parts:
+            return None
+        # Longest name in the most specific part; ties go to the earlier name
+        _, candidates = max(parts[0], key=lambda match: match[0])
+        if len(candidates) > 1:
+            context = {place.state for matches in parts for _, places in matches if places is not candidates
+                       for place in places}
+            for place in candidates:
+                if place.state in context:
+                    return place
+        return candidates[0]
+
+
+def geocoder():
+    """Return the current app's geocoder, loading the gazetteer on first use."""
+    instance = current_app.extensions.get('geocoder')
+    if instance is None:
+        instance = current_app.extensions['geocoder'] = Geocoder.from_csv(
+            current_app.config.get('GEOCODER_GAZETTEER') or DEFAULT_GAZETTEER,
+            cache_size=current_app.config.get('GEOCODER_CACHE_SIZE', 4096)
+        )
+    return instance
@@ -0,0 +1,293 @@
+import cProfile
+import hmac
+import logging
+import os
+import random
+import threading
+import time
+from collections import defaultdict
+
+from flask import (
+    Response, abort, before_render_template, current_app, g, has_app_context, has_request_context, request,
+    template_rendered
+)
+from sqlalchemy import event
+
+logger = logging.getLogger(__name__)
+
+# Upper bounds, in seconds, of the latency histogram buckets (Prometheus defaults)
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# Upper bounds of the per-request SQL query count histogram
+QUERY_COUNT_BUCKETS = (1, 2, 5, 10, 20, 50, 100)
+METRIC_PREFIX = 'handyverse'
+
+
+class Histogram:
+    """Cumulative Prometheus-style histogram, one series per label tuple."""
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self._lock = threading.Lock()
+        # labels -> [count per bucket..., +Inf count, sum]
+        self._series = {}
+
+    def observe(self, labels, value):
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[i] += 1
+            series[len(self.buckets)] += 1
+            series[-1] += value
+
+    def snapshot(self):
+        with self._lock:
+            return {labels: list(series) for labels, series in self._series.items()}
+
+
+class Counter:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._values = defaultdict(float)
+
+    def inc(self, labels, amount=1):
+        with self._lock:
+            self._values[labels] += amount
+
+    def snapshot(self):
+        with self._lock:
+            return dict(self._values)
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(names, values):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _format_value(value):
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+class Metrics:
+    """Per-endpoint request, SQL and template timings for one app.
+
+    Every request is timed from ``before_request`` to ``after_request``;
+    SQL statements and template renders that happen inside it are added to
+    the request's endpoint. Statements run outside a request (CLI commands,
+    the notification worker) are counted under the ``<background>`` endpoint.
+    """
+
+    def __init__(self):
+        self.request_latency = Histogram(LATENCY_BUCKETS)
+        self.request_queries = Histogram(QUERY_COUNT_BUCKETS)
+        self.requests = Counter()
+        self.sql_queries = Counter()
+        self.sql_seconds = Counter()
+        self.template_latency = Histogram(LATENCY_BUCKETS)
+        self.profiles_written = 0
+
+    def render(self, gauges=()):
+        """Return every metric in the Prometheus text exposition format."""
+        lines = []
+        self._render_histogram(
+            lines, 'request_duration_seconds', 'Request latency by endpoint.',
+            ('endpoint', 'method'), self.request_latency
+        )
+        self._render_counter(
+            lines, 'requests_total', 'Requests by endpoint and status.', ('endpoint', 'method', 'status'), self.requests
+        )
+        self._render_histogram(
+            lines, 'request_sql_queries', 'SQL statements per request by endpoint.', ('endpoint',), self.request_queries
+        )
+        self._render_counter(lines, 'sql_queries_total', 'SQL statements executed.', ('endpoint',), self.sql_queries)
+        self._render_counter(
+            lines, 'sql_duration_seconds_total', 'Time spent executing SQL.', ('endpoint',), self.sql_seconds
+        )
+        self._render_histogram(
+            lines, 'template_render_seconds', 'Template render time.', ('template',), self.template_latency
+        )
+        self._render_counter(
+            lines, 'profiles_written_total', 'Slow-request profiles dumped to disk.', (), {(): self.profiles_written}
+        )
+        for name, help_text, names, values in gauges:
+            lines.append(f'# HELP {METRIC_PREFIX}_{name} {help_text}')
+            lines.append(f'# TYPE {METRIC_PREFIX}_{name} gauge')
+            for labels, value in values.items():
+                lines.append(f'{METRIC_PREFIX}_{name}{_format_labels(names, labels)} {_format_value(value)}')
+        return '\n'.join(lines) + '\n'
+
+    @staticmethod
+    def _render_counter(lines, name, help_text, names, counter):
+        values = counter.snapshot() if isinstance(counter, Counter) else counter
+        lines.append(f'# HELP {METRIC_PREFIX}_{name} {help_text}')
+        lines.append(f'# TYPE {METRIC_PREFIX}_{name} counter')
+        for labels, value in sorted(values.items()):
+            lines.append(f'{METRIC_PREFIX}_{name}{_format_labels(names, labels)} {_format_value(value)}')
+
+    @staticmethod
+    def _render_histogram(lines, name, help_text, names, histogram):
+        lines.append(f'# HELP {METRIC_PREFIX}_{name} {help_text}')
+        lines.append(f'# TYPE {METRIC_PREFIX}_{name} histogram')
+        bounds = [*histogram.buckets, '+Inf']
+        for labels, series in sorted(histogram.snapshot().items()):
+            for bound, count in zip(bounds, series):
+                bucket_labels = _format_labels((*names, 'le'), (*labels, bound))
+                lines.append(f'{METRIC_PREFIX}_{name}_bucket{bucket_labels} {count}')
+            lines.append(f'{METRIC_PREFIX}_{name}_sum{_format_labels(names, labels)} {_format_value(series[-1])}')
+            lines.append(f'{METRIC_PREFIX}_{name}_count{_format_labels(names, labels)} {series[-2]}')
+
+
+def get_metrics():
+    return current_app.extensions['metrics']
+
+
+# --- collection hooks ---
+
+def _endpoint():
+    if has_request_context():
+        return request.endpoint or '<unmatched>'
+    return '<background>'
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    context.metrics_start = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    start = getattr(context, 'metrics_start', None)
+    if start is None or not has_app_context():
+        return
+    elapsed = time.perf_counter() - start
+    metrics = get_metrics()
+    endpoint = _endpoint()
+    metrics.sql_queries.inc((endpoint,))
+    metrics.sql_seconds.inc((endpoint,), elapsed)
+    if has_request_context():
+        g.metrics_sql_queries = g.get('metrics_sql_queries', 0) + 1
+
+
+def _before_render(sender, template, context, **extra):
+    g.setdefault('metrics_template_starts', []).append(time.perf_counter())
+
+
+def _after_render(sender, template, context, **extra):
+    starts = g.get('metrics_template_starts')
+    if starts:
+        sender.extensions['metrics'].template_latency.observe(
+            (template.name or '<string>',), time.perf_counter() - starts.pop()
+        )
+
+
+# Only one request is profiled at a time; profilers cannot overlap on Python 3.12+
+_profile_lock = threading.Lock()
+
+
+def _start_request():
+    g.metrics_start = time.perf_counter()
+    rate = current_app.config.get('METRICS_PROFILE_SAMPLE_RATE', 0)
+    if rate and random.random() < rate and _profile_lock.acquire(blocking=False):
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError:
+            _profile_lock.release()
+            return
+        g.metrics_profiler = profiler
+
+
+def _finish_request(response):
+    start = g.pop('metrics_start', None)
+    if start is None:
+        return response
+    elapsed = time.perf_counter() - start
+    metrics = get_metrics()
+    endpoint = _endpoint()
+    metrics.request_latency.observe((endpoint, request.method), elapsed)
+    metrics.requests.inc((endpoint, request.method, str(response.status_code)))
+    metrics.request_queries.observe((endpoint,), g.pop('metrics_sql_queries', 0))
+    profiler = g.pop('metrics_profiler', None)
+    if profiler is not None:
+        _stop_profiler(profiler, endpoint, elapsed)
+    return response
+
+
+def _discard_profiler(exc):
+    # Requests that raised never reach after_request
+    profiler = g.pop('metrics_profiler', None)
+    if profiler is not None:
+        profiler.disable()
+        _profile_lock.release()
+
+
+def _stop_profiler(profiler, endpoint, elapsed):
+    profiler.disable()
+    try:
+        if elapsed * 1000 >= current_app.config.get('METRICS_PROFILE_SLOW_MS', 500):
+            directory = current_app.config.get('METRICS_PROFILE_DIR') or os.path.join(current_app.instance_path, 'profiles')
+            os.makedirs(directory, exist_ok=True)
+            path = os.path.join(directory, f'{time.strftime("%Y%m%d-%H%M%S")}-{endpoint}-{round(elapsed * 1000)}ms.prof')
+            profiler.dump_stats(path)
+            get_metrics().profiles_written += 1
+            logger.info(f"Slow request to {endpoint} took {elapsed * 1000:.0f} ms; profile written to {path}")
+    finally:
+        _profile_lock.release()
+
+
+def _runtime_gauges(app):
+    """Gauges read from the app's worker pools and queues at scrape time."""
+    gauges = []
+    hasher = app.extensions.get('password_hasher')
+    if hasher is not None:
+        stats = hasher.stats()
+        for field in ('workers', 'active', 'queued', 'rejected'):
+            gauges.append((
+                f'password_pool_{field}', f'Password hashing pool {field}.', ('pool',),
+                {(pool,): values[field] for pool, values in stats.items()}
+            ))
+    worker = app.extensions.get('notification_worker')
+    if worker is not None:
+        gauges.append(('notification_queue_depth', 'Notification jobs waiting.', (), {(): worker.queue_depth()}))
+    broker = app.extensions.get('event_broker')
+    if broker is not None:
+        gauges.append(('event_subscribers', 'Open event streams and long polls.', (), {(): broker.subscriber_count()}))
+    pools = {}
+    with app.app_context():
+        for bind, engine in app.extensions['sqlalchemy'].engines.items():
+            if hasattr(engine.pool, 'checkedout'):
+                pools[(bind or 'default',)] = engine.pool.checkedout()
+    if pools:
+        gauges.append(('db_connections_checked_out', 'Database connections in use.', ('bind',), pools))
+    return gauges
+
+
+def metrics_view():
+    token = current_app.config.get('METRICS_TOKEN')
+    # Constant-time comparison so response timing does not leak the token
+    if token and not hmac.compare_digest(request.headers.get('Authorization', '').encode(), f'Bearer {token}'.encode()):
+        abort(401)
+    body = get_metrics().render(_runtime_gauges(current_app._get_current_object()))
+    return Response(body, mimetype='text/plain; version=0.0.4')
+
+
+def init_app(app):
+    """Install request, SQL and template instrumentation when METRICS_ENABLED is set."""
+    if not app.config.get('METRICS_ENABLED'):
+        return
+    app.extensions['metrics'] = Metrics()
+    with app.app_context():
+        engines = [*app.extensions['sqlalchemy'].engines.values(), *app.extensions.get('replica_engines', [])]
+    for engine in engines:
+        event.listen(engine, 'before_cursor_execute', _before_cursor_execute)
+        event.listen(engine, 'after_cursor_execute', _after_cursor_execute)
+    before_render_template.connect(_before_render, app)
+    template_rendered.connect(_after_render, app)
+    app.before_request(_start_request)
+    app.after_request(_finish_request)
+    app.teardown_request(_discard_profiler)
+    app.add_url_rule('/metrics', 'metrics', metrics_view)
@@ -1,18 +1,47 @@
 from app import db
-from werkzeug.security import generate_password_hash, check_password_hash
+from app.geocode import geocoder
+from app.search import SEARCH_INDEXES, artisan_search, job_search
+from app.passwords import hash_password, verify_password
 from flask_login import UserMixin
 from datetime import datetime
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.hybrid import hybrid_property
 
-class User(db.Model, UserMixin):  # Inherit from UserMixin
+class Located:
+    """Models with a location string and the coordinates it resolves to."""
+
+    def set_coordinates(self, latitude, longitude):
+        # Explicit coordinates (e.g. from the browser) win over geocoding the location text
+        self.latitude = latitude
+        self.longitude = longitude
+        self._coordinates_given = True
+
+class Correspondence:
+    """Models holding messages from ``sender_id`` to ``recipient_id``: live and archived."""
+
+    @classmethod
+    def between(cls, user_id, partner_id):
+        """Return messages exchanged between two users, in either direction."""
+        return cls.query.filter(db.or_(
+            db.and_(cls.sender_id == user_id, cls.recipient_id == partner_id),
+            db.and_(cls.sender_id == partner_id, cls.recipient_id == user_id),
+        ))
+
+class User(db.Model, UserMixin, Located):  # Inherit from UserMixin
     __tablename__ = 'user'
     id = db.Column(db.Integer, primary_key=True)
     email = db.Column(db.String(120), unique=True, nullable=False)
     name = db.Column(db.String(100), nullable=False)
     password_hash = db.Column(db.String(512))
     location = db.Column(db.String(100))
+    # Resolved from location by the gazetteer geocoder (app.geocode)
+    latitude = db.Column(db.Float)
+    longitude = db.Column(db.Float)
     phone_number = db.Column(db.String(15))
     is_artisan = db.Column(db.Boolean, default=False)
     profile_pic = db.Column(db.String(200))
+    # Small WebP copy of profile_pic for cards and avatars (see app.uploads)
+    profile_pic_thumb = db.Column(db.String(200))
     messages = db.relationship('Message', foreign_keys='Message.sender_id', backref='sender', lazy='dynamic')
     received_messages = db.relationship('Message', foreign_keys='Message.recipient_id', backref='recipient', lazy='dynamic')
     job_posts = db.relationship('JobPost', back_populates='user', lazy='dynamic')
@@ -20,16 +49,24 @@ class User(db.Model, UserMixin):  # Inherit from UserMixin
     reviews_given = db.relationship('Review', back_populates='customer', lazy='dynamic')
     notifications = db.relationship('Notification', back_populates='user', lazy='dynamic')
 
+    @property
+    def avatar_url(self):
+        return self.profile_pic_thumb or self.profile_pic
+
     def set_password(self, password):
-        self.password_hash = generate_password_hash(password)
+        self.password_hash = hash_password(password)
 
     def check_password(self, password):
-        return check_password_hash(self.password_hash, password)
+        # A match against outdated hash parameters upgrades the stored hash; the caller commits
+        matches, needs_rehash = verify_password(self.password_hash, password)
+        if needs_rehash:
+            self.password_hash = hash_password(password)
+        return matches
 
     def is_active(self):
         return True  # Override to always return True; adjust if you add an active status field
 
-class Artisan(db.Model):
+class Artisan(db.Model, Located):
     __tablename__ = 'artisan'
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), unique=True)
@@ -37,20 +74,58 @@ class Artisan(db.Model):
     location = db.Column(db.String(100), nullable=False)
     latitude = db.Column(db.Float)
     longitude = db.Column(db.Float)
+    # Running totals over reviews_received, maintained by the Review listeners below
+    rating_sum = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    rating_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
     user = db.relationship('User', backref=db.backref('artisan', uselist=False))
     favorited_by = db.relationship('Favorite', back_populates='artisan', lazy='dynamic')
     reviews_received = db.relationship('Review', back_populates='artisan', lazy='dynamic')
     job_applications = db.relationship('JobApplication', back_populates='artisan', lazy='dynamic')
 
-class Message(db.Model):
+    @hybrid_property
+    def average_rating(self):
+        if not self.rating_count:
+            return None
+        return self.rating_sum / self.rating_count
+
+    @average_rating.expression
+    def average_rating(cls):
+        return db.case(
+            (cls.rating_count > 0, db.cast(cls.rating_sum, db.Float) / cls.rating_count),
+            else_=None
+        )
+
+    @staticmethod
+    def adjust_rating(connection, artisan_id, rating_delta, count_delta):
+        # Relative update so concurrent reviews for the same artisan cannot lose a write
+        table = Artisan.__table__
+        connection.execute(
+            table.update()
+            .where(table.c.id == artisan_id)
+            .values(
+                rating_sum=table.c.rating_sum + rating_delta,
+                rating_count=table.c.rating_count + count_delta
+            )
+        )
+
+class Message(db.Model, Correspondence):
     __tablename__ = 'message'
     id = db.Column(db.Integer, primary_key=True)
     sender_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
     recipient_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
     content = db.Column(db.Text, nullable=False)
-    timestamp = db.Column(db.DateTime, server_default=db.func.now())
+    timestamp = db.Column(db.DateTime, default=datetime.utcnow, server_default=db.func.now())
     parent_id = db.Column(db.Integer, db.ForeignKey('message.id', name='fk_message_parent_id'))
 
+    __table_args__ = (
+        db.Index('ix_message_sender_timestamp', 'sender_id', 'timestamp'),
+        db.Index('ix_message_recipient_timestamp', 'recipient_id', 'timestamp'),
+        db.Index('ix_message_recipient_parent_timestamp', 'recipient_id', 'parent_id', 'timestamp'),
+        db.Index('ix_message_pair_id', 'sender_id', 'recipient_id', 'id'),
+        # Reply lookups by parent (`flask archive-messages` keeps parents with live replies)
+        db.Index('ix_message_parent_id', 'parent_id'),
+    )
+
     # Replies in chronological order
     replies = db.relationship(
         'Message',
@@ -64,17 +139,168 @@ class Message(db.Model):
         """Return top-level (non-reply) messages received by a user, oldest first."""
         return cls.query.filter_by(recipient_id=user_id, parent_id=None).order_by(cls.timestamp.asc())
 
+class MessageArchive(db.Model, Correspondence):
+    """Messages moved out of the live table by `flask archive-messages`.
+
+    Rows keep their original ids; ``parent_id`` is not a foreign key since a
+    reply's parent may still be live. Chat history pages read both tables.
+    """
+    __tablename__ = 'message_archive'
+    id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    sender_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    recipient_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    content = db.Column(db.Text, nullable=False)
+    timestamp = db.Column(db.DateTime)
+    parent_id = db.Column(db.Integer)
+    archived_at = db.Column(db.DateTime, default=datetime.utcnow, server_default=db.func.now())
+
+    __table_args__ = (
+        db.Index('ix_message_archive_pair_id', 'sender_id', 'recipient_id', 'id'),
+    )
+
+class Conversation(db.Model):
+    """Denormalized summary of the messages between two users.
+
+    The pair is stored with ``user_a_id < user_b_id``. Rows are maintained by
+    the Message ``after_insert`` listener in the same transaction as the
+    message itself.
+    """
+    __tablename__ = 'conversation'
+    id = db.Column(db.Integer, primary_key=True)
+    user_a_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    user_b_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    last_message_id = db.Column(db.Integer, db.ForeignKey('message.id'))
+    last_message_snippet = db.Column(db.String(120))
+    last_message_at = db.Column(db.DateTime)
+    unread_a = db.Column(db.Integer, nullable=False, default=0)
+    unread_b = db.Column(db.Integer, nullable=False, default=0)
+
+    __table_args__ = (
+        db.Index('uq_conversation_pair', 'user_a_id', 'user_b_id', unique=True),
+        db.Index('ix_conversation_user_a_last', 'user_a_id', 'last_message_at'),
+        db.Index('ix_conversation_user_b_last', 'user_b_id', 'last_message_at'),
+        db.Index('ix_conversation_last_message', 'last_message_id'),
+    )
+
+    SNIPPET_LENGTH = 120
+
+    @staticmethod
+    def pair(user_id, partner_id):
+        return (user_id, partner_id) if user_id < partner_id else (partner_id, user_id)
+
+    def partner_id(self, user_id):
+        return self.user_b_id if self.user_a_id == user_id else self.user_a_id
+
+    def unread_for(self, user_id):
+        return self.unread_a if self.user_a_id == user_id else self.unread_b
+
+    @classmethod
+    def for_user(cls, user_id):
+        """Return a user's conversations, most recently active first."""
+        return cls.query.filter(
+            (cls.user_a_id == user_id) | (cls.user_b_id == user_id)
+        ).order_by(cls.last_message_at.desc(), cls.id.desc())
+
+    @classmethod
+    def mark_read(cls, user_id, partner_id):
+        """Reset the user's unread count for a conversation (caller commits)."""
+        user_a, user_b = cls.pair(user_id, partner_id)
+        column = 'unread_a' if user_a == user_id else 'unread_b'
+        cls.query.filter_by(user_a_id=user_a, user_b_id=user_b).update(
+            {column: 0}, synchronize_session=False
+        )
+
+    @classmethod
+    def record_message(cls, connection, message):
+        """Upsert the conversation row for a newly inserted message."""
+        user_a, user_b = cls.pair(message.sender_id, message.recipient_id)
+        recipient_is_a = message.recipient_id == user_a
+        values = {
+            'last_message_id': message.id,
+            'last_message_snippet': (message.content or '')[:cls.SNIPPET_LENGTH],
+            'last_message_at': message.timestamp or db.func.now(),
+        }
+        unread_column = cls.unread_a if recipient_is_a else cls.unread_b
+        table = cls.__table__
+        dialect = connection.dialect.name
+        if dialect in ('sqlite', 'postgresql'):
+            insert = sqlite.insert if dialect == 'sqlite' else postgresql.insert
+            stmt = insert(table).values(
+                user_a_id=user_a,
+                user_b_id=user_b,
+                unread_a=1 if recipient_is_a else 0,
+                unread_b=0 if recipient_is_a else 1,
+                **values
+            )
+            stmt = stmt.on_conflict_do_update(
+                index_elements=['user_a_id', 'user_b_id'],
+                set_={**values, unread_column.name: unread_column + 1},
+            )
+            connection.execute(stmt)
+            return
+        result = connection.execute(
+            table.update()
+            .where(table.c.user_a_id == user_a, table.c.user_b_id == user_b)
+            .values(**values, **{unread_column.name: unread_column + 1})
+        )
+        if result.rowcount == 0:
+            connection.execute(table.insert().values(
+                user_a_id=user_a,
+                user_b_id=user_b,
+                unread_a=1 if recipient_is_a else 0,
+                unread_b=0 if recipient_is_a else 1,
+                **values
+            ))
+
+@db.event.listens_for(Message, 'after_insert')
+def _update_conversation(mapper, connection, target):
+    Conversation.record_message(connection, target)
+
 class Review(db.Model):
     __tablename__ = 'review'
     id = db.Column(db.Integer, primary_key=True)
     customer_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
-    artisan_id = db.Column(db.Integer, db.ForeignKey('artisan.id'), nullable=False)
+    # active_history loads the old values on change so the rating listeners can reverse them
+    artisan_id = db.column_property(db.Column(db.Integer, db.ForeignKey('artisan.id'), nullable=False), active_history=True)
     comment = db.Column(db.Text, nullable=False)
-    rating = db.Column(db.Integer, nullable=False)  # e.g., 1-5
-    timestamp = db.Column(db.DateTime, server_default=db.func.now())
+    rating = db.column_property(db.Column(db.Integer, nullable=False), active_history=True)  # e.g., 1-5
+    timestamp = db.Column(db.DateTime, default=datetime.utcnow, server_default=db.func.now())
     customer = db.relationship('User', back_populates='reviews_given')
     artisan = db.relationship('Artisan', back_populates='reviews_received')
 
+    __table_args__ = (
+        db.Index('ix_review_artisan_timestamp', 'artisan_id', 'timestamp'),
+    )
+
+# Keep Artisan.rating_sum/rating_count in step with reviews. These only fire
+# for ORM flushes; bulk query.update()/delete() on Review must recount instead
+# (see `flask recount-ratings`).
+@db.event.listens_for(Review, 'after_insert')
+def _review_added(mapper, connection, target):
+    Artisan.adjust_rating(connection, target.artisan_id, target.rating, 1)
+
+@db.event.listens_for(Review, 'after_update')
+def _review_changed(mapper, connection, target):
+    state = db.inspect(target)
+    rating = state.attrs.rating.history
+    artisan_id = state.attrs.artisan_id.history
+    if not rating.has_changes() and not artisan_id.has_changes():
+        return
+    old_rating = rating.deleted[0] if rating.deleted else target.rating
+    old_artisan_id = artisan_id.deleted[0] if artisan_id.deleted else target.artisan_id
+    Artisan.adjust_rating(connection, old_artisan_id, -old_rating, -1)
+    Artisan.adjust_rating(connection, target.artisan_id, target.rating, 1)
+
+@db.event.listens_for(Review, 'before_delete')
+def _review_removed(mapper, connection, target):
+    state = db.inspect(target)
+    rating = state.attrs.rating.history
+    artisan_id = state.attrs.artisan_id.history
+    # Use the persisted values in case the row was modified before being deleted
+    old_rating = rating.deleted[0] if rating.deleted else target.rating
+    old_artisan_id = artisan_id.deleted[0] if artisan_id.deleted else target.artisan_id
+    Artisan.adjust_rating(connection, old_artisan_id, -old_rating, -1)
+
 class Notification(db.Model):
     __tablename__ = 'notification'
     id = db.Column(db.Integer, primary_key=True)
@@ -86,6 +312,11 @@ class Notification(db.Model):
     timestamp = db.Column(db.DateTime, default=datetime.utcnow)
     user = db.relationship('User', back_populates='notifications')
 
+    __table_args__ = (
+        db.Index('ix_notification_user_timestamp', 'user_id', 'timestamp'),
+        db.Index('ix_notification_user_is_read', 'user_id', 'is_read'),
+    )
+
 class Favorite(db.Model):
     __tablename__ = 'favorite'
     id = db.Column(db.Integer, primary_key=True)
@@ -95,7 +326,12 @@ class Favorite(db.Model):
     user = db.relationship('User', back_populates='favorites')
     artisan = db.relationship('Artisan', back_populates='favorited_by')
 
-class JobPost(db.Model):
+    __table_args__ = (
+        db.Index('uq_favorite_user_artisan', 'user_id', 'artisan_id', unique=True),
+        db.Index('ix_favorite_artisan', 'artisan_id'),
+    )
+
+class JobPost(db.Model, Located):
     __tablename__ = 'job_post'
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
@@ -109,6 +345,11 @@ class JobPost(db.Model):
     user = db.relationship('User', back_populates='job_posts')
     applications = db.relationship('JobApplication', backref='job_post', lazy='dynamic')
 
+    __table_args__ = (
+        db.Index('ix_job_post_timestamp', 'timestamp'),
+        db.Index('ix_job_post_user_timestamp', 'user_id', 'timestamp'),
+    )
+
 class JobApplication(db.Model):
     __tablename__ = 'job_application'
     id = db.Column(db.Integer, primary_key=True)
@@ -117,4 +358,74 @@ class JobApplication(db.Model):
     message = db.Column(db.Text)
     status = db.Column(db.String(50), default='pending')  # pending, accepted, rejected
     timestamp = db.Column(db.DateTime, default=datetime.utcnow)
-    artisan = db.relationship('Artisan', back_populates='job_applications')
\ No newline at end of file
+    artisan = db.relationship('Artisan', back_populates='job_applications')
+
+    __table_args__ = (
+        db.Index('uq_job_application_job_artisan', 'job_post_id', 'artisan_id', unique=True),
+        db.Index('ix_job_application_artisan', 'artisan_id'),
+    )
+
+# Keep the full-text search tables (app.search) in step with the searchable
+# columns. Like the other listeners these only see ORM flushes; run
+# `flask rebuild-search-index` after bulk edits that bypass the ORM.
+def _columns_changed(target, *names):
+    state = db.inspect(target)
+    return any(state.attrs[name].history.has_changes() for name in names)
+
+@db.event.listens_for(Artisan, 'after_insert')
+def _index_artisan(mapper, connection, target):
+    artisan_search.refresh(connection, [target.id])
+
+@db.event.listens_for(Artisan, 'after_update')
+def _reindex_artisan(mapper, connection, target):
+    if _columns_changed(target, 'skills', 'location', 'user_id'):
+        artisan_search.refresh(connection, [target.id])
+
+@db.event.listens_for(Artisan, 'after_delete')
+def _unindex_artisan(mapper, connection, target):
+    artisan_search.remove(connection, [target.id])
+
+@db.event.listens_for(User, 'after_update')
+def _reindex_artisan_name(mapper, connection, target):
+    if _columns_changed(target, 'name'):
+        artisan_ids = connection.execute(
+            db.select(Artisan.id).where(Artisan.user_id == target.id)
+        ).scalars().all()
+        artisan_search.refresh(connection, artisan_ids)
+
+@db.event.listens_for(JobPost, 'after_insert')
+def _index_job(mapper, connection, target):
+    job_search.refresh(connection, [target.id])
+
+@db.event.listens_for(JobPost, 'after_update')
+def _reindex_job(mapper, connection, target):
+    if _columns_changed(target, 'title', 'description', 'location'):
+        job_search.refresh(connection, [target.id])
+
+@db.event.listens_for(JobPost, 'after_delete')
+def _unindex_job(mapper, connection, target):
+    job_search.remove(connection, [target.id])
+
+# Fill in coordinates from the location text when it changes and the browser
+# did not send any. An unknown place clears them: the old ones belong to the
+# old location. `flask geocode-locations` backfills rows written before this.
+def _geocode_location(mapper, connection, target):
+    given = target.__dict__.pop('_coordinates_given', False)
+    if given or not _columns_changed(target, 'location') or _columns_changed(target, 'latitude', 'longitude'):
+        return
+    target.latitude, target.longitude = geocoder().resolve(target.location) or (None, None)
+
+for _model in (User, Artisan, JobPost):
+    db.event.listen(_model, 'before_insert', _geocode_location)
+    db.event.listen(_model, 'before_update', _geocode_location)
+
+# The search tables are not ORM models, so create/drop them alongside db.create_all()/drop_all()
+@db.event.listens_for(db.metadata, 'after_create')
+def _create_search_tables(target, connection, **kw):
+    for index in SEARCH_INDEXES:
+        index.create(connection)
+
+@db.event.listens_for(db.metadata, 'before_drop')
+def _drop_search_tables(target, connection, **kw):
+    for index in SEARCH_INDEXES:
+        index.drop(connection)
@@ -0,0 +1,240 @@
+import logging
+import queue
+import threading
+import time
+
+from flask import current_app
+
+from app import db
+from app.events import publish
+from app.models import Favorite, Notification
+
+logger = logging.getLogger(__name__)
+
+# Session.info key holding notification rows staged for the current transaction
+PENDING_KEY = 'pending_notifications'
+# Session.info key holding inserted notifications to push once the transaction commits
+COMMITTED_KEY = 'committed_notifications'
+
+
+def create_notification(user_ids, notif_type, message, url=None):
+    """Stage a notification for one or more users in the current transaction.
+
+    Nothing is written until the caller commits; the rows are then inserted
+    with a single batched INSERT as part of that same commit, so a request
+    that saves a message and notifies its recipient pays for one commit.
+    """
+    if isinstance(user_ids, int):
+        user_ids = [user_ids]
+    db.session.info.setdefault(PENDING_KEY, []).extend(
+        {'user_id': user_id, 'type': notif_type, 'message': message, 'url': url}
+        for user_id in user_ids
+    )
+
+
+def insert_notifications(session, rows):
+    """Bulk-insert notification rows and return them with their new ids."""
+    if not rows:
+        return []
+    # Returning whole rows means the result order does not matter, which keeps
+    # this a single multi-row INSERT on SQLite as well
+    return session.execute(
+        db.insert(Notification).returning(
+            Notification.id, Notification.user_id, Notification.type, Notification.message, Notification.url
+        ),
+        rows
+    ).mappings().all()
+
+
+def publish_notifications(notifications):
+    """Push committed notifications to their users and drop their cached counts."""
+    unread_counter().invalidate(*{notif['user_id'] for notif in notifications})
+    for notif in notifications:
+        publish(notif['user_id'], 'notification', {
+            'id': notif['id'],
+            'type': notif['type'],
+            'message': notif['message'],
+            'url': notif['url']
+        })
+
+
+@db.event.listens_for(db.session, 'before_commit')
+def _write_pending_notifications(session):
+    rows = session.info.pop(PENDING_KEY, None)
+    if rows:
+        session.info.setdefault(COMMITTED_KEY, []).extend(insert_notifications(session, rows))
+
+
+@db.event.listens_for(db.session, 'after_commit')
+def _publish_committed_notifications(session):
+    notifications = session.info.pop(COMMITTED_KEY, None)
+    if notifications:
+        publish_notifications(notifications)
+
+
+@db.event.listens_for(db.session, 'after_rollback')
+def _discard_pending_notifications(session):
+    session.info.pop(PENDING_KEY, None)
+    session.info.pop(COMMITTED_KEY, None)
+
+
+class UnreadCounter:
+    """Per-user unread notification counts, cached for ``ttl`` seconds.
+
+    Writers invalidate a user's entry after committing; the TTL bounds how
+    stale a count can get from writes made by other worker processes.
+    """
+
+    def __init__(self, ttl=30, max_entries=10000):
+        self._ttl = ttl
+        self._max_entries = max_entries
+        self._lock = threading.Lock()
+        self._counts = {}
+
+    def get(self, user_id, loader):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._counts.get(user_id)
+        if entry is not None and now - entry[1] <= self._ttl:
+            return entry[0]
+        count = loader(user_id)
+        with self._lock:
+            if len(self._counts) >= self._max_entries:
+                # Dicts keep insertion order, so this evicts the oldest entry
+                self._counts.pop(next(iter(self._counts)))
+            self._counts[user_id] = (count, now)
+        return count
+
+    def invalidate(self, *user_ids):
+        with self._lock:
+            for user_id in user_ids:
+                self._counts.pop(user_id, None)
+
+
+def unread_counter():
+    """Return the current app's unread count cache, creating it on first use."""
+    if 'unread_counter' not in current_app.extensions:
+        current_app.extensions['unread_counter'] = UnreadCounter(ttl=current_app.config.get('UNREAD_COUNT_TTL', 30))
+    return current_app.extensions['unread_counter']
+
+
+def _count_unread(user_id):
+    return db.session.execute(
+        db.select(db.func.count(Notification.id))
+        .where(Notification.user_id == user_id, Notification.is_read == False)  # noqa: E712
+    ).scalar_one()
+
+
+def unread_count(user_id):
+    return unread_counter().get(user_id, _count_unread)
+
+
+def mark_read(user_id, ids=None):
+    """Mark a user's notifications read with one UPDATE; ``ids=None`` marks all.
+
+    Returns the number of rows changed. The caller commits and then calls
+    ``unread_counter().invalidate(user_id)``.
+    """
+    query = db.update(Notification).where(Notification.user_id == user_id, Notification.is_read == False)  # noqa: E712
+    if ids is not None:
+        query = query.where(Notification.id.in_(ids))
+    return db.session.execute(query.values(is_read=True)).rowcount
+
+
+class NotificationWorker:
+    """Background thread that writes large notification fan-outs.
+
+    Jobs run in their own app context and session, inserting recipients in
+    batches of ``batch_size`` with one multi-row INSERT and one commit per
+    batch. Queued jobs live only in this process's memory, so anything that
+    must not be lost belongs in ``create_notification`` instead.
+    """
+
+    def __init__(self, app, batch_size=500, max_queue_size=1000):
+        self._app = app
+        self.batch_size = batch_size
+        self._queue = queue.Queue(maxsize=max_queue_size)
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def submit(self, func, *args):
+        """Run ``func(*args, batch_size=...)`` on the worker thread."""
+        self._ensure_started()
+        try:
+            self._queue.put_nowait((func, args))
+        except queue.Full:
+            # Backpressure: the request that overflowed the queue does the work itself
+            logger.warning(f"Notification queue full, running {func.__name__} inline")
+            self._run_job(func, args)
+
+    def join(self):
+        """Block until every submitted job has finished."""
+        self._queue.join()
+
+    def queue_depth(self):
+        return self._queue.qsize()
+
+    def _ensure_started(self):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name='notification-worker', daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            func, args = self._queue.get()
+            try:
+                with self._app.app_context():
+                    self._run_job(func, args)
+            finally:
+                self._queue.task_done()
+
+    def _run_job(self, func, args):
+        try:
+            func(*args, batch_size=self.batch_size)
+        except Exception as e:
+            db.session.rollback()
+            logger.error(f"Notification job {func.__name__} failed: {str(e)}", exc_info=True)
+
+
+def get_worker():
+    """Return the current app's notification worker, creating it on first use."""
+    if 'notification_worker' not in current_app.extensions:
+        current_app.extensions['notification_worker'] = NotificationWorker(
+            current_app._get_current_object(),
+            batch_size=current_app.config.get('NOTIFICATION_BATCH_SIZE', 500)
+        )
+    return current_app.extensions['notification_worker']
+
+
+def fan_out(user_ids, notif_type, message, url=None, batch_size=500):
+    """Insert and push one notification per user, committing every ``batch_size`` rows."""
+    for start in range(0, len(user_ids), batch_size):
+        rows = [
+            {'user_id': user_id, 'type': notif_type, 'message': message, 'url': url}
+            for user_id in user_ids[start:start + batch_size]
+        ]
+        notifications = insert_notifications(db.session, rows)
+        db.session.commit()
+        publish_notifications(notifications)
+
+
+def _notify_favoriters(artisan_id, notif_type, message, url=None, batch_size=500):
+    user_ids = db.session.execute(
+        db.select(Favorite.user_id).where(Favorite.artisan_id == artisan_id)
+    ).scalars().all()
+    fan_out(user_ids, notif_type, message, url, batch_size=batch_size)
+
+
+def notify_favoriters(artisan_id, notif_type, message, url=None):
+    """Notify every user who favorited an artisan, off the request path.
+
+    Runs inline when ``NOTIFICATIONS_ASYNC`` is off (e.g. in tests).
+    """
+    if current_app.config.get('NOTIFICATIONS_ASYNC', True):
+        get_worker().submit(_notify_favoriters, artisan_id, notif_type, message, url)
+    else:
+        _notify_favoriters(
+            artisan_id, notif_type, message, url,
+            batch_size=current_app.config.get('NOTIFICATION_BATCH_SIZE', 500)
+        )
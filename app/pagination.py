@@ -0,0 +1,49 @@
+import base64
+from collections import namedtuple
+from datetime import datetime
+
+import sqlalchemy as sa
+
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+
+Page = namedtuple('Page', ['items', 'next_cursor'])
+
+
+def encode_cursor(timestamp, item_id):
+    raw = f"{timestamp.isoformat() if timestamp else ''}|{item_id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """Return ``(timestamp, id)`` from a cursor, raising ValueError if it is malformed."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode()
+        timestamp, item_id = raw.rsplit('|', 1)
+        return (datetime.fromisoformat(timestamp) if timestamp else None), int(item_id)
+    except (ValueError, UnicodeDecodeError) as e:
+        raise ValueError(f"Invalid cursor: {cursor}") from e
+
+
+def page_size(requested, default=DEFAULT_PAGE_SIZE):
+    if not requested:
+        return default
+    return min(max(requested, 1), MAX_PAGE_SIZE)
+
+
+def keyset_page(query, timestamp_col, id_col, cursor=None, limit=DEFAULT_PAGE_SIZE, key=None):
+    """Return the page of ``query`` after ``cursor``, newest first by ``(timestamp, id)``.
+
+    The cost of a page depends only on ``limit``, not on how deep the page is.
+    ``key`` maps a result row to its ``(timestamp, id)`` and defaults to the
+    row's ``timestamp`` and ``id`` attributes.
+    """
+    if cursor:
+        timestamp, item_id = decode_cursor(cursor)
+        query = query.filter(sa.tuple_(timestamp_col, id_col) < sa.tuple_(timestamp, item_id))
+    items = query.order_by(timestamp_col.desc(), id_col.desc()).limit(limit + 1).all()
+    if len(items) <= limit:
+        return Page(items, None)
+    items = items[:limit]
+    key = key or (lambda item: (item.timestamp, item.id))
+    return Page(items, encode_cursor(*key(items[-1])))
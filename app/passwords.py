@@ -0,0 +1,143 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+
+from flask import current_app, has_app_context
+from werkzeug.security import generate_password_hash, check_password_hash
+
+
+DEFAULT_METHOD = 'scrypt'
+
+
+def _executor_class():
+    # Under gevent, threading is monkey-patched into greenlets, which would run
+    # hashes on the event loop and stall every other client; use real threads
+    try:
+        from gevent import monkey
+        if monkey.is_module_patched('threading'):
+            from gevent.threadpool import ThreadPoolExecutor as GeventThreadPoolExecutor
+            return GeventThreadPoolExecutor
+    except ImportError:
+        pass
+    return ThreadPoolExecutor
+
+
+class PasswordHasherBusy(RuntimeError):
+    """Raised when a hashing pool already has as much work queued as it allows."""
+
+
+class _Pool:
+    """A thread pool with a bounded backlog and counters for its queue depth."""
+
+    def __init__(self, name, workers, max_queue):
+        self.name = name
+        self.workers = workers
+        self.max_queue = max_queue
+        self._executor = _executor_class()(max_workers=workers, thread_name_prefix=f'password-{name}')
+        self._slots = threading.BoundedSemaphore(workers + max_queue)
+        self._lock = threading.Lock()
+        self._queued = 0
+        self._active = 0
+        self.rejected = 0
+
+    def run(self, func, *args, timeout=None):
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self.rejected += 1
+            raise PasswordHasherBusy(f"Password {self.name} pool is saturated")
+        with self._lock:
+            self._queued += 1
+        # On timeout the job still runs and releases its own slot afterwards
+        future = self._executor.submit(self._call, func, args)
+        try:
+            return future.result(timeout=timeout)
+        except FutureTimeoutError as e:
+            with self._lock:
+                self.rejected += 1
+            raise PasswordHasherBusy(f"Password {self.name} pool did not answer within {timeout}s") from e
+
+    def _call(self, func, args):
+        with self._lock:
+            self._queued -= 1
+            self._active += 1
+        try:
+            return func(*args)
+        finally:
+            with self._lock:
+                self._active -= 1
+            self._slots.release()
+
+    def stats(self):
+        with self._lock:
+            return {
+                'workers': self.workers,
+                'active': self._active,
+                'queued': self._queued,
+                'rejected': self.rejected,
+            }
+
+
+class PasswordHasher:
+    """Hashes and verifies passwords on bounded thread pools.
+
+    hashlib's scrypt and PBKDF2 release the GIL, so the pools run hashes in
+    parallel while capping how much CPU password work can take from the rest
+    of the app. Verification (logins) and hashing (sign-ups, password
+    changes) have separate pools so login throughput can be tuned on its
+    own. When a pool's backlog is full, calls fail fast with
+    ``PasswordHasherBusy`` rather than piling up request threads.
+
+    ``method`` is any werkzeug method string, e.g. ``'scrypt'`` or
+    ``'pbkdf2:sha256:600000'``; hashes made with other parameters are
+    reported as needing a rehash on the next successful login.
+    """
+
+    def __init__(self, method=DEFAULT_METHOD, hash_workers=2, verify_workers=4, max_queue=32, timeout=10):
+        self.method = method
+        self.timeout = timeout
+        self._hash_pool = _Pool('hash', hash_workers, max_queue)
+        self._verify_pool = _Pool('verify', verify_workers, max_queue)
+        # werkzeug fills in default parameters, so learn the full prefix it writes
+        self.method_prefix = generate_password_hash('', method=method).split('$', 1)[0]
+
+    def hash(self, password):
+        return self._hash_pool.run(generate_password_hash, password, self.method, timeout=self.timeout)
+
+    def verify(self, password_hash, password):
+        """Return ``(matches, needs_rehash)`` for a stored hash."""
+        if not password_hash:
+            return False, False
+        matches = self._verify_pool.run(check_password_hash, password_hash, password, timeout=self.timeout)
+        return matches, matches and self.needs_rehash(password_hash)
+
+    def needs_rehash(self, password_hash):
+        return password_hash.split('$', 1)[0] != self.method_prefix
+
+    def stats(self):
+        return {'hash': self._hash_pool.stats(), 'verify': self._verify_pool.stats()}
+
+
+def get_hasher():
+    """Return the current app's password hasher, creating it on first use."""
+    if 'password_hasher' not in current_app.extensions:
+        config = current_app.config
+        current_app.extensions['password_hasher'] = PasswordHasher(
+            method=config.get('PASSWORD_HASH_METHOD', DEFAULT_METHOD),
+            hash_workers=config.get('PASSWORD_HASH_WORKERS', 2),
+            verify_workers=config.get('PASSWORD_VERIFY_WORKERS', 4),
+            max_queue=config.get('PASSWORD_HASH_MAX_QUEUE', 32),
+            timeout=config.get('PASSWORD_HASH_TIMEOUT', 10),
+        )
+    return current_app.extensions['password_hasher']
+
+
+def hash_password(password):
+    # Outside an app (e.g. a one-off script) there is no pool; hash inline
+    if not has_app_context():
+        return generate_password_hash(password, method=DEFAULT_METHOD)
+    return get_hasher().hash(password)
+
+
+def verify_password(password_hash, password):
+    if not has_app_context():
+        return (check_password_hash(password_hash, password), False) if password_hash else (False, False)
+    return get_hasher().verify(password_hash, password)
@@ -1,28 +1,55 @@
-from flask import Blueprint, render_template, request, jsonify, redirect, url_for, flash, session
+from flask import Blueprint, render_template, request, jsonify, redirect, url_for, flash, abort
 from flask_login import login_user, logout_user, login_required, current_user
-from app.models import User, Artisan, Message, Favorite, JobPost, JobApplication
+from app.models import User, Artisan, Message, Favorite, JobPost, JobApplication, Conversation, Notification
 from werkzeug.security import check_password_hash
-from werkzeug.utils import secure_filename
+from werkzeug.exceptions import HTTPException, RequestEntityTooLarge
 from flask import current_app
 from app import db
 from flask_wtf import FlaskForm, CSRFProtect
 from wtforms import TextAreaField, StringField, PasswordField, FloatField
 from wtforms.validators import DataRequired, Email, Length, ValidationError, Optional
-from app.models import Review
+from app.models import MessageArchive, Review
 from email_validator import validate_email, EmailNotValidError
 from app.forms import ContactForm, UploadForm, MessageForm, JobPostForm
-from collections import defaultdict
+from app.geo import artisan_index, job_index
+from app.search import artisan_search, job_search
+from app.feed import rank_jobs
+from app.events import get_broker, publish, format_sse
+from app.notifications import create_notification, notify_favoriters, mark_read, unread_count, unread_counter
+from app.pagination import Page, encode_cursor, keyset_page, page_size
+from app.database import read_only
+from app.cache import cached
+from app.passwords import PasswordHasherBusy
+from app.uploads import InvalidImage, UploadTooLarge, generate_variants, save_upload, verify_image
 from flask_wtf.csrf import validate_csrf, CSRFError
+from datetime import datetime
 import logging
 import re
 import os
-import math
+import queue
 import sqlalchemy as sa
+from sqlalchemy.orm import joinedload, contains_eager
 
 main = Blueprint('main', __name__)
-logging.basicConfig(level=logging.DEBUG)
 logger = logging.getLogger(__name__)
 
+SEARCH_RADIUS_KM = 30
+SEARCH_MAX_RADIUS_KM = 500
+SEARCH_DEFAULT_LIMIT = 100
+SEARCH_MAX_LIMIT = 500
+MESSAGE_POLL_LIMIT = 100
+CONVERSATION_LIST_LIMIT = 50
+CHAT_HISTORY_LIMIT = 50
+JOBS_PAGE_SIZE = 20
+JOBS_SEARCH_LIMIT = 50
+JOB_FEED_SIZE = 20
+REVIEWS_PAGE_SIZE = 50
+FAVORITES_PAGE_SIZE = 50
+NOTIFICATIONS_PAGE_SIZE = 20
+MARK_READ_MAX_IDS = 500
+EVENT_STREAM_HEARTBEAT_SECONDS = 15
+LONG_POLL_MAX_SECONDS = 30
+
 # Helper function to validate email format (basic check)
 def is_valid_email(email):
     try:
@@ -50,61 +77,178 @@ def safe_commit():
         db.session.rollback()
         raise e
 
+# Helper function to detect fetch()/XHR requests that expect JSON back
+def wants_json():
+    return request.headers.get('X-Requested-With') == 'XMLHttpRequest'
+
+def message_to_dict(msg):
+    return {
+        'id': msg.id,
+        'sender_id': msg.sender_id,
+        'recipient_id': msg.recipient_id,
+        'content': msg.content,
+        'is_mine': msg.sender_id == current_user.id,
+        'timestamp': msg.timestamp.strftime('%Y-%m-%d %H:%M:%S') if msg.timestamp else None,
+        'display_time': msg.timestamp.strftime('%b %d, %I:%M %p') if msg.timestamp else ''
+    }
+
+# Helper function for the artisan fields shared by search and favorites results
+def artisan_summary(artisan):
+    average = artisan.average_rating
+    return {
+        'name': artisan.user.name,
+        'skills': artisan.skills,
+        'location': artisan.location,
+        'profile_pic': artisan.user.avatar_url or 'https://via.placeholder.com/150',
+        'average_rating': round(average, 2) if average is not None else None,
+        'review_count': artisan.rating_count
+    }
+
+# Helper function to load search hits by id, keeping the ranking order of ``ids``
+def load_ranked(query, model, ids):
+    rows = {row.id: row for row in query.filter(model.id.in_(ids)).all()} if ids else {}
+    return [rows[i] for i in ids if i in rows]
+
+# Helper function to read the keyset page requested by ?before=<cursor>&limit=N
+def request_page(query, timestamp_col, id_col, default_limit, key=None):
+    try:
+        return keyset_page(
+            query, timestamp_col, id_col,
+            cursor=request.args.get('before'),
+            limit=page_size(request.args.get('limit', type=int), default_limit),
+            key=key
+        )
+    except ValueError:
+        abort(400, description='Invalid pagination cursor.')
+
+# Helper function for JSON list endpoints: the body stays a list, the next page is in the headers
+def paginated_json(payload, page, endpoint, **values):
+    response = jsonify(payload)
+    if page.next_cursor:
+        response.headers['X-Next-Cursor'] = page.next_cursor
+        response.headers['Link'] = f'<{url_for(endpoint, before=page.next_cursor, **values)}>; rel="next"'
+    return response
+
+# Helper function to list a user's conversations and their partners from the summary table
+def load_conversations(user_id, cursor=None, limit=CONVERSATION_LIST_LIMIT):
+    try:
+        page = keyset_page(
+            Conversation.for_user(user_id).order_by(None), Conversation.last_message_at, Conversation.id,
+            cursor, limit, key=lambda c: (c.last_message_at, c.id)
+        )
+    except ValueError:
+        abort(400, description='Invalid pagination cursor.')
+    partner_ids = [c.partner_id(user_id) for c in page.items]
+    participants = {user.id: user for user in User.query.filter(User.id.in_(partner_ids)).all()}
+    return page, participants
+
+# Helper function returning a page of messages with one partner, oldest first.
+# Messages moved to message_archive by `flask archive-messages` are merged in on the same keyset.
+def chat_history_page(user_id, partner_id, cursor=None, limit=CHAT_HISTORY_LIMIT):
+    try:
+        pages = [
+            keyset_page(model.between(user_id, partner_id), model.timestamp, model.id, cursor, limit)
+            for model in (Message, MessageArchive)
+        ]
+    except ValueError:
+        abort(400, description='Invalid pagination cursor.')
+    items = sorted(pages[0].items + pages[1].items, key=lambda m: (m.timestamp or datetime.min, m.id), reverse=True)
+    next_cursor = None
+    if len(items) > limit or any(page.next_cursor for page in pages):
+        items = items[:limit]
+        next_cursor = encode_cursor(items[-1].timestamp, items[-1].id)
+    return Page(items[::-1], next_cursor)
+
+# Push a hint to the recipient's open streams; clients fetch the message itself
+def publish_message_event(msg):
+    publish(msg.recipient_id, 'message', {
+        'id': msg.id,
+        'sender_id': msg.sender_id,
+        'sender_name': current_user.name
+    })
+
+# Helper function to persist a password hash that check_password upgraded to the current parameters
+def save_rehashed_password(user):
+    if not db.session.is_modified(user):
+        return
+    try:
+        safe_commit()
+    except Exception as e:
+        # The old hash still works, so a failed upgrade must not fail the login
+        logger.error(f"Could not save rehashed password for user {user.id}: {str(e)}")
+
 # Helper function for file upload validation
 def allowed_file(filename):
     ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'gif'}
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
+@main.errorhandler(PasswordHasherBusy)
+def password_hasher_busy(e):
+    logger.warning(f"Rejected {request.path}: {str(e)}")
+    message = 'The server is busy, please try again in a moment.'
+    if request.is_json or wants_json():
+        return jsonify({'success': False, 'message': message}), 503, {'Retry-After': '1'}
+    flash(message, 'error')
+    # Back to the form the request came from (login, registration, profile), not always the login page
+    return redirect(request.referrer or url_for('main.index'))
+
+@main.errorhandler(RequestEntityTooLarge)
+def request_too_large(e):
+    message = f"Uploads must be {current_app.config['MAX_CONTENT_LENGTH'] // (1024 * 1024)} MB or smaller."
+    if request.is_json or wants_json():
+        return jsonify({'success': False, 'message': message}), 413
+    flash(message, 'error')
+    return redirect(request.referrer or url_for('main.index'))
+
 @main.route('/')
+@cached(anonymous_only=True)
 def index():
     return render_template('index.html')
 
 @main.route('/search', methods=['GET'])
+@cached('artisan', 'review', 'user')
+@read_only
 def search():
     lat = request.args.get('lat', type=float)
     lng = request.args.get('lng', type=float)
     location = request.args.get('location', '').strip()
+    query_text = request.args.get('q', '').strip()
+    sort = request.args.get('sort', '')
+    limit = request.args.get('limit', SEARCH_DEFAULT_LIMIT, type=int)
+    limit = min(max(limit, 1), SEARCH_MAX_LIMIT)
     try:
         if lat is not None and lng is not None:
-            # Location-based search using Haversine formula (within 30km radius)
-            def haversine(lat1, lon1, lat2, lon2):
-                R = 6371  # Earth radius in km
-                phi1, phi2 = math.radians(lat1), math.radians(lat2)
-                dphi = math.radians(lat2 - lat1)
-                dlambda = math.radians(lon2 - lon1)
-                a = math.sin(dphi/2)**2 + math.cos(phi1)*math.cos(phi2)*math.sin(dlambda/2)**2
-                return R * 2 * math.atan2(math.sqrt(a), math.sqrt(1 - a))
-            artisans = Artisan.query.join(User).all()
+            # Location-based search against the in-memory coordinate index
+            radius_km = request.args.get('radius_km', SEARCH_RADIUS_KM, type=float)
+            radius_km = min(max(radius_km, 0), SEARCH_MAX_RADIUS_KM)
+            hits = artisan_index().nearest(lat, lng, radius_km=radius_km, limit=limit)
+            artisans = {
+                a.id: a for a in Artisan.query.options(joinedload(Artisan.user))
+                .filter(Artisan.id.in_([artisan_id for artisan_id, _ in hits])).all()
+            }
             result = []
-            for a in artisans:
-                if hasattr(a, 'latitude') and hasattr(a, 'longitude') and a.latitude and a.longitude:
-                    dist = haversine(lat, lng, a.latitude, a.longitude)
-                    if dist <= 30:  # 30km radius
-                        result.append({
-                            'id': a.id,
-                            'name': a.user.name,
-                            'skills': a.skills,
-                            'location': a.location,
-                            'profile_pic': a.user.profile_pic or 'https://via.placeholder.com/150',
-                            'distance_km': round(dist, 2)
-                        })
-            # Sort by distance
-            result.sort(key=lambda x: x['distance_km'])
-            return jsonify(result)
-        elif location:
-            artisans = Artisan.query.join(User).filter(Artisan.location.ilike(f'%{location}%')).all()
-            result = [
-                {
-                    'id': a.id,
-                    'name': a.user.name,
-                    'skills': a.skills,
-                    'location': a.location,
-                    'profile_pic': a.user.profile_pic or 'https://via.placeholder.com/150'
-                } for a in artisans
-            ]
-            return jsonify(result)
+            # Hits are already sorted by distance
+            for artisan_id, dist in hits:
+                a = artisans.get(artisan_id)
+                if a is None:
+                    continue
+                result.append({'id': a.id, **artisan_summary(a), 'distance_km': round(dist, 2)})
+        elif query_text or location:
+            # Ranked full-text search; ?location= terms only match the artisan's location.
+            # sort=rating orders every match by rating in the index query, before the limit
+            ids = artisan_search.search(
+                db.session.connection(), query_text, limit=limit, location=location,
+                order='rating' if sort == 'rating' else None
+            )
+            artisans = load_ranked(Artisan.query.options(joinedload(Artisan.user)), Artisan, ids)
+            result = [{'id': a.id, **artisan_summary(a)} for a in artisans]
         else:
             return jsonify([]), 400
+        if sort == 'rating' and lat is not None and lng is not None:
+            # The coordinate index has no ratings, so this re-ranks the nearest matches within the radius;
+            # a stable sort keeps the nearest first among equal ratings
+            result.sort(key=lambda r: (r['average_rating'] is None, -(r['average_rating'] or 0)))
+        return jsonify(result)
     except Exception as e:
         logger.error(f"Search error: {str(e)}")
         return jsonify({'error': str(e)}), 500
@@ -112,25 +256,7 @@ def search():
 @main.route('/check_login', methods=['GET'])
 def check_login():
     try:
-        # Safely handle current_user
-        user_state = {
-            'is_authenticated': False,
-            'id': None
-        }
-        if hasattr(current_user, 'is_authenticated'):
-            user_state['is_authenticated'] = bool(current_user.is_authenticated)  # Explicitly convert to bool
-        if hasattr(current_user, 'id'):
-            user_state['id'] = current_user.id
-
-        # Safely handle session
-        session_info = {}
-        for key, value in session.items():
-            session_info[key] = str(value) if not isinstance(value, (int, str, float, bool, type(None))) else value
-
-        logger.debug(f"Checking login, user_state: {user_state}, session_info: {dict(session_info)}")  # Convert to dict for safety
-        response = {'is_authenticated': user_state['is_authenticated']}
-        logger.debug(f"Check login response: {response}")
-        return jsonify(response)
+        return jsonify({'is_authenticated': bool(current_user.is_authenticated)})
     except Exception as e:
         logger.error(f"Error in check_login: {str(e)}", exc_info=True)
         return jsonify({'error': 'Server error', 'details': str(e)}), 500
@@ -145,14 +271,15 @@ def contact_artisan(artisan_id):
             content = form.message.data
             message = Message(sender_id=current_user.id, recipient_id=artisan.user_id, content=content)
             db.session.add(message)
-            safe_commit()
-            # Notify artisan of new message
+            # Notify artisan of new message; written by the same commit as the message
             create_notification(
-                user_id=artisan.user_id,
+                artisan.user_id,
                 notif_type='message',
                 message=f'New message from {current_user.name}',
                 url=url_for('main.messages', _external=True)
             )
+            safe_commit()
+            publish_message_event(message)
             flash('Message sent successfully!', 'success')
             return redirect(url_for('main.user_dashboard'))
         except Exception as e:
@@ -203,8 +330,6 @@ def register():
             return jsonify({'success': False, 'message': 'Invalid email format.'}), 400
         if not is_strong_password(password):
             return jsonify({'success': False, 'message': 'Password must be at least 8 characters long and include uppercase, lowercase, and numbers.'}), 400
-        if User.query.filter_by(email=email).first():
-            return jsonify({'success': False, 'message': 'Email already registered.'}), 400
 
         user = User(
             email=email,
@@ -215,19 +340,28 @@ def register():
         )
         user.set_password(password)
         db.session.add(user)
-        safe_commit()
-
         if account_type == 'artisan':
-            artisan = Artisan(user_id=user.id, skills=trade, location=location)
+            artisan = Artisan(user=user, skills=trade, location=location)
             if latitude and longitude:
-                artisan.latitude = float(latitude)
-                artisan.longitude = float(longitude)
+                artisan.set_coordinates(float(latitude), float(longitude))
             db.session.add(artisan)
+
+        # One transaction for both rows; the unique index on email rejects duplicates, even concurrent ones
+        try:
             safe_commit()
+        except sa.exc.IntegrityError:
+            # Driver error texts differ; whether the email now exists is what tells a duplicate apart
+            if db.session.execute(db.select(User.id).filter_by(email=email)).first() is None:
+                raise
+            return jsonify({'success': False, 'message': 'Email already registered.'}), 400
+        if account_type == 'artisan':
+            artisan_index().invalidate()
 
         login_user(user)
         message = 'Registered as artisan successfully' if account_type == 'artisan' else 'Registered as user successfully'
         return jsonify({'success': True, 'message': message})
+    except PasswordHasherBusy:
+        raise
     except Exception as e:
         db.session.rollback()
         logger.error(f"Registration error: {str(e)}", exc_info=True)
@@ -248,11 +382,14 @@ def login_page():
                     return jsonify({'message': 'Invalid email or password'}), 401
                 user = User.query.filter_by(email=email).first()
                 if user and user.check_password(password):
+                    save_rehashed_password(user)
                     login_user(user)
-                    logger.debug(f"Login successful, user: {user}, session: {session}")
+                    logger.debug(f"Login successful, user: {user.id}")
                     redirect_url = '/user_dashboard' if not user.is_artisan else '/artisan_dashboard'
                     return jsonify({'message': 'Login successful', 'redirect_url': redirect_url})
                 return jsonify({'message': 'Invalid email or password'}), 401
+            except PasswordHasherBusy:
+                raise
             except Exception as e:
                 logger.error(f"Login error: {str(e)}", exc_info=True)
                 return jsonify({'message': f'Login error: {str(e)}'}), 500
@@ -265,8 +402,9 @@ def login_page():
             user = User.query.filter_by(email=email).first()
             if user:
                 if user.check_password(password):
+                    save_rehashed_password(user)
                     login_user(user)
-                    logger.debug(f"Login successful, user: {user}, session: {session}")
+                    logger.debug(f"Login successful, user: {user.id}")
                     return redirect(url_for('main.user_dashboard' if not user.is_artisan else 'main.artisan_dashboard'))
                 else:
                     flash(
@@ -295,31 +433,22 @@ def logout_all():
 
 @main.route('/user_dashboard')
 @login_required
+@read_only
 def user_dashboard():
     if current_user.is_artisan:
         return redirect(url_for('main.artisan_dashboard'))
-    messages = Message.query.filter(
-        (Message.sender_id == current_user.id) | (Message.recipient_id == current_user.id)
-    ).order_by(Message.timestamp.asc()).all()
-    chat_histories = defaultdict(list)
-    for msg in messages:
-        other_id = msg.recipient_id if msg.sender_id == current_user.id else msg.sender_id
-        chat_histories[other_id].append(msg)
-    participants = {user.id: user for user in User.query.filter(User.id.in_(chat_histories.keys())).all()}
     form = MessageForm()  # <-- Add this line
     # Add jobs posted by the current user
     my_jobs = JobPost.query.filter_by(user_id=current_user.id).order_by(JobPost.timestamp.desc()).all()
     return render_template(
         'user_dashboard.html',
-        messages=messages,
-        chat_histories=chat_histories,
-        participants=participants,
         form=form,  # <-- And this
         my_jobs=my_jobs  # Pass to template
     )
 
 @main.route('/artisan_dashboard')
 @login_required
+@read_only
 def artisan_dashboard():
     if not current_user.is_artisan:
         return redirect(url_for('main.user_dashboard'))
@@ -327,25 +456,10 @@ def artisan_dashboard():
     if not artisan:
         flash('No artisan profile found. Please contact support.', 'error')
         return redirect(url_for('main.user_dashboard'))
-    # Get all messages where the artisan is sender or recipient
-    messages = Message.query.filter(
-        (Message.sender_id == current_user.id) | (Message.recipient_id == current_user.id)
-    ).order_by(Message.timestamp.asc()).all()
-
-    # Group messages by the other participant
-    chat_histories = defaultdict(list)
-    for msg in messages:
-        other_id = msg.recipient_id if msg.sender_id == current_user.id else msg.sender_id
-        chat_histories[other_id].append(msg)
-
-    participants = {user.id: user for user in User.query.filter(User.id.in_(chat_histories.keys())).all()}
     form = MessageForm()  # <-- FIXED HERE
     return render_template(
         'artisan_dashboard.html',
         artisan=artisan,
-        messages=messages,
-        chat_histories=chat_histories,
-        participants=participants,
         form=form
     )
 
@@ -370,6 +484,7 @@ def reply_message(message_id):
         )
         db.session.add(reply)
         safe_commit()
+        publish_message_event(reply)
         flash('Reply sent successfully!', 'success')
     except Exception as e:
         flash(f'Error sending reply: {str(e)}', 'error')
@@ -392,26 +507,29 @@ def upload_profile_pic():
                 return redirect(url_for('main.upload_profile_pic'))
 
             if file and allowed_file(file.filename):
-                filename = secure_filename(file.filename)
-                base, ext = os.path.splitext(filename)
-                counter = 1
-                new_filename = filename
-
-                # Define and ensure the upload folder exists
+                # allowed_file() has vetted the extension; secure_filename() would drop it from non-ASCII names
+                extension = file.filename.rsplit('.', 1)[1].lower()
                 upload_path = os.path.join(current_app.root_path, 'static', 'uploads')
-                os.makedirs(upload_path, exist_ok=True)
 
-                # Avoid filename collisions
-                while os.path.exists(os.path.join(upload_path, new_filename)):
-                    new_filename = f"{base}_{counter}{ext}"
-                    counter += 1
+                # Content-addressed storage: the name is the file's hash, so there is nothing to collide with.
+                # The stored file may be shared with other users, so a bad upload is rejected before it is
+                # published and never deleted here; anything left unreferenced goes to `flask cleanup-uploads`.
+                try:
+                    filename = save_upload(file.stream, upload_path, extension,
+                                           current_app.config['PROFILE_PIC_MAX_BYTES'], validate=verify_image)
+                    variants = generate_variants(upload_path, filename)
+                except UploadTooLarge:
+                    flash(f"Profile pictures must be {current_app.config['PROFILE_PIC_MAX_BYTES'] // (1024 * 1024)} MB or smaller.", 'error')
+                    return redirect(url_for('main.upload_profile_pic'))
+                except InvalidImage:
+                    flash('That file is not a valid image.', 'error')
+                    return redirect(url_for('main.upload_profile_pic'))
 
-                # Save the file
-                file_path = os.path.join(upload_path, new_filename)
-                file.save(file_path)
-
-                # Store the web-accessible path
-                current_user.profile_pic = url_for('static', filename=f'uploads/{new_filename}')
+                # Store the web-accessible paths
+                current_user.profile_pic = url_for('static', filename=f'uploads/{filename}')
+                current_user.profile_pic_thumb = (
+                    url_for('static', filename=f"uploads/{variants['thumb']}") if 'thumb' in variants else None
+                )
                 safe_commit()
                 flash('Profile picture uploaded successfully!', 'success')
 
@@ -424,14 +542,20 @@ def upload_profile_pic():
     return render_template('upload_profile_pic.html', form=form)
 
 @main.route('/api/reviews', methods=['GET'])
+@cached('review', 'user')
+@read_only
 def get_reviews():
     try:
-        reviews = Review.query.all()
-        return jsonify([{
+        page = request_page(
+            Review.query.options(joinedload(Review.customer)), Review.timestamp, Review.id, REVIEWS_PAGE_SIZE
+        )
+        return paginated_json([{
             'customer': r.customer.name if r.customer else 'Unknown',
             'comment': r.comment,
             'rating': r.rating
-        } for r in reviews])
+        } for r in page.items], page, 'main.get_reviews')
+    except HTTPException:
+        raise
     except sa.exc.OperationalError as e:
         logger.error(f"Database error: {str(e)}")
         return jsonify({'error': 'Database not initialized. Please run migrations.'}), 500
@@ -447,53 +571,98 @@ def favicon():
 @login_required
 def messages():
     form = MessageForm()
-    all_users = User.query.filter(User.id != current_user.id).all()
-    messages = Message.query.filter(
-        (Message.sender_id == current_user.id) | (Message.recipient_id == current_user.id)
-    ).order_by(Message.timestamp.asc()).all()
-    chat_partner_ids = set()
-    for msg in messages:
-        chat_partner_ids.add(msg.recipient_id if msg.sender_id == current_user.id else msg.sender_id)
-    chat_partners = User.query.filter(User.id.in_(chat_partner_ids)).all()
+    conversations, participants = load_conversations(current_user.id, request.args.get('before'))
+    chat_partners = [participants[c.partner_id(current_user.id)] for c in conversations.items
+                     if c.partner_id(current_user.id) in participants]
+    unread_counts = {c.partner_id(current_user.id): c.unread_for(current_user.id) for c in conversations.items}
     partner_id = request.args.get('partner_id', type=int)
     chat_history = []
+    older_cursor = None
     partner = None
     if partner_id:
-        partner = User.query.get(partner_id)
-        chat_history = [
-            msg for msg in messages
-            if (msg.sender_id == partner_id and msg.recipient_id == current_user.id) or
-               (msg.sender_id == current_user.id and msg.recipient_id == partner_id)
-        ]
+        partner = participants.get(partner_id) or db.session.get(User, partner_id)
+        chat_history, older_cursor = chat_history_page(current_user.id, partner_id)
+        if unread_counts.get(partner_id):
+            Conversation.mark_read(current_user.id, partner_id)
+            safe_commit()
+            unread_counts[partner_id] = 0
     # AJAX partial for polling
     if request.args.get('ajax'):
-        return render_template('partials/_message_list.html', chat_history=chat_history, partner=partner)
+        return render_template('_message_list.html', chat_history=chat_history, partner=partner)
     return render_template(
         'messages.html',
         chat_partners=chat_partners,
+        unread_counts=unread_counts,
+        next_conversations_cursor=conversations.next_cursor,
         partner=partner,
         chat_history=chat_history,
-        form=form,
-        all_users=all_users
+        older_cursor=older_cursor,
+        form=form
+    )
+
+@main.route('/api/messages/<int:partner_id>/history', methods=['GET'])
+@login_required
+@read_only
+def message_history(partner_id):
+    # Older messages for "load older", keyset-paginated on (timestamp, id)
+    page = chat_history_page(
+        current_user.id, partner_id, request.args.get('before'),
+        page_size(request.args.get('limit', type=int), CHAT_HISTORY_LIMIT)
     )
+    return jsonify({
+        'messages': [message_to_dict(m) for m in page.items],
+        'next_cursor': page.next_cursor
+    })
+
+@main.route('/api/messages/<int:partner_id>', methods=['GET'])
+@login_required
+@read_only
+def poll_messages(partner_id):
+    # Incremental chat polling: only messages newer than the client's last seen one
+    since_id = request.args.get('since_id', type=int)
+    since_timestamp = request.args.get('since_timestamp')
+    query = Message.between(current_user.id, partner_id)
+    if since_id is not None:
+        query = query.filter(Message.id > since_id)
+    elif since_timestamp:
+        try:
+            since = datetime.strptime(since_timestamp, '%Y-%m-%d %H:%M:%S')
+        except ValueError:
+            return jsonify({'error': 'since_timestamp must be formatted as YYYY-MM-DD HH:MM:SS'}), 400
+        query = query.filter(Message.timestamp > since)
+    if since_id is None and not since_timestamp:
+        # No cursor yet: start from the latest page, returned oldest first like the incremental case
+        new_messages = query.order_by(Message.id.desc()).limit(MESSAGE_POLL_LIMIT).all()[::-1]
+    else:
+        new_messages = query.order_by(Message.id.asc()).limit(MESSAGE_POLL_LIMIT).all()
+    if any(m.sender_id == partner_id for m in new_messages):
+        Conversation.mark_read(current_user.id, partner_id)
+        safe_commit()
+    return jsonify({
+        'messages': [message_to_dict(m) for m in new_messages],
+        'last_id': new_messages[-1].id if new_messages else since_id,
+        'has_more': len(new_messages) == MESSAGE_POLL_LIMIT
+    })
 
 @main.route('/artisan_messages')
 @login_required
 def artisan_messages():
     if not current_user.is_artisan:
         return redirect(url_for('main.user_dashboard'))
-    messages = Message.query.filter(
-        (Message.sender_id == current_user.id) | (Message.recipient_id == current_user.id)
-    ).order_by(Message.timestamp.asc()).all()
-    chat_histories = defaultdict(list)
-    for msg in messages:
-        other_id = msg.recipient_id if msg.sender_id == current_user.id else msg.sender_id
-        chat_histories[other_id].append(msg)
-    participants = {user.id: user for user in User.query.filter(User.id.in_(chat_histories.keys())).all()}
+    # Most recent conversations, each with its latest messages
+    conversations, participants = load_conversations(current_user.id, request.args.get('before'))
+    chat_histories = {}
+    older_cursors = {}
+    for conversation in conversations.items:
+        other_id = conversation.partner_id(current_user.id)
+        if other_id in participants:
+            chat_histories[other_id], older_cursors[other_id] = chat_history_page(current_user.id, other_id)
     form = MessageForm()  # <-- Use MessageForm, not ReplyForm
     return render_template(
         'artisan_messages.html',
         chat_histories=chat_histories,
+        older_cursors=older_cursors,
+        next_conversations_cursor=conversations.next_cursor,
         participants=participants,
         form=form
     )
@@ -507,17 +676,24 @@ def send_message(recipient_id):
             content = form.content.data
             message = Message(sender_id=current_user.id, recipient_id=recipient_id, content=content)
             db.session.add(message)
-            safe_commit()
-            # Notify recipient of new message
+            # Notify recipient of new message; written by the same commit as the message
             create_notification(
-                user_id=recipient_id,
+                recipient_id,
                 notif_type='message',
                 message=f'New message from {current_user.name}',
                 url=url_for('main.messages', _external=True)
             )
+            safe_commit()
+            publish_message_event(message)
+            if wants_json():
+                return jsonify({'success': True, 'message': message_to_dict(message)})
             flash('Message sent!', 'success')
         except Exception as e:
+            if wants_json():
+                return jsonify({'success': False, 'message': f'Error sending message: {str(e)}'}), 500
             flash(f'Error sending message: {str(e)}', 'error')
+    elif wants_json():
+        return jsonify({'success': False, 'message': 'Message content is required.'}), 400
     return redirect(url_for('main.messages', partner_id=recipient_id))
 
 @main.route('/forgot_password')
@@ -579,17 +755,28 @@ def artisan_profile():
                     flash('Password must be at least 8 characters and include uppercase, lowercase, and numbers.', 'error')
                     return render_template('artisan_profile.html', form=form, upload_form=upload_form, artisan=artisan)
             # Update artisan skills/trade
+            services_changed = False
             if artisan:
-                artisan.skills = request.form.get('skills', artisan.skills)
+                new_skills = request.form.get('skills', artisan.skills)
+                services_changed = (new_skills, form.location.data) != (artisan.skills, artisan.location)
+                artisan.skills = new_skills
                 artisan.location = form.location.data
                 # Save latitude/longitude if provided
                 lat = request.form.get('latitude')
                 lng = request.form.get('longitude')
                 if lat and lng:
-                    artisan.latitude = float(lat)
-                    artisan.longitude = float(lng)
+                    artisan.set_coordinates(float(lat), float(lng))
             try:
                 safe_commit()
+                artisan_index().invalidate()
+                if services_changed:
+                    # Let everyone who favorited this artisan know, without holding up the response
+                    notify_favoriters(
+                        artisan.id,
+                        'favorite_update',
+                        f'{current_user.name} updated their services: {artisan.skills} in {artisan.location}',
+                        url=url_for('main.contact_artisan', artisan_id=artisan.id)
+                    )
                 flash('Profile updated successfully!', 'success')
                 return redirect(url_for('main.artisan_profile'))
             except Exception as e:
@@ -598,9 +785,13 @@ def artisan_profile():
 
 @main.route('/api/notifications', methods=['GET'])
 @login_required
+@read_only
 def get_notifications():
-    notifications = current_user.notifications.order_by(db.desc('timestamp')).limit(20).all()
-    return jsonify([
+    page = request_page(
+        Notification.query.filter_by(user_id=current_user.id),
+        Notification.timestamp, Notification.id, NOTIFICATIONS_PAGE_SIZE
+    )
+    return paginated_json([
         {
             'id': n.id,
             'type': n.type,
@@ -609,35 +800,126 @@ def get_notifications():
             'is_read': n.is_read,
             'timestamp': n.timestamp.strftime('%Y-%m-%d %H:%M:%S')
         }
-        for n in notifications
-    ])
+        for n in page.items
+    ], page, 'main.get_notifications')
+
+@main.route('/api/notifications/unread_count', methods=['GET'])
+@login_required
+@read_only
+def notification_unread_count():
+    # Served from the per-user counter cache, so the badge never loads notification rows
+    return jsonify({'unread': unread_count(current_user.id)})
 
 @main.route('/api/notifications/<int:notif_id>/read', methods=['POST'])
 @login_required
 def mark_notification_read(notif_id):
-    from app.models import Notification
     notif = Notification.query.filter_by(id=notif_id, user_id=current_user.id).first_or_404()
-    notif.is_read = True
-    safe_commit()
-    return jsonify({'success': True})
+    if not notif.is_read:
+        notif.is_read = True
+        safe_commit()
+        unread_counter().invalidate(current_user.id)
+    return jsonify({'success': True, 'unread': unread_count(current_user.id)})
 
-def create_notification(user_id, notif_type, message, url=None):
-    from app.models import Notification
-    notif = Notification(user_id=user_id, type=notif_type, message=message, url=url)
-    db.session.add(notif)
+@main.route('/api/notifications/read', methods=['POST'])
+@login_required
+def mark_notifications_read():
+    # Body: {"all": true} or {"ids": [1, 2, ...]}; either way a single UPDATE
+    data = request.get_json(silent=True) or {}
+    ids = None
+    if not data.get('all'):
+        ids = data.get('ids')
+        # bool is a subclass of int; JSON true/false are not ids
+        if not isinstance(ids, list) or not all(type(i) is int for i in ids):
+            return jsonify({'success': False, 'message': 'Provide "all": true or a list of "ids".'}), 400
+        ids = ids[:MARK_READ_MAX_IDS]
+    updated = mark_read(current_user.id, ids)
     safe_commit()
+    unread_counter().invalidate(current_user.id)
+    return jsonify({'success': True, 'updated': updated, 'unread': unread_count(current_user.id)})
+
+# Helper function to refuse a new stream or long poll once this process holds EVENT_STREAM_MAX_CLIENTS
+def stream_slots_full(broker):
+    limit = current_app.config.get('EVENT_STREAM_MAX_CLIENTS')
+    return limit is not None and broker.subscriber_count() >= limit
+
+def stream_unavailable():
+    # EventSource gives up on a non-200 response; pages keep working through their regular polling
+    response = jsonify({'error': 'Too many open event streams; poll instead.'})
+    response.status_code = 503
+    response.headers['Retry-After'] = str(LONG_POLL_MAX_SECONDS)
+    return response
+
+@main.route('/api/stream', methods=['GET'])
+@login_required
+def event_stream():
+    # Server-Sent Events channel for new messages and notifications
+    broker = get_broker()
+    if stream_slots_full(broker):
+        return stream_unavailable()
+    user_id = current_user.id
+    q = broker.subscribe(user_id)
+
+    def generate():
+        yield 'retry: 3000\n\n'
+        # Tells pages whether this stream also carries events published by other workers
+        yield format_sse('ready', {'shared': broker.shared})
+        while True:
+            try:
+                event, data = q.get(timeout=EVENT_STREAM_HEARTBEAT_SECONDS)
+            except queue.Empty:
+                yield ': keep-alive\n\n'
+                continue
+            yield format_sse(event, data)
+
+    response = current_app.response_class(generate(), mimetype='text/event-stream')
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'
+    response.call_on_close(lambda: broker.unsubscribe(user_id, q))
+    return response
+
+@main.route('/api/events', methods=['GET'])
+@login_required
+def poll_events():
+    # Long-poll fallback for clients without EventSource support
+    timeout = min(max(request.args.get('timeout', 25, type=float), 0), LONG_POLL_MAX_SECONDS)
+    broker = get_broker()
+    if stream_slots_full(broker):
+        return stream_unavailable()
+    user_id = current_user.id
+    q = broker.subscribe(user_id)
+    # Don't hold a database connection while waiting
+    db.session.close()
+    events = []
+    try:
+        try:
+            events.append(q.get(timeout=timeout))
+        except queue.Empty:
+            pass
+        while True:
+            try:
+                events.append(q.get_nowait())
+            except queue.Empty:
+                break
+    finally:
+        broker.unsubscribe(user_id, q)
+    return jsonify([{'event': event, 'data': data} for event, data in events])
 
 @main.route('/favorite/<int:artisan_id>', methods=['POST'])
 @login_required
 def add_favorite(artisan_id):
     if current_user.is_artisan:
         return jsonify({'success': False, 'message': 'Artisans cannot favorite.'})
-    existing = Favorite.query.filter_by(user_id=current_user.id, artisan_id=artisan_id).first()
-    if existing:
-        return jsonify({'success': False, 'message': 'Already favorited.'})
+    if db.session.get(Artisan, artisan_id) is None:
+        return jsonify({'success': False, 'message': 'Artisan not found.'}), 404
+    # The unique index on (user_id, artisan_id) rejects duplicates, even concurrent ones
     fav = Favorite(user_id=current_user.id, artisan_id=artisan_id)
     db.session.add(fav)
-    safe_commit()
+    try:
+        safe_commit()
+    except sa.exc.IntegrityError:
+        if Favorite.query.filter_by(user_id=current_user.id, artisan_id=artisan_id).first() is None:
+            raise
+        return jsonify({'success': False, 'message': 'Already favorited.'})
     return jsonify({'success': True, 'message': 'Artisan favorited.'})
 
 @main.route('/unfavorite/<int:artisan_id>', methods=['POST'])
@@ -652,26 +934,65 @@ def remove_favorite(artisan_id):
 
 @main.route('/favorites', methods=['GET'])
 @login_required
+@read_only
 def list_favorites():
-    favorites = Favorite.query.filter_by(user_id=current_user.id).all()
-    result = [
-        {
-            'artisan_id': fav.artisan_id,
-            'name': fav.artisan.user.name,
-            'skills': fav.artisan.skills,
-            'location': fav.artisan.location,
-            'profile_pic': fav.artisan.user.profile_pic or 'https://via.placeholder.com/150'
-        }
-        for fav in favorites
-    ]
-    return jsonify(result)
+    query = Favorite.query.filter_by(user_id=current_user.id)
+    if request.args.get('sort') == 'rating':
+        # Ratings change under a cursor, so this ordering returns the top favorites without paging
+        favorites = (
+            query.join(Favorite.artisan)
+            .options(contains_eager(Favorite.artisan).joinedload(Artisan.user))
+            .order_by(Artisan.average_rating.desc().nulls_last(), Artisan.rating_count.desc(), Favorite.id.desc())
+            .limit(page_size(request.args.get('limit', type=int), FAVORITES_PAGE_SIZE))
+            .all()
+        )
+        return jsonify([{'artisan_id': fav.artisan_id, **artisan_summary(fav.artisan)} for fav in favorites])
+    page = request_page(
+        query.options(joinedload(Favorite.artisan).joinedload(Artisan.user)),
+        Favorite.timestamp, Favorite.id, FAVORITES_PAGE_SIZE
+    )
+    result = [{'artisan_id': fav.artisan_id, **artisan_summary(fav.artisan)} for fav in page.items]
+    return paginated_json(result, page, 'main.list_favorites')
 
 # --- JOB BOARD ROUTES ---
 
 @main.route('/jobs')
+@cached('job_post', 'user', anonymous_only=True)
+@read_only
 def list_jobs():
-    jobs = JobPost.query.order_by(JobPost.timestamp.desc()).all()
-    return render_template('jobs.html', jobs=jobs)
+    query_text = request.args.get('q', '').strip()
+    if query_text:
+        ids = job_search.search(db.session.connection(), query_text, limit=JOBS_SEARCH_LIMIT)
+        jobs = load_ranked(JobPost.query.options(joinedload(JobPost.user)), JobPost, ids)
+        return render_template('jobs.html', jobs=jobs, next_cursor=None, q=query_text)
+    page = request_page(JobPost.query.options(joinedload(JobPost.user)), JobPost.timestamp, JobPost.id, JOBS_PAGE_SIZE)
+    return render_template('jobs.html', jobs=page.items, next_cursor=page.next_cursor)
+
+@main.route('/jobs/feed')
+@login_required
+@read_only
+def job_feed():
+    # Jobs ranked for the current artisan by distance, skill match and recency
+    if not current_user.is_artisan:
+        if wants_json():
+            return jsonify({'error': 'Only artisans have a job feed'}), 403
+        return redirect(url_for('main.list_jobs'))
+    artisan = Artisan.query.filter_by(user_id=current_user.id).first_or_404()
+    limit = page_size(request.args.get('limit', type=int), JOB_FEED_SIZE)
+    ranked = rank_jobs(artisan, limit=limit)
+    jobs = load_ranked(JobPost.query.options(joinedload(JobPost.user)), JobPost, [job_id for job_id, _, _ in ranked])
+    distances = {job_id: distance for job_id, _, distance in ranked}
+    if wants_json():
+        return jsonify([{
+            'id': job.id,
+            'title': job.title,
+            'location': job.location,
+            'budget': job.budget,
+            'timestamp': job.timestamp.strftime('%Y-%m-%d %H:%M:%S') if job.timestamp else None,
+            'distance_km': round(distances[job.id], 2) if distances.get(job.id) is not None else None,
+            'url': url_for('main.job_detail', job_id=job.id)
+        } for job in jobs])
+    return render_template('jobs.html', jobs=jobs, next_cursor=None, feed=True, distances=distances)
 
 @main.route('/jobs/new', methods=['GET', 'POST'])
 @login_required
@@ -692,19 +1013,28 @@ def create_job():
             budget=budget_clean,
             user_id=current_user.id
         )
+        try:
+            if form.latitude.data and form.longitude.data:
+                job.set_coordinates(float(form.latitude.data), float(form.longitude.data))
+        except ValueError:
+            logger.warning(f"Ignoring invalid job coordinates: {form.latitude.data}, {form.longitude.data}")
         db.session.add(job)
         db.session.commit()
+        job_index().invalidate()
         flash('Job posted successfully!', 'success')
         return redirect(url_for('main.list_jobs'))
     return render_template('create_job.html', form=form)
 
 @main.route('/jobs/<int:job_id>', methods=['GET'])
 @login_required
+@read_only
 def job_detail(job_id):
-    job = JobPost.query.get_or_404(job_id)
+    job = JobPost.query.options(joinedload(JobPost.user)).filter_by(id=job_id).first_or_404()
     applicants = None
     if current_user.id == job.user_id:
-        applicants = JobApplication.query.filter_by(job_post_id=job.id).all()
+        applicants = JobApplication.query.filter_by(job_post_id=job.id).options(
+            joinedload(JobApplication.artisan).joinedload(Artisan.user)
+        ).all()
     return render_template('job_detail.html', job=job, applicants=applicants)
 
 @main.route('/jobs/<int:job_id>/apply', methods=['POST'])
@@ -715,24 +1045,31 @@ def apply_to_job(job_id):
     if job.user_id == current_user.id:
         flash('You cannot apply to your own job.', 'warning')
         return redirect(url_for('main.job_detail', job_id=job_id))
-    # Prevent duplicate applications
-    existing = JobApplication.query.filter_by(job_post_id=job_id, artisan_id=current_user.id).first()
-    if existing:
-        flash('You have already applied to this job.', 'info')
+    # Applications reference artisan.id, which is not the user's id
+    artisan = Artisan.query.filter_by(user_id=current_user.id).first()
+    if not artisan:
+        flash('Only artisans can apply to jobs.', 'warning')
         return redirect(url_for('main.job_detail', job_id=job_id))
     application = JobApplication(
         job_post_id=job_id,
-        artisan_id=current_user.id,
+        artisan_id=artisan.id,
         message=request.form.get('message', '')
     )
     db.session.add(application)
-    db.session.commit()
-    # --- Notification for job owner ---
+    # --- Notification for job owner, written by the same commit as the application ---
     create_notification(
-        user_id=job.user_id,
+        job.user_id,
         notif_type='job_application',
         message=f'New application from {current_user.name} for your job: {job.title}',
         url=url_for('main.job_detail', job_id=job.id)
     )
+    # Prevent duplicate applications via the unique (job_post_id, artisan_id) index
+    try:
+        safe_commit()
+    except sa.exc.IntegrityError:
+        if JobApplication.query.filter_by(job_post_id=job_id, artisan_id=artisan.id).first() is None:
+            raise
+        flash('You have already applied to this job.', 'info')
+        return redirect(url_for('main.job_detail', job_id=job_id))
     flash('Application submitted!', 'success')
     return redirect(url_for('main.job_detail', job_id=job_id))
@@ -0,0 +1,238 @@
+import re
+
+import sqlalchemy as sa
+
+# Longest query we turn into search terms; anything past this is ignored
+MAX_QUERY_TERMS = 8
+# Text search configuration for PostgreSQL. 'simple' does no stemming, which
+# suits names, trades and place names and keeps prefix matches predictable.
+PG_TEXT_CONFIG = 'simple'
+
+
+def query_terms(text):
+    """Split free text into lowercase word terms, dropping search operators."""
+    return re.findall(r'\w+', (text or '').lower())[:MAX_QUERY_TERMS]
+
+
+class SearchIndex:
+    """Ranked full-text index for one model, stored in a companion table.
+
+    The table is keyed by the model's id: an FTS5 virtual table (rowid = id)
+    on SQLite, or ``(id, document tsvector)`` with a GIN index on PostgreSQL.
+    ``fields`` maps each indexed field to a distinct weight letter (A-D),
+    which also identifies the field in PostgreSQL queries;
+    ``documents(ids=None)`` returns a select of ``(id, field, ...)`` rows
+    used to (re)build entries. On other databases search falls back to
+    unranked LIKE matching over the same documents.
+
+    ``orderings`` names alternative sort orders as ``(table, expression)``:
+    the model table joined on id and a SQL expression over its columns,
+    sorted descending with NULLs last and relevance breaking ties. They are
+    applied in the index query, before the limit.
+    """
+
+    def __init__(self, table, fields, documents, orderings=None):
+        self.table = table
+        self.fields = fields
+        self._documents = documents
+        self.orderings = orderings or {}
+
+    # --- schema ---
+
+    def create(self, connection):
+        dialect = connection.dialect.name
+        if dialect == 'sqlite':
+            columns = ', '.join(self.fields)
+            connection.exec_driver_sql(
+                f"CREATE VIRTUAL TABLE IF NOT EXISTS {self.table} "
+                f"USING fts5({columns}, tokenize='unicode61 remove_diacritics 2')"
+            )
+        elif dialect == 'postgresql':
+            connection.exec_driver_sql(
+                f"CREATE TABLE IF NOT EXISTS {self.table} "
+                f"(id INTEGER PRIMARY KEY, document tsvector NOT NULL)"
+            )
+            connection.exec_driver_sql(
+                f"CREATE INDEX IF NOT EXISTS ix_{self.table}_document ON {self.table} USING gin (document)"
+            )
+
+    def drop(self, connection):
+        if connection.dialect.name in ('sqlite', 'postgresql'):
+            connection.exec_driver_sql(f"DROP TABLE IF EXISTS {self.table}")
+
+    # --- maintenance ---
+
+    def refresh(self, connection, ids):
+        """Re-index the rows with ``ids`` from their current database values."""
+        dialect = connection.dialect.name
+        if dialect not in ('sqlite', 'postgresql') or not ids:
+            return
+        ids = list(ids)
+        rows = connection.execute(self._documents(ids)).all()
+        self.remove(connection, ids)
+        if rows:
+            connection.execute(sa.text(self._insert_sql(dialect)), [self._row_params(row) for row in rows])
+
+    def remove(self, connection, ids):
+        dialect = connection.dialect.name
+        if dialect not in ('sqlite', 'postgresql') or not ids:
+            return
+        key = 'rowid' if dialect == 'sqlite' else 'id'
+        connection.execute(
+            sa.text(f"DELETE FROM {self.table} WHERE {key} IN :ids").bindparams(sa.bindparam('ids', expanding=True)),
+            {'ids': list(ids)}
+        )
+
+    def rebuild(self, connection, batch_size=1000):
+        """Drop every entry and re-index all rows; returns the number indexed."""
+        dialect = connection.dialect.name
+        if dialect not in ('sqlite', 'postgresql'):
+            return 0
+        connection.exec_driver_sql(f"DELETE FROM {self.table}")
+        insert = sa.text(self._insert_sql(dialect))
+        total = 0
+        result = connection.execute(self._documents().execution_options(yield_per=batch_size))
+        for rows in result.partitions():
+            connection.execute(insert, [self._row_params(row) for row in rows])
+            total += len(rows)
+        return total
+
+    def _row_params(self, row):
+        params = {'id': row.id}
+        for field in self.fields:
+            params[field] = getattr(row, field) or ''
+        return params
+
+    def _insert_sql(self, dialect):
+        if dialect == 'sqlite':
+            columns = ', '.join(self.fields)
+            values = ', '.join(f':{field}' for field in self.fields)
+            return f"INSERT INTO {self.table} (rowid, {columns}) VALUES (:id, {values})"
+        document = ' || '.join(
+            f"setweight(to_tsvector('{PG_TEXT_CONFIG}', :{field}), '{weight}')"
+            for field, weight in self.fields.items()
+        )
+        return f"INSERT INTO {self.table} (id, document) VALUES (:id, {document})"
+
+    # --- queries ---
+
+    def search(self, connection, text=None, limit=50, order=None, **field_text):
+        """Return ids matching every term, best match first.
+
+        ``text`` is matched against all fields; keyword arguments restrict
+        their terms to one field, e.g. ``location='lagos'``. Every term is a
+        prefix match, so partially typed words still find results. ``order``
+        picks one of the index's ``orderings`` to sort by instead of relevance.
+        """
+        if order is not None and order not in self.orderings:
+            raise ValueError(f"Unknown search order: {order}")
+        terms = [(None, term) for term in query_terms(text)]
+        for field, value in field_text.items():
+            if field not in self.fields:
+                raise ValueError(f"Unknown search field: {field}")
+            terms.extend((field, term) for term in query_terms(value))
+        if not terms:
+            return []
+        dialect = connection.dialect.name
+        if dialect == 'sqlite':
+            return self._search_fts5(connection, terms, limit, order)
+        if dialect == 'postgresql':
+            return self._search_tsvector(connection, terms, limit, order)
+        return self._search_like(connection, terms, limit, order)
+
+    def _ordering_sql(self, order, key):
+        """Return ``(join, order by prefix)`` SQL fragments for a named ordering."""
+        if order is None:
+            return '', ''
+        table, expression = self.orderings[order]
+        return (f" JOIN {table} ON {table}.id = {self.table}.{key}",
+                f"({expression}) IS NULL, ({expression}) DESC, ")
+
+    def _search_fts5(self, connection, terms, limit, order=None):
+        # Terms only contain word characters, so quoting them is enough to escape FTS5 syntax
+        match = ' '.join(f'{field} : "{term}"*' if field else f'"{term}"*' for field, term in terms)
+        weights = ', '.join(str(weight) for weight in self._numeric_weights())
+        join, order_by = self._ordering_sql(order, 'rowid')
+        rows = connection.execute(
+            sa.text(
+                f"SELECT {self.table}.rowid FROM {self.table}{join} WHERE {self.table} MATCH :match "
+                f"ORDER BY {order_by}bm25({self.table}, {weights}), {self.table}.rowid LIMIT :limit"
+            ),
+            {'match': match, 'limit': limit}
+        )
+        return [row[0] for row in rows]
+
+    def _search_tsvector(self, connection, terms, limit, order=None):
+        query = ' & '.join(
+            f"{term}:*{self.fields[field]}" if field else f"{term}:*" for field, term in terms
+        )
+        join, order_by = self._ordering_sql(order, 'id')
+        rows = connection.execute(
+            sa.text(
+                f"SELECT {self.table}.id FROM {self.table}{join}, to_tsquery('{PG_TEXT_CONFIG}', :query) AS query "
+                f"WHERE document @@ query ORDER BY {order_by}ts_rank(document, query) DESC, {self.table}.id "
+                f"LIMIT :limit"
+            ),
+            {'query': query, 'limit': limit}
+        )
+        return [row[0] for row in rows]
+
+    def _search_like(self, connection, terms, limit, order=None):
+        documents = self._documents().subquery()
+        conditions = []
+        for field, term in terms:
+            columns = [documents.c[field]] if field else [documents.c[name] for name in self.fields]
+            conditions.append(sa.or_(*(column.ilike(f'%{term}%') for column in columns)))
+        query = sa.select(documents.c.id).where(*conditions)
+        if order is not None:
+            table, expression = self.orderings[order]
+            query = query.join(sa.table(table, sa.column('id')), sa.literal_column(f'{table}.id') == documents.c.id)
+            query = query.order_by(sa.text(f"({expression}) IS NULL, ({expression}) DESC"))
+        rows = connection.execute(query.order_by(documents.c.id).limit(limit))
+        return [row[0] for row in rows]
+
+    def _numeric_weights(self):
+        # bm25() takes one multiplier per column; map the tsvector weight letters onto it
+        return [{'A': 10.0, 'B': 4.0, 'C': 2.0, 'D': 1.0}[weight] for weight in self.fields.values()]
+
+
+def _artisan_documents(ids=None):
+    from app.models import Artisan, User
+    artisan, user = Artisan.__table__, User.__table__
+    query = sa.select(
+        artisan.c.id, artisan.c.skills, user.c.name, artisan.c.location
+    ).select_from(artisan.join(user, artisan.c.user_id == user.c.id))
+    if ids is not None:
+        query = query.where(artisan.c.id.in_(ids))
+    return query
+
+
+def _job_documents(ids=None):
+    from app.models import JobPost
+    job = JobPost.__table__
+    query = sa.select(job.c.id, job.c.title, job.c.location, job.c.description)
+    if ids is not None:
+        query = query.where(job.c.id.in_(ids))
+    return query
+
+
+artisan_search = SearchIndex(
+    'artisan_search',
+    {'skills': 'A', 'name': 'B', 'location': 'C'},
+    _artisan_documents,
+    # Average of the running review totals; unrated artisans (rating_count 0) sort last
+    orderings={'rating': ('artisan', 'artisan.rating_sum * 1.0 / NULLIF(artisan.rating_count, 0)')},
+)
+
+job_search = SearchIndex(
+    'job_post_search',
+    {'title': 'A', 'location': 'B', 'description': 'C'},
+    _job_documents,
+)
+
+SEARCH_INDEXES = (artisan_search, job_search)
+
+
+def is_search_table(name):
+    """True for search index tables, including SQLite's FTS5 shadow tables."""
+    return any(name == index.table or name.startswith(f'{index.table}_') for index in SEARCH_INDEXES)
@@ -6,8 +6,8 @@ document.addEventListener('DOMContentLoaded', () => {
     const searchButton = document.getElementById('searchButton');
     if (searchButton) {
         searchButton.addEventListener('click', function () {
-            const location = document.getElementById('locationInput').value;
-            fetch(`/search?location=${encodeURIComponent(location)}`)
+            const query = document.getElementById('locationInput').value;
+            fetch(`/search?q=${encodeURIComponent(query)}`)
                 .then(async response => {
                     let data;
                     try {
@@ -119,15 +119,19 @@ window.addEventListener('DOMContentLoaded', () => {
   document.body.classList.add('loaded');
 });
 
-function fetchReviews() {
-    fetch('/api/reviews')
-        .then(response => response.json())
-        .then(data => displayReviews(data));
+function fetchReviews(cursor) {
+    fetch('/api/reviews' + (cursor ? `?before=${encodeURIComponent(cursor)}` : ''))
+        .then(response => {
+            const nextCursor = response.headers.get('X-Next-Cursor');
+            return response.json().then(data => displayReviews(data, !cursor, nextCursor));
+        });
 }
 
-function displayReviews(reviews) {
+function displayReviews(reviews, replace = true, nextCursor = null) {
     const grid = document.getElementById('reviewsGrid');
-    grid.innerHTML = '';
+    if (replace) grid.innerHTML = '';
+    const oldButton = document.getElementById('loadMoreReviews');
+    if (oldButton) oldButton.remove();
     reviews.forEach(review => {
         const card = document.createElement('div');
         card.className = 'review-card';
@@ -138,6 +142,14 @@ function displayReviews(reviews) {
         `;
         grid.appendChild(card);
     });
+    if (nextCursor) {
+        const button = document.createElement('button');
+        button.id = 'loadMoreReviews';
+        button.className = 'cta-button';
+        button.textContent = 'Load more reviews';
+        button.addEventListener('click', () => fetchReviews(nextCursor));
+        grid.after(button);
+    }
 }
 
 function renderArtisansGrid(data) {
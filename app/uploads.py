@@ -0,0 +1,103 @@
+import hashlib
+import os
+import tempfile
+
+try:
+    from PIL import Image, ImageOps, UnidentifiedImageError
+except ImportError:  # Optional; without Pillow uploads are stored but not resized
+    Image = None
+
+CHUNK_SIZE = 64 * 1024
+# Resized copies written next to every upload: name -> longest side in pixels.
+# 'thumb' backs the avatar on cards and dashboards, displayed at 120px or less.
+IMAGE_VARIANTS = {'thumb': 256}
+VARIANT_FORMAT = 'webp'
+VARIANT_QUALITY = 80
+
+
+class UploadTooLarge(ValueError):
+    """Raised when an upload grows past its size limit while being read."""
+
+
+class InvalidImage(ValueError):
+    """Raised when an upload is not an image Pillow can decode."""
+
+
+def save_upload(stream, directory, extension, max_bytes, validate=None):
+    """Stream an upload to disk under the SHA-256 of its contents.
+
+    The body is hashed while it is copied to a temporary file, and the copy
+    stops with ``UploadTooLarge`` as soon as it passes ``max_bytes``, so an
+    oversized upload is never read in full. Identical uploads map to the
+    same file, which makes name collisions impossible and re-uploads free.
+    ``validate`` is called with the temporary path before the file is moved
+    into place; if it raises, the temporary file is removed and nothing is
+    published. Returns the stored filename.
+    """
+    os.makedirs(directory, exist_ok=True)
+    digest = hashlib.sha256()
+    size = 0
+    with tempfile.NamedTemporaryFile(dir=directory, suffix='.part', delete=False) as tmp:
+        try:
+            while chunk := stream.read(CHUNK_SIZE):
+                size += len(chunk)
+                if size > max_bytes:
+                    raise UploadTooLarge(f"Upload exceeds {max_bytes} bytes")
+                digest.update(chunk)
+                tmp.write(chunk)
+            tmp.close()
+            if validate is not None:
+                validate(tmp.name)
+        except BaseException:
+            tmp.close()
+            os.unlink(tmp.name)
+            raise
+    filename = f"{digest.hexdigest()}.{extension.lower().lstrip('.')}"
+    path = os.path.join(directory, filename)
+    if os.path.exists(path):
+        os.unlink(tmp.name)
+    else:
+        os.replace(tmp.name, path)
+    return filename
+
+
+def verify_image(path):
+    """Raise ``InvalidImage`` unless ``path`` decodes as an image; a no-op without Pillow."""
+    if Image is None:
+        return
+    try:
+        with Image.open(path) as image:
+            image.load()
+    except (UnidentifiedImageError, OSError, Image.DecompressionBombError) as e:
+        raise InvalidImage(str(e)) from e
+
+
+def variant_filename(filename, variant):
+    return f"{os.path.splitext(filename)[0]}-{variant}.{VARIANT_FORMAT}"
+
+
+def generate_variants(directory, filename):
+    """Write the resized WebP copies of an uploaded image.
+
+    Returns ``{variant: filename}``; empty when Pillow is not installed.
+    Raises ``InvalidImage`` if the file does not decode as an image.
+    Variants that already exist (a re-upload of the same file) are kept.
+    """
+    if Image is None:
+        return {}
+    variants = {name: variant_filename(filename, name) for name in IMAGE_VARIANTS}
+    missing = {name: f for name, f in variants.items() if not os.path.exists(os.path.join(directory, f))}
+    if not missing:
+        return variants
+    try:
+        with Image.open(os.path.join(directory, filename)) as image:
+            # Phone photos are often stored sideways with an EXIF rotation tag
+            image = ImageOps.exif_transpose(image)
+            image = image.convert('RGBA' if image.mode in ('RGBA', 'LA', 'P') else 'RGB')
+            for name, variant in missing.items():
+                resized = image.copy()
+                resized.thumbnail((IMAGE_VARIANTS[name], IMAGE_VARIANTS[name]))
+                resized.save(os.path.join(directory, variant), VARIANT_FORMAT.upper(), quality=VARIANT_QUALITY)
+    except (UnidentifiedImageError, OSError, Image.DecompressionBombError) as e:
+        raise InvalidImage(str(e)) from e
+    return variants
@@ -0,0 +1,82 @@
+"""Scripted user journeys replayed by benchmarks/run.py.
+
+Each journey is a list of ``(step name, method, url, body)`` tuples built
+for one virtual user. Steps are named rather than keyed by URL so results
+from different users (different ids in the URLs) aggregate together.
+"""
+import random
+
+from benchmarks.seed import CITIES, PASSWORD, SKILLS, email_for
+
+
+def _login(user_id):
+    return ('login', 'POST', '/login', {'email': email_for(user_id), 'password': PASSWORD})
+
+
+def visitor(rng, data):
+    city = rng.choice(list(CITIES))
+    lat, lng = CITIES[city]
+    return [
+        ('index', 'GET', '/', None),
+        ('search_location', 'GET', f'/search?location={city}', None),
+        ('search_text', 'GET', f'/search?q={rng.choice(SKILLS).split()[0]}', None),
+        ('search_nearby', 'GET', f'/search?lat={lat}&lng={lng}&sort=rating', None),
+        ('reviews', 'GET', '/api/reviews', None),
+        ('jobs', 'GET', '/jobs', None),
+    ]
+
+
+def customer(rng, data):
+    user_id = rng.choice(data['customers'])
+    partner_id = data['partners'].get(user_id)
+    steps = [
+        _login(user_id),
+        ('user_dashboard', 'GET', '/user_dashboard', None),
+        ('unread_count', 'GET', '/api/notifications/unread_count', None),
+        ('notifications', 'GET', '/api/notifications', None),
+        ('favorites', 'GET', '/favorites', None),
+        ('messages', 'GET', '/messages?ajax=1', None),
+    ]
+    if partner_id:
+        steps += [
+            ('chat', 'GET', f'/messages?ajax=1&partner_id={partner_id}', None),
+            ('poll_messages', 'GET', f'/api/messages/{partner_id}', None),
+        ]
+    return steps + [('logout', 'GET', '/logout', None)]
+
+
+def artisan(rng, data):
+    user_id = rng.choice(data['artisans'])
+    return [
+        _login(user_id),
+        ('artisan_dashboard', 'GET', '/artisan_dashboard', None),
+        ('unread_count', 'GET', '/api/notifications/unread_count', None),
+        ('artisan_messages', 'GET', '/artisan_messages', None),
+        ('jobs', 'GET', '/jobs', None),
+        ('job_search', 'GET', f'/jobs?q={rng.choice(SKILLS).split()[0]}', None),
+        ('logout', 'GET', '/logout', None),
+    ]
+
+
+JOURNEYS = {'visitor': visitor, 'customer': customer, 'artisan': artisan}
+
+
+def sample_users(app, sample_size=200, seed=7):
+    """Pick the users journeys act as, with a chat partner for each customer."""
+    from app import db
+    from app.models import Conversation, User
+
+    rng = random.Random(seed)
+    with app.app_context():
+        artisans = db.session.execute(db.select(User.id).where(User.is_artisan == True)  # noqa: E712
+                                      .order_by(User.id).limit(sample_size * 10)).scalars().all()
+        customers = db.session.execute(db.select(User.id).where(User.is_artisan == False)  # noqa: E712
+                                       .order_by(User.id).limit(sample_size * 10)).scalars().all()
+        artisans = rng.sample(artisans, min(sample_size, len(artisans)))
+        customers = rng.sample(customers, min(sample_size, len(customers)))
+        partners = {}
+        for user_id in customers:
+            conversation = Conversation.for_user(user_id).first()
+            if conversation:
+                partners[user_id] = conversation.partner_id(user_id)
+    return {'artisans': artisans, 'customers': customers, 'partners': partners}
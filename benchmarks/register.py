@@ -0,0 +1,64 @@
+"""Measure artisan registrations per second through the /register endpoint.
+
+Runs against a throwaway SQLite file (so commits pay for real fsyncs) with
+email deliverability checks off, and a cheap password hash by default so the
+database work is what gets measured:
+
+    python benchmarks/register.py --count 500
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import email_validator  # noqa: E402
+
+from app import create_app, db  # noqa: E402
+
+
+def run(count, hash_method):
+    email_validator.CHECK_DELIVERABILITY = False
+    with tempfile.TemporaryDirectory() as tmp:
+        app = create_app({
+            'SQLALCHEMY_DATABASE_URI': f"sqlite:///{os.path.join(tmp, 'bench.db')}",
+            'WTF_CSRF_ENABLED': False,
+            'PASSWORD_HASH_METHOD': hash_method,
+        })
+        with app.app_context():
+            db.create_all()
+        client = app.test_client()
+        start = time.perf_counter()
+        for i in range(count):
+            response = client.post('/register', json={
+                'accountType': 'artisan',
+                'name': f'Artisan {i}',
+                'email': f'artisan{i}@example.com',
+                'password': 'Password123',
+                'phone_number': '08000000000',
+                'location': 'Lagos',
+                'trade': 'Plumber',
+            })
+            if response.status_code != 200:
+                raise SystemExit(f'Registration {i} failed: {response.get_data(as_text=True)}')
+            client.get('/logout')
+        elapsed = time.perf_counter() - start
+        with app.app_context():
+            db.engine.dispose()
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--count', type=int, default=300, help='registrations to perform')
+    parser.add_argument('--hash-method', default='pbkdf2:sha256:1000',
+                        help="werkzeug hash method; use 'scrypt' to include production hashing cost")
+    args = parser.parse_args()
+    elapsed = run(args.count, args.hash_method)
+    print(f'{args.count} registrations in {elapsed:.2f}s: {args.count / elapsed:.1f}/s')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,208 @@
+"""Replay user journeys against a seeded database and report latency percentiles.
+
+Seeds the database on first use (see benchmarks/seed.py), then runs every
+journey --iterations times through the Flask test client, or over HTTP
+against a local WSGI server with --server. Prints p50/p95/p99 latency and
+SQL statements per request for each step:
+
+    python benchmarks/run.py --db /tmp/bench.db --scale small --save-baseline benchmarks/baseline.json
+    python benchmarks/run.py --db /tmp/bench.db --baseline benchmarks/baseline.json
+
+With --baseline, exits non-zero when a step's p95 grows by more than
+--tolerance or it runs more queries than before.
+"""
+import argparse
+import http.cookiejar
+import json
+import os
+import random
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+from collections import defaultdict
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import email_validator  # noqa: E402
+from sqlalchemy import event  # noqa: E402
+from werkzeug.serving import make_server  # noqa: E402
+
+from app import db  # noqa: E402
+from benchmarks.journeys import JOURNEYS, sample_users  # noqa: E402
+from benchmarks.seed import SCALES, bench_app, seed  # noqa: E402
+
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    rank = max(int(round(pct / 100 * len(sorted_values) + 0.5)) - 1, 0)
+    return sorted_values[min(rank, len(sorted_values) - 1)]
+
+
+class QueryCounter:
+    def __init__(self, engine):
+        self.count = 0
+        event.listen(engine, 'before_cursor_execute', self._count)
+
+    def _count(self, *args):
+        self.count += 1
+
+
+class TestClientDriver:
+    def __init__(self, app):
+        self._app = app
+
+    def session(self):
+        client = self._app.test_client()
+
+        def request(method, url, body):
+            response = client.open(url, method=method, json=body)
+            response.close()
+            return response.status_code
+        return request
+
+    def close(self):
+        pass
+
+
+class ServerDriver:
+    """Drives a real WSGI server on localhost over HTTP, one request at a time."""
+
+    def __init__(self, app):
+        self._server = make_server('127.0.0.1', 0, app, threaded=False)
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        self.base_url = f'http://127.0.0.1:{self._server.server_port}'
+
+    def session(self):
+        opener = urllib.request.build_opener(urllib.request.HTTPCookieProcessor(http.cookiejar.CookieJar()))
+
+        def request(method, url, body):
+            data = json.dumps(body).encode() if body is not None else None
+            req = urllib.request.Request(self.base_url + url, data=data, method=method,
+                                         headers={'Content-Type': 'application/json'} if data else {})
+            try:
+                with opener.open(req) as response:
+                    response.read()
+                    return response.status
+            except urllib.error.HTTPError as e:
+                return e.code
+        return request
+
+    def close(self):
+        self._server.shutdown()
+
+
+def run_journeys(app, driver, iterations, seed_value=1):
+    rng = random.Random(seed_value)
+    users = sample_users(app)
+    with app.app_context():
+        counter = QueryCounter(db.engine)
+    samples = defaultdict(lambda: {'latency': [], 'queries': [], 'errors': 0})
+    for _ in range(iterations):
+        for name, journey in JOURNEYS.items():
+            request = driver.session()
+            for step, method, url, body in journey(rng, users):
+                before = counter.count
+                start = time.perf_counter()
+                status = request(method, url, body)
+                elapsed = time.perf_counter() - start
+                result = samples[f'{name}.{step}']
+                result['latency'].append(elapsed * 1000)
+                result['queries'].append(counter.count - before)
+                if status >= 400:
+                    result['errors'] += 1
+    return summarize(samples)
+
+
+def summarize(samples):
+    report = {}
+    for step, result in sorted(samples.items()):
+        latency = sorted(result['latency'])
+        report[step] = {
+            'requests': len(latency),
+            'p50_ms': round(percentile(latency, 50), 2),
+            'p95_ms': round(percentile(latency, 95), 2),
+            'p99_ms': round(percentile(latency, 99), 2),
+            'queries': round(sum(result['queries']) / len(result['queries']), 1),
+            'errors': result['errors'],
+        }
+    return report
+
+
+def print_report(report, baseline=None):
+    header = f"{'step':<34}{'n':>6}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'queries':>9}{'errors':>8}"
+    if baseline:
+        header += f"{'p95 vs base':>13}"
+    print(header)
+    for step, row in report.items():
+        line = (f"{step:<34}{row['requests']:>6}{row['p50_ms']:>10.2f}{row['p95_ms']:>10.2f}"
+                f"{row['p99_ms']:>10.2f}{row['queries']:>9.1f}{row['errors']:>8}")
+        base = (baseline or {}).get(step)
+        if base and base['p95_ms']:
+            line += f"{(row['p95_ms'] / base['p95_ms'] - 1) * 100:>+12.0f}%"
+        print(line)
+
+
+def regressions(report, baseline, tolerance):
+    problems = []
+    for step, row in report.items():
+        base = baseline.get(step)
+        if base is None:
+            continue
+        if row['p95_ms'] > base['p95_ms'] * (1 + tolerance):
+            problems.append(f"{step}: p95 {base['p95_ms']:.2f} -> {row['p95_ms']:.2f} ms")
+        if row['queries'] > base['queries']:
+            problems.append(f"{step}: queries {base['queries']} -> {row['queries']}")
+        if row['errors'] > base['errors']:
+            problems.append(f"{step}: errors {base['errors']} -> {row['errors']}")
+    return problems
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--db', required=True, help='SQLite file to benchmark; seeded first if missing')
+    parser.add_argument('--scale', choices=SCALES, default='small', help='data volume when seeding')
+    parser.add_argument('--iterations', type=int, default=20, help='times each journey is replayed')
+    parser.add_argument('--server', action='store_true', help='go through a local WSGI server over HTTP')
+    parser.add_argument('--no-cache', action='store_true', help='disable the response cache')
+    parser.add_argument('--baseline', help='JSON report to compare against')
+    parser.add_argument('--tolerance', type=float, default=0.25, help='allowed p95 growth over the baseline')
+    parser.add_argument('--save-baseline', help='write this run as a JSON report')
+    args = parser.parse_args()
+
+    # Seeded addresses have no mail servers to check
+    email_validator.CHECK_DELIVERABILITY = False
+    config = {'RESPONSE_CACHE_TTL': 0} if args.no_cache else {}
+    if not os.path.exists(args.db):
+        print(f'Seeding {args.db} at scale {args.scale}...')
+        seed(bench_app(args.db), SCALES[args.scale])
+    app = bench_app(args.db, **config)
+    driver = ServerDriver(app) if args.server else TestClientDriver(app)
+    try:
+        report = run_journeys(app, driver, args.iterations)
+    finally:
+        driver.close()
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+    print_report(report, baseline)
+    if args.save_baseline:
+        with open(args.save_baseline, 'w') as f:
+            json.dump(report, f, indent=2, sort_keys=True)
+        print(f'Baseline written to {args.save_baseline}')
+    if baseline:
+        problems = regressions(report, baseline, args.tolerance)
+        if problems:
+            print('\nRegressions against the baseline:')
+            print('\n'.join(f'  {problem}' for problem in problems))
+            raise SystemExit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,281 @@
+"""Fill a database with a deterministic, realistically shaped Handyverse dataset.
+
+The same --scale and --seed always produce the same rows, so benchmark runs
+against separately seeded databases are comparable:
+
+    python benchmarks/seed.py --db /tmp/bench.db --scale medium
+
+Rows are bulk-inserted through Core, which skips the ORM listeners; the
+derived data they normally maintain (conversation summaries, rating totals,
+search indexes) is rebuilt afterwards with the app's own maintenance commands.
+Every user's password is ``Password123``.
+"""
+import argparse
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from werkzeug.security import generate_password_hash  # noqa: E402
+
+from app import create_app, db  # noqa: E402
+from app.models import (  # noqa: E402
+    Artisan, Favorite, JobApplication, JobPost, Message, Notification, Review, User
+)
+
+PASSWORD = 'Password123'
+BASE_TIME = datetime(2025, 1, 1)
+# Timestamps are spread over this many days after BASE_TIME
+TIME_SPAN_DAYS = 365
+
+# Row counts per table; artisans are the first `artisans` users
+SCALES = {
+    'tiny': dict(users=300, artisans=100, messages=3_000, jobs=100, applications=300,
+                 reviews=600, favorites=600, notifications=2_000),
+    'small': dict(users=5_000, artisans=2_000, messages=100_000, jobs=2_000, applications=6_000,
+                  reviews=10_000, favorites=10_000, notifications=50_000),
+    'medium': dict(users=50_000, artisans=20_000, messages=1_000_000, jobs=20_000, applications=60_000,
+                   reviews=100_000, favorites=100_000, notifications=500_000),
+    'large': dict(users=250_000, artisans=100_000, messages=10_000_000, jobs=100_000, applications=300_000,
+                  reviews=500_000, favorites=500_000, notifications=2_000_000),
+}
+
+CITIES = {
+    'Lagos': (6.5244, 3.3792), 'Abuja': (9.0765, 7.3986), 'Ibadan': (7.3775, 3.9470),
+    'Port Harcourt': (4.8156, 7.0498), 'Kano': (12.0022, 8.5920), 'Benin City': (6.3350, 5.6037),
+    'Enugu': (6.5244, 7.5186), 'Kaduna': (10.5105, 7.4165), 'Jos': (9.8965, 8.8583),
+    'Abeokuta': (7.1475, 3.3619), 'Owerri': (5.4850, 7.0350), 'Calabar': (4.9757, 8.3417),
+}
+# Lagos and Abuja dominate real listings; weight the city draw accordingly
+CITY_WEIGHTS = [30, 15, 8, 8, 7, 5, 5, 5, 4, 4, 5, 4]
+SKILLS = ['Plumber', 'Electrician', 'Carpenter', 'Painter', 'Tiler', 'Welder', 'Mechanic', 'Tailor',
+          'Hair Stylist', 'AC Technician', 'Bricklayer', 'Cleaner', 'Generator Repair', 'Photographer']
+FIRST_NAMES = ['Ade', 'Chioma', 'Emeka', 'Fatima', 'Ifeanyi', 'Kemi', 'Musa', 'Ngozi', 'Olu', 'Segun',
+               'Tunde', 'Uche', 'Yetunde', 'Zainab', 'Bola', 'Dayo', 'Halima', 'Obinna', 'Sade', 'Tobi']
+LAST_NAMES = ['Adeyemi', 'Okafor', 'Bello', 'Eze', 'Ibrahim', 'Okonkwo', 'Balogun', 'Nwosu', 'Abubakar',
+              'Ogunleye', 'Chukwu', 'Danjuma', 'Olawale', 'Umeh', 'Yusuf']
+TASKS = ['a leaking kitchen sink', 'rewiring a flat', 'a new wardrobe', 'painting two bedrooms',
+         'bathroom tiles', 'a broken gate', 'servicing my car', 'a wedding outfit', 'a faulty inverter',
+         'a split unit that will not cool', 'a fence wall', 'post-construction cleaning']
+MESSAGE_LINES = ['Hello, are you available this week?', 'How much would that cost?', 'I can come by tomorrow.',
+                 'Please send pictures of the problem.', 'Thanks, the job looks great!', 'Can we do Saturday?',
+                 'I will need to buy some parts first.', 'Payment sent, thank you.', 'Running a bit late.']
+
+
+def email_for(user_id):
+    return f'user{user_id}@example.com'
+
+
+def _when(rng):
+    return BASE_TIME + timedelta(seconds=rng.randrange(TIME_SPAN_DAYS * 86400))
+
+
+def _city(rng):
+    name = rng.choices(list(CITIES), weights=CITY_WEIGHTS)[0]
+    lat, lng = CITIES[name]
+    # Within ~20 km of the city centre
+    return name, lat + rng.uniform(-0.18, 0.18), lng + rng.uniform(-0.18, 0.18)
+
+
+def _insert(table, rows, batch_size):
+    batch = []
+    total = 0
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= batch_size:
+            db.session.execute(table.insert(), batch)
+            db.session.commit()
+            total += len(batch)
+            batch = []
+    if batch:
+        db.session.execute(table.insert(), batch)
+        db.session.commit()
+        total += len(batch)
+    return total
+
+
+def _users(rng, counts, password_hash):
+    for user_id in range(1, counts['users'] + 1):
+        city, _, _ = _city(rng)
+        yield {
+            'id': user_id,
+            'email': email_for(user_id),
+            'name': f'{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}',
+            'password_hash': password_hash,
+            'location': city,
+            'phone_number': f'080{rng.randrange(10 ** 8):08d}',
+            'is_artisan': user_id <= counts['artisans'],
+        }
+
+
+def _artisans(rng, counts):
+    for artisan_id in range(1, counts['artisans'] + 1):
+        city, lat, lng = _city(rng)
+        # Some artisans never shared their location
+        has_coordinates = rng.random() < 0.9
+        yield {
+            'id': artisan_id,
+            'user_id': artisan_id,
+            'skills': ', '.join(rng.sample(SKILLS, rng.choice([1, 1, 2, 3]))),
+            'location': city,
+            'latitude': lat if has_coordinates else None,
+            'longitude': lng if has_coordinates else None,
+        }
+
+
+def _customer(rng, counts):
+    return rng.randint(counts['artisans'] + 1, counts['users'])
+
+
+def _jobs(rng, counts):
+    for job_id in range(1, counts['jobs'] + 1):
+        city, lat, lng = _city(rng)
+        skill = rng.choice(SKILLS)
+        yield {
+            'id': job_id,
+            'user_id': _customer(rng, counts),
+            'title': f'{skill} needed for {rng.choice(TASKS)}',
+            'description': f'Looking for an experienced {skill.lower()} in {city}. ' * rng.randint(1, 4),
+            'location': city,
+            'latitude': lat,
+            'longitude': lng,
+            'budget': float(rng.randrange(5_000, 500_000, 500)),
+            'timestamp': _when(rng),
+        }
+
+
+def _spread(rng, total, owners, pick, population):
+    """Yield ``(owner, item)`` pairs, ``total`` in all, with distinct items per owner."""
+    per_owner, extra = divmod(total, len(owners))
+    for index, owner in enumerate(owners):
+        count = min(per_owner + (index < extra), population)
+        for item in pick(count):
+            yield owner, item
+
+
+def _applications(rng, counts):
+    pairs = _spread(
+        rng, counts['applications'], range(1, counts['jobs'] + 1),
+        lambda k: rng.sample(range(1, counts['artisans'] + 1), k), counts['artisans']
+    )
+    for job_id, artisan_id in pairs:
+        yield {
+            'job_post_id': job_id,
+            'artisan_id': artisan_id,
+            'message': 'I can do this job, available this week.',
+            'status': rng.choice(['pending', 'pending', 'accepted', 'rejected']),
+            'timestamp': _when(rng),
+        }
+
+
+def _reviews(rng, counts):
+    for _ in range(counts['reviews']):
+        yield {
+            'customer_id': _customer(rng, counts),
+            'artisan_id': rng.randint(1, counts['artisans']),
+            'rating': rng.choices([1, 2, 3, 4, 5], weights=[3, 4, 10, 35, 48])[0],
+            'comment': rng.choice(['Great work', 'On time and tidy', 'Fair price', 'Would hire again',
+                                   'Took longer than agreed']),
+            'timestamp': _when(rng),
+        }
+
+
+def _favorites(rng, counts):
+    customers = range(counts['artisans'] + 1, counts['users'] + 1)
+    pairs = _spread(
+        rng, counts['favorites'], customers,
+        lambda k: rng.sample(range(1, counts['artisans'] + 1), k), counts['artisans']
+    )
+    for user_id, artisan_id in pairs:
+        yield {'user_id': user_id, 'artisan_id': artisan_id, 'timestamp': _when(rng)}
+
+
+def _messages(rng, counts):
+    """Conversation threads between customers and artisans, 1-15 messages each."""
+    remaining = counts['messages']
+    while remaining > 0:
+        customer, artisan = _customer(rng, counts), rng.randint(1, counts['artisans'])
+        when = _when(rng)
+        for i in range(min(rng.randint(1, 15), remaining)):
+            sender, recipient = (customer, artisan) if i % 2 == 0 else (artisan, customer)
+            yield {
+                'sender_id': sender,
+                'recipient_id': recipient,
+                'content': rng.choice(MESSAGE_LINES),
+                'timestamp': when,
+            }
+            when += timedelta(minutes=rng.randint(1, 600))
+            remaining -= 1
+
+
+def _notifications(rng, counts):
+    for _ in range(counts['notifications']):
+        yield {
+            'user_id': rng.randint(1, counts['users']),
+            'type': rng.choice(['message', 'job_application', 'favorite_update']),
+            'message': 'You have a new update',
+            'url': '/messages',
+            'is_read': rng.random() < 0.7,
+            'timestamp': _when(rng),
+        }
+
+
+def seed(app, counts, seed=42, batch_size=10_000, echo=print):
+    """Insert ``counts`` rows (see SCALES) into the app's empty database."""
+    rng = random.Random(seed)
+    password_hash = generate_password_hash(PASSWORD, method=app.config['PASSWORD_HASH_METHOD'])
+    steps = [
+        (User, lambda: _users(rng, counts, password_hash)),
+        (Artisan, lambda: _artisans(rng, counts)),
+        (JobPost, lambda: _jobs(rng, counts)),
+        (JobApplication, lambda: _applications(rng, counts)),
+        (Review, lambda: _reviews(rng, counts)),
+        (Favorite, lambda: _favorites(rng, counts)),
+        (Message, lambda: _messages(rng, counts)),
+        (Notification, lambda: _notifications(rng, counts)),
+    ]
+    with app.app_context():
+        db.create_all()
+        for model, rows in steps:
+            start = time.perf_counter()
+            total = _insert(model.__table__, rows(), batch_size)
+            echo(f'{model.__tablename__}: {total} rows in {time.perf_counter() - start:.1f}s')
+    # Derived tables, rebuilt the same way an operator would after a bulk import
+    runner = app.test_cli_runner()
+    for command in (['backfill-conversations', '--batch-size', str(batch_size)], ['recount-ratings'],
+                    ['rebuild-search-index', '--batch-size', str(batch_size)]):
+        result = runner.invoke(args=command)
+        if result.exit_code != 0:
+            raise RuntimeError(f"flask {' '.join(command)} failed: {result.output}") from result.exception
+        echo(result.output.strip())
+
+
+def bench_app(db_path, **config):
+    """Create the app the benchmarks run against, on the SQLite file at ``db_path``."""
+    return create_app({
+        'SQLALCHEMY_DATABASE_URI': f'sqlite:///{os.path.abspath(db_path)}',
+        'WTF_CSRF_ENABLED': False,
+        'NOTIFICATIONS_ASYNC': False,
+        # Cheap hashing keeps logins from dominating the journeys; pass 'scrypt' to include it
+        'PASSWORD_HASH_METHOD': 'pbkdf2:sha256:1000',
+        **config,
+    })
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--db', required=True, help='SQLite file to create; must not exist yet')
+    parser.add_argument('--scale', choices=SCALES, default='small')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--batch-size', type=int, default=10_000)
+    args = parser.parse_args()
+    if os.path.exists(args.db):
+        raise SystemExit(f'{args.db} already exists; seed into a fresh file')
+    seed(bench_app(args.db), SCALES[args.scale], seed=args.seed, batch_size=args.batch_size)
+
+
+if __name__ == '__main__':
+    main()
@@ -8,12 +8,77 @@ class Config:
         'sqlite:///' + os.path.join(os.path.dirname(__file__), 'instance', 'handyverse.db')
     )
     SQLALCHEMY_TRACK_MODIFICATIONS = False
+    # Comma-separated read replica URLs; read-only views spread their reads across them
+    SQLALCHEMY_REPLICA_URIS = [url.strip() for url in os.getenv('DATABASE_REPLICA_URLS', '').split(',') if url.strip()]
+    # Seconds a client that just wrote keeps reading from the primary (covers replication lag)
+    REPLICA_PIN_SECONDS = int(os.getenv('REPLICA_PIN_SECONDS', '5'))
+    # Connection pool for server databases such as Postgres (ignored for SQLite)
+    DB_POOL_SIZE = int(os.getenv('DB_POOL_SIZE', '10'))
+    DB_MAX_OVERFLOW = int(os.getenv('DB_MAX_OVERFLOW', '20'))
+    DB_POOL_TIMEOUT = int(os.getenv('DB_POOL_TIMEOUT', '30'))
+    DB_POOL_RECYCLE = int(os.getenv('DB_POOL_RECYCLE', '1800'))
+    DB_POOL_PRE_PING = os.getenv('DB_POOL_PRE_PING', 'True').lower() in ('true', '1', 't')
+    # Pragmas applied to every connection of a file-backed SQLite database
+    SQLITE_JOURNAL_MODE = os.getenv('SQLITE_JOURNAL_MODE', 'WAL')
+    SQLITE_SYNCHRONOUS = os.getenv('SQLITE_SYNCHRONOUS', 'NORMAL')
+    SQLITE_BUSY_TIMEOUT_MS = int(os.getenv('SQLITE_BUSY_TIMEOUT_MS', '5000'))
+    SQLITE_CACHE_SIZE_KB = int(os.getenv('SQLITE_CACHE_SIZE_KB', '20000'))
+    SQLITE_MMAP_SIZE = int(os.getenv('SQLITE_MMAP_SIZE', str(256 * 1024 * 1024)))
     # Use /tmp/uploads on Render (writable), else local uploads folder
     UPLOAD_FOLDER = os.getenv(
         'UPLOAD_FOLDER',
         os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'uploads'))
     )
+    # Profile pictures are cut off at PROFILE_PIC_MAX_BYTES while streaming to disk;
+    # MAX_CONTENT_LENGTH makes Werkzeug reject any larger request body up front
+    PROFILE_PIC_MAX_BYTES = int(os.getenv('PROFILE_PIC_MAX_BYTES', str(5 * 1024 * 1024)))
+    MAX_CONTENT_LENGTH = int(os.getenv('MAX_CONTENT_LENGTH', str(8 * 1024 * 1024)))
     DEBUG = os.getenv('DEBUG', 'False').lower() in ('true', '1', 't')
+    # Seconds before in-memory geo indexes are rebuilt from the database; keeps
+    # multiple worker processes eventually consistent with each other
+    GEO_INDEX_TTL = int(os.getenv('GEO_INDEX_TTL', '300'))
+    # Offline geocoding of location text (see app.geocode); empty uses the bundled gazetteer
+    GEOCODER_GAZETTEER = os.getenv('GEOCODER_GAZETTEER', '')
+    GEOCODER_CACHE_SIZE = int(os.getenv('GEOCODER_CACHE_SIZE', '4096'))
+    # Large notification fan-outs (e.g. to all of an artisan's favoriters) run on a
+    # background thread and are inserted NOTIFICATION_BATCH_SIZE rows at a time
+    NOTIFICATIONS_ASYNC = os.getenv('NOTIFICATIONS_ASYNC', 'True').lower() in ('true', '1', 't')
+    NOTIFICATION_BATCH_SIZE = int(os.getenv('NOTIFICATION_BATCH_SIZE', '500'))
+    # Most event streams and long polls one process holds open (each pins a thread under
+    # gthread); further clients get a 503 and fall back to polling. Empty means no limit.
+    # gunicorn.conf.py sets it for threaded workers.
+    EVENT_STREAM_MAX_CLIENTS = (
+        int(os.environ['EVENT_STREAM_MAX_CLIENTS']) if os.getenv('EVENT_STREAM_MAX_CLIENTS') else None
+    )
+    # Pub/sub for those streams (see app.events). Empty keeps events inside the worker
+    # that published them, so chat pages keep a slow poll; a redis:// URL fans events
+    # out to every worker and pages only poll while their stream is down.
+    EVENT_BROKER_URL = os.getenv('EVENT_BROKER_URL', '')
+    # Seconds a cached unread-notification count may serve before it is recounted
+    UNREAD_COUNT_TTL = int(os.getenv('UNREAD_COUNT_TTL', '30'))
+    # Password hashing runs on its own bounded thread pools (see app.passwords).
+    # Any werkzeug method works, e.g. 'scrypt' or 'pbkdf2:sha256:600000'; stored
+    # hashes with other parameters are upgraded on the next successful login.
+    PASSWORD_HASH_METHOD = os.getenv('PASSWORD_HASH_METHOD', 'scrypt')
+    PASSWORD_HASH_WORKERS = int(os.getenv('PASSWORD_HASH_WORKERS', '2'))
+    PASSWORD_VERIFY_WORKERS = int(os.getenv('PASSWORD_VERIFY_WORKERS', '4'))
+    PASSWORD_HASH_MAX_QUEUE = int(os.getenv('PASSWORD_HASH_MAX_QUEUE', '32'))
+    PASSWORD_HASH_TIMEOUT = float(os.getenv('PASSWORD_HASH_TIMEOUT', '10'))
+    # Cache for public pages and APIs (see app.cache). Empty RESPONSE_CACHE_URL keeps an
+    # in-process LRU per worker; a redis:// URL shares entries and invalidations
+    # between workers. A TTL of 0 turns the cache off.
+    RESPONSE_CACHE_URL = os.getenv('RESPONSE_CACHE_URL', '')
+    RESPONSE_CACHE_TTL = int(os.getenv('RESPONSE_CACHE_TTL', '60'))
+    RESPONSE_CACHE_MAX_ENTRIES = int(os.getenv('RESPONSE_CACHE_MAX_ENTRIES', '1000'))
+    # Opt-in request/SQL/template instrumentation served at /metrics in Prometheus format
+    # (see app.metrics). Set METRICS_TOKEN to require 'Authorization: Bearer <token>'.
+    METRICS_ENABLED = os.getenv('METRICS_ENABLED', 'False').lower() in ('true', '1', 't')
+    METRICS_TOKEN = os.getenv('METRICS_TOKEN', '')
+    # Fraction of requests run under cProfile; those slower than METRICS_PROFILE_SLOW_MS
+    # are dumped to METRICS_PROFILE_DIR (default: <instance>/profiles) for snakeviz/pstats
+    METRICS_PROFILE_SAMPLE_RATE = float(os.getenv('METRICS_PROFILE_SAMPLE_RATE', '0'))
+    METRICS_PROFILE_SLOW_MS = int(os.getenv('METRICS_PROFILE_SLOW_MS', '500'))
+    METRICS_PROFILE_DIR = os.getenv('METRICS_PROFILE_DIR', '')
     SQLALCHEMY_ECHO = os.getenv('SQLALCHEMY_ECHO', 'False').lower() in ('true', '1', 't')
 
     @staticmethod
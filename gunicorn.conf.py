@@ -0,0 +1,54 @@
+"""Gunicorn settings for ``gunicorn wsgi:app``; every value can be overridden from the environment.
+
+Two worker models are supported:
+
+* ``gthread`` (default): WEB_CONCURRENCY processes with GUNICORN_THREADS
+  threads each. Every in-flight request holds a thread, and so does every
+  open /api/stream or long poll (one per logged-in browser tab). So that
+  streams cannot take every thread, each worker accepts at most 3/4 of its
+  threads as streams (EVENT_STREAM_MAX_CLIENTS); later tabs get a 503 and
+  fall back to polling.
+* ``gevent``: each request runs on a greenlet and blocking waits (the event
+  queues, socket I/O, psycopg2 queries via psycogreen, lock and sleep calls)
+  yield to other greenlets, so thousands of idle streams, chat polls,
+  notification and search requests share a few processes. Password hashing
+  still gets real OS threads (see app.passwords). Install ``gevent`` and
+  ``psycogreen`` and set GUNICORN_WORKER_CLASS=gevent.
+
+Size DB_POOL_SIZE + DB_MAX_OVERFLOW for concurrent *queries*, not clients:
+streams and long polls hand their connection back before they start waiting.
+"""
+import multiprocessing
+import os
+
+bind = f"0.0.0.0:{os.getenv('PORT', '5000')}"
+worker_class = os.getenv('GUNICORN_WORKER_CLASS', 'gthread')
+workers = int(os.getenv('WEB_CONCURRENCY', str(min(multiprocessing.cpu_count() * 2 + 1, 8))))
+threads = int(os.getenv('GUNICORN_THREADS', '32'))
+# Concurrent clients per gevent worker
+worker_connections = int(os.getenv('GUNICORN_WORKER_CONNECTIONS', '2000'))
+# Event streams send a keep-alive every 15 seconds; anything silent for this long is stuck
+timeout = int(os.getenv('GUNICORN_TIMEOUT', '60'))
+graceful_timeout = int(os.getenv('GUNICORN_GRACEFUL_TIMEOUT', '30'))
+keepalive = int(os.getenv('GUNICORN_KEEPALIVE', '5'))
+# Recycle workers now and then so slow leaks cannot build up
+max_requests = int(os.getenv('GUNICORN_MAX_REQUESTS', '10000'))
+max_requests_jitter = int(os.getenv('GUNICORN_MAX_REQUESTS_JITTER', '1000'))
+# Each worker builds its own app: database pools, caches and background threads must not be shared across a fork
+preload_app = False
+accesslog = os.getenv('GUNICORN_ACCESS_LOG', '-')
+errorlog = '-'
+
+
+def post_fork(server, worker):
+    # worker.cfg reflects the command line too (`gunicorn -k gevent`), unlike worker_class above
+    if not worker.cfg.worker_class_str.startswith('gevent'):
+        # Runs before the worker imports the app, so config.py picks this up
+        os.environ.setdefault('EVENT_STREAM_MAX_CLIENTS', str(worker.cfg.threads * 3 // 4))
+        return
+    try:
+        from psycogreen.gevent import patch_psycopg
+    except ImportError:
+        server.log.warning("psycogreen is not installed; PostgreSQL queries will block the gevent worker")
+    else:
+        patch_psycopg()
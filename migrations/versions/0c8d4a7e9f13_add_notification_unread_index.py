@@ -0,0 +1,24 @@
+"""add notification (user_id, is_read) index for unread counts
+
+Revision ID: 0c8d4a7e9f13
+Revises: f1b6d2e8c437
+Create Date: 2026-10-18 19:06:48.215930
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0c8d4a7e9f13'
+down_revision = 'f1b6d2e8c437'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index('ix_notification_user_is_read', 'notification', ['user_id', 'is_read'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_notification_user_is_read', table_name='notification')
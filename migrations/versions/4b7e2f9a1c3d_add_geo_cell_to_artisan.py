@@ -0,0 +1,50 @@
+"""add geo_cell spatial index to artisan
+
+Revision ID: 4b7e2f9a1c3d
+Revises: 9936abdca3f6
+Create Date: 2026-10-18 09:12:40.118204
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+from app.geo import grid_cell
+
+
+# revision identifiers, used by Alembic.
+revision = '4b7e2f9a1c3d'
+down_revision = '9936abdca3f6'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('artisan', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('geo_cell', sa.Integer(), nullable=True))
+        batch_op.create_index(batch_op.f('ix_artisan_geo_cell'), ['geo_cell'], unique=False)
+
+    # Backfill cells for artisans that already have coordinates
+    conn = op.get_bind()
+    artisan = sa.table(
+        'artisan',
+        sa.column('id', sa.Integer),
+        sa.column('latitude', sa.Float),
+        sa.column('longitude', sa.Float),
+        sa.column('geo_cell', sa.Integer),
+    )
+    rows = conn.execute(
+        sa.select(artisan.c.id, artisan.c.latitude, artisan.c.longitude)
+        .where(artisan.c.latitude.isnot(None), artisan.c.longitude.isnot(None))
+    ).fetchall()
+    for row in rows:
+        conn.execute(
+            artisan.update()
+            .where(artisan.c.id == row.id)
+            .values(geo_cell=grid_cell(row.latitude, row.longitude))
+        )
+
+
+def downgrade():
+    with op.batch_alter_table('artisan', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_artisan_geo_cell'))
+        batch_op.drop_column('geo_cell')
@@ -0,0 +1,28 @@
+"""add user.latitude/longitude resolved from location
+
+Revision ID: 5e1a9c3b7d20
+Revises: b6e3f08d2a51
+Create Date: 2026-10-18 23:04:51.217346
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5e1a9c3b7d20'
+down_revision = 'b6e3f08d2a51'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('user', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('latitude', sa.Float(), nullable=True))
+        batch_op.add_column(sa.Column('longitude', sa.Float(), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table('user', schema=None) as batch_op:
+        batch_op.drop_column('longitude')
+        batch_op.drop_column('latitude')
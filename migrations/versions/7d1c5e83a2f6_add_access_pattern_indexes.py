@@ -0,0 +1,58 @@
+"""add composite indexes for message, notification, favorite and job access patterns
+
+Revision ID: 7d1c5e83a2f6
+Revises: 4b7e2f9a1c3d
+Create Date: 2026-10-18 11:03:27.540912
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '7d1c5e83a2f6'
+down_revision = '4b7e2f9a1c3d'
+branch_labels = None
+depends_on = None
+
+
+def _delete_duplicates(table, columns):
+    # Keep the oldest row of each duplicate group so the unique index can be built
+    cols = ', '.join(columns)
+    op.execute(
+        f"DELETE FROM {table} WHERE id NOT IN "
+        f"(SELECT keep_id FROM (SELECT MIN(id) AS keep_id FROM {table} GROUP BY {cols}) AS keepers)"
+    )
+
+
+def upgrade():
+    op.create_index('ix_message_sender_timestamp', 'message', ['sender_id', 'timestamp'], unique=False)
+    op.create_index('ix_message_recipient_timestamp', 'message', ['recipient_id', 'timestamp'], unique=False)
+    op.create_index('ix_message_recipient_parent_timestamp', 'message', ['recipient_id', 'parent_id', 'timestamp'], unique=False)
+    op.create_index('ix_message_pair_id', 'message', ['sender_id', 'recipient_id', 'id'], unique=False)
+    op.create_index('ix_review_artisan_timestamp', 'review', ['artisan_id', 'timestamp'], unique=False)
+    op.create_index('ix_notification_user_timestamp', 'notification', ['user_id', 'timestamp'], unique=False)
+    op.create_index('ix_job_post_timestamp', 'job_post', ['timestamp'], unique=False)
+    op.create_index('ix_job_post_user_timestamp', 'job_post', ['user_id', 'timestamp'], unique=False)
+    op.create_index('ix_favorite_artisan', 'favorite', ['artisan_id'], unique=False)
+    op.create_index('ix_job_application_artisan', 'job_application', ['artisan_id'], unique=False)
+
+    _delete_duplicates('favorite', ['user_id', 'artisan_id'])
+    op.create_index('uq_favorite_user_artisan', 'favorite', ['user_id', 'artisan_id'], unique=True)
+    _delete_duplicates('job_application', ['job_post_id', 'artisan_id'])
+    op.create_index('uq_job_application_job_artisan', 'job_application', ['job_post_id', 'artisan_id'], unique=True)
+
+
+def downgrade():
+    op.drop_index('uq_job_application_job_artisan', table_name='job_application')
+    op.drop_index('uq_favorite_user_artisan', table_name='favorite')
+    op.drop_index('ix_job_application_artisan', table_name='job_application')
+    op.drop_index('ix_favorite_artisan', table_name='favorite')
+    op.drop_index('ix_job_post_user_timestamp', table_name='job_post')
+    op.drop_index('ix_job_post_timestamp', table_name='job_post')
+    op.drop_index('ix_notification_user_timestamp', table_name='notification')
+    op.drop_index('ix_review_artisan_timestamp', table_name='review')
+    op.drop_index('ix_message_pair_id', table_name='message')
+    op.drop_index('ix_message_recipient_parent_timestamp', table_name='message')
+    op.drop_index('ix_message_recipient_timestamp', table_name='message')
+    op.drop_index('ix_message_sender_timestamp', table_name='message')
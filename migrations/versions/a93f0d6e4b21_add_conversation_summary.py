@@ -0,0 +1,45 @@
+"""add conversation summary table
+
+Revision ID: a93f0d6e4b21
+Revises: 7d1c5e83a2f6
+Create Date: 2026-10-18 13:41:09.662307
+
+Populate existing data with `flask backfill-conversations` after upgrading.
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a93f0d6e4b21'
+down_revision = '7d1c5e83a2f6'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('conversation',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('user_a_id', sa.Integer(), nullable=False),
+    sa.Column('user_b_id', sa.Integer(), nullable=False),
+    sa.Column('last_message_id', sa.Integer(), nullable=True),
+    sa.Column('last_message_snippet', sa.String(length=120), nullable=True),
+    sa.Column('last_message_at', sa.DateTime(), nullable=True),
+    sa.Column('unread_a', sa.Integer(), nullable=False),
+    sa.Column('unread_b', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['last_message_id'], ['message.id'], ),
+    sa.ForeignKeyConstraint(['user_a_id'], ['user.id'], ),
+    sa.ForeignKeyConstraint(['user_b_id'], ['user.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('uq_conversation_pair', 'conversation', ['user_a_id', 'user_b_id'], unique=True)
+    op.create_index('ix_conversation_user_a_last', 'conversation', ['user_a_id', 'last_message_at'], unique=False)
+    op.create_index('ix_conversation_user_b_last', 'conversation', ['user_b_id', 'last_message_at'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_conversation_user_b_last', table_name='conversation')
+    op.drop_index('ix_conversation_user_a_last', table_name='conversation')
+    op.drop_index('uq_conversation_pair', table_name='conversation')
+    op.drop_table('conversation')
@@ -0,0 +1,26 @@
+"""add user.profile_pic_thumb for resized profile pictures
+
+Revision ID: b6e3f08d2a51
+Revises: 0c8d4a7e9f13
+Create Date: 2026-10-18 21:12:37.604118
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b6e3f08d2a51'
+down_revision = '0c8d4a7e9f13'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('user', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('profile_pic_thumb', sa.String(length=200), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table('user', schema=None) as batch_op:
+        batch_op.drop_column('profile_pic_thumb')
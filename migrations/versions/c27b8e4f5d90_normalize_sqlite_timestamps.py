@@ -0,0 +1,38 @@
+"""normalize second-precision sqlite timestamps for keyset pagination
+
+Revision ID: c27b8e4f5d90
+Revises: a93f0d6e4b21
+Create Date: 2026-10-18 15:20:53.204118
+
+Rows written by the CURRENT_TIMESTAMP server default are stored as
+'YYYY-MM-DD HH:MM:SS', while SQLAlchemy writes and binds
+'YYYY-MM-DD HH:MM:SS.ffffff'. SQLite compares these as strings, so
+(timestamp, id) cursors would misorder such rows. Pad them to the same
+format. Other databases store native timestamps and need nothing.
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = 'c27b8e4f5d90'
+down_revision = 'a93f0d6e4b21'
+branch_labels = None
+depends_on = None
+
+TABLES = ('message', 'review', 'conversation')
+
+
+def upgrade():
+    if op.get_bind().dialect.name != 'sqlite':
+        return
+    for table in TABLES:
+        column = 'last_message_at' if table == 'conversation' else 'timestamp'
+        op.execute(
+            f"UPDATE {table} SET {column} = {column} || '.000000' "
+            f"WHERE {column} IS NOT NULL AND length({column}) = 19"
+        )
+
+
+def downgrade():
+    pass
@@ -0,0 +1,49 @@
+"""drop artisan.geo_cell; radius search is served by the in-memory GeoIndex
+
+Revision ID: e3b81f5a6c47
+Revises: 9d27f4c1e8b6
+Create Date: 2026-10-19 10:22:14.806331
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+from app.geo import grid_cell
+
+
+# revision identifiers, used by Alembic.
+revision = 'e3b81f5a6c47'
+down_revision = '9d27f4c1e8b6'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('artisan', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_artisan_geo_cell'))
+        batch_op.drop_column('geo_cell')
+
+
+def downgrade():
+    with op.batch_alter_table('artisan', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('geo_cell', sa.Integer(), nullable=True))
+        batch_op.create_index(batch_op.f('ix_artisan_geo_cell'), ['geo_cell'], unique=False)
+
+    conn = op.get_bind()
+    artisan = sa.table(
+        'artisan',
+        sa.column('id', sa.Integer),
+        sa.column('latitude', sa.Float),
+        sa.column('longitude', sa.Float),
+        sa.column('geo_cell', sa.Integer),
+    )
+    rows = conn.execute(
+        sa.select(artisan.c.id, artisan.c.latitude, artisan.c.longitude)
+        .where(artisan.c.latitude.isnot(None), artisan.c.longitude.isnot(None))
+    ).fetchall()
+    for row in rows:
+        conn.execute(
+            artisan.update()
+            .where(artisan.c.id == row.id)
+            .values(geo_cell=grid_cell(row.latitude, row.longitude))
+        )
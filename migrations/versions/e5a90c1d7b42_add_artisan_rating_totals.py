@@ -0,0 +1,35 @@
+"""add denormalized rating totals to artisan
+
+Revision ID: e5a90c1d7b42
+Revises: c27b8e4f5d90
+Create Date: 2026-10-18 16:41:09.372615
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e5a90c1d7b42'
+down_revision = 'c27b8e4f5d90'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('artisan', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('rating_sum', sa.Integer(), server_default='0', nullable=False))
+        batch_op.add_column(sa.Column('rating_count', sa.Integer(), server_default='0', nullable=False))
+
+    # Backfill the totals from existing reviews
+    op.execute(
+        "UPDATE artisan SET "
+        "rating_sum = (SELECT COALESCE(SUM(review.rating), 0) FROM review WHERE review.artisan_id = artisan.id), "
+        "rating_count = (SELECT COUNT(*) FROM review WHERE review.artisan_id = artisan.id)"
+    )
+
+
+def downgrade():
+    with op.batch_alter_table('artisan', schema=None) as batch_op:
+        batch_op.drop_column('rating_count')
+        batch_op.drop_column('rating_sum')
@@ -0,0 +1,34 @@
+"""add full-text search tables for artisans and job posts
+
+Revision ID: f1b6d2e8c437
+Revises: e5a90c1d7b42
+Create Date: 2026-10-18 17:58:22.804513
+
+FTS5 virtual tables on SQLite, tsvector tables with GIN indexes on
+PostgreSQL; see app.search. Other databases keep LIKE matching and get no
+table.
+
+"""
+from alembic import op
+
+from app.search import SEARCH_INDEXES
+
+
+# revision identifiers, used by Alembic.
+revision = 'f1b6d2e8c437'
+down_revision = 'e5a90c1d7b42'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    conn = op.get_bind()
+    for index in SEARCH_INDEXES:
+        index.create(conn)
+        index.rebuild(conn)
+
+
+def downgrade():
+    conn = op.get_bind()
+    for index in SEARCH_INDEXES:
+        index.drop(conn)
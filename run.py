@@ -1,8 +1,8 @@
+"""Development server. In production run ``gunicorn wsgi:app`` (see gunicorn.conf.py)."""
 import os
 from app import create_app
 
-print(os.getcwd())
 app = create_app()
 
 if __name__ == '__main__':
-    app.run(host="0.0.0.0", port=int(os.environ.get("PORT", 5000)), debug=True)
\ No newline at end of file
+    app.run(host="0.0.0.0", port=int(os.environ.get("PORT", 5000)), debug=app.config['DEBUG'], threaded=True)
@@ -0,0 +1,91 @@
+import unittest
+from contextlib import contextmanager
+
+from flask_login.utils import _create_identifier
+from sqlalchemy import event
+
+from app import create_app, db
+from app.models import User, Artisan
+
+
+@contextmanager
+def count_queries(engine):
+    """Collect the SQL statements executed on ``engine`` inside the block."""
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(engine, 'before_cursor_execute', before_cursor_execute)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, 'before_cursor_execute', before_cursor_execute)
+
+
+class AppTestCase(unittest.TestCase):
+    """Test case with a fresh in-memory app, a test client and data helpers."""
+
+    def setUp(self):
+        self.app = create_app({
+            'TESTING': True,
+            'SQLALCHEMY_DATABASE_URI': 'sqlite:///:memory:',
+            'WTF_CSRF_ENABLED': False,
+            'NOTIFICATIONS_ASYNC': False,
+            'PASSWORD_HASH_METHOD': 'pbkdf2:sha256:1000',
+        })
+        self.client = self.app.test_client()
+        with self.app.app_context():
+            db.create_all()
+
+    def tearDown(self):
+        with self.app.app_context():
+            db.session.remove()
+            db.drop_all()
+
+    def _add_user(self, email, name=None):
+        user = User(email=email, name=name or email.split('@')[0])
+        user.set_password('Password123')
+        db.session.add(user)
+        db.session.commit()
+        return user.id
+
+    def _login(self, user_id):
+        # Seed the session directly; the /login route checks email deliverability over DNS
+        with self.app.test_request_context(environ_base=self.client.environ_base):
+            identifier = _create_identifier()
+        with self.client.session_transaction() as sess:
+            sess['_user_id'] = str(user_id)
+            sess['_fresh'] = True
+            sess['_id'] = identifier
+
+    def _add_artisan(self, email, lat, lng, skills='Plumber', location='Lagos'):
+        user = User(email=email, name=email.split('@')[0], is_artisan=True)
+        user.set_password('Password123')
+        db.session.add(user)
+        db.session.flush()
+        artisan = Artisan(user_id=user.id, skills=skills, location=location)
+        if lat is not None:
+            artisan.set_coordinates(lat, lng)
+        db.session.add(artisan)
+        db.session.commit()
+        return artisan
+
+    def count_request_queries(self, url):
+        """Return the number of SQL statements a GET of ``url`` executes."""
+        with self.app.app_context():
+            engine = db.engine
+        with count_queries(engine) as statements:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200, url)
+        return len(statements)
+
+    def assertQueryCountConstant(self, url, add_rows, batch=5):
+        """Fail if the queries for ``url`` grow with the rows ``add_rows(n)`` creates."""
+        with self.app.app_context():
+            add_rows(batch)
+        small = self.count_request_queries(url)
+        with self.app.app_context():
+            add_rows(batch * 2)
+        large = self.count_request_queries(url)
+        self.assertEqual(small, large, f'{url} ran {small} queries for {batch} rows but {large} for {batch * 3}')
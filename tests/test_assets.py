@@ -0,0 +1,47 @@
+import gzip
+import os
+import unittest
+
+from flask import url_for
+
+from app.assets import get_manifest
+from tests.helpers import AppTestCase
+
+
+class TestStaticAssets(AppTestCase):
+    def _styles_url(self):
+        with self.app.test_request_context():
+            return url_for('static', filename='styles.css'), get_manifest().fingerprint('styles.css')
+
+    def test_url_for_adds_content_fingerprint(self):
+        url, digest = self._styles_url()
+        self.assertEqual(url, f'/static/styles.css?v={digest}')
+        with self.app.test_request_context():
+            self.assertEqual(url_for('static', filename='uploads/missing.png'), '/static/uploads/missing.png')
+
+    def test_fingerprinted_url_is_immutable(self):
+        url, _ = self._styles_url()
+        cache_control = self.client.get(url).headers['Cache-Control']
+        self.assertIn('immutable', cache_control)
+        self.assertIn('max-age=31536000', cache_control)
+        self.assertNotIn('immutable', self.client.get('/static/styles.css?v=stale').headers.get('Cache-Control', ''))
+
+    def test_precompressed_gzip_is_served_when_accepted(self):
+        url, digest = self._styles_url()
+        response = self.client.get(url, headers={'Accept-Encoding': 'gzip'})
+        self.assertEqual(response.headers['Content-Encoding'], 'gzip')
+        self.assertIn('Accept-Encoding', response.headers['Vary'])
+        with open(os.path.join(self.app.static_folder, 'styles.css'), 'rb') as f:
+            self.assertEqual(gzip.decompress(response.data), f.read())
+        revalidated = self.client.get(url, headers={'Accept-Encoding': 'gzip', 'If-None-Match': f'"{digest}-gzip"'})
+        self.assertEqual(revalidated.status_code, 304)
+
+    def test_uncompressed_when_not_accepted(self):
+        url, _ = self._styles_url()
+        response = self.client.get(url, headers={'Accept-Encoding': 'identity'})
+        self.assertNotIn('Content-Encoding', response.headers)
+        response.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,94 @@
+import re
+import unittest
+from unittest import mock
+
+from app import db
+from app.cache import CSRF_PLACEHOLDER, MemoryCache
+from app.models import JobPost, Review
+from tests.helpers import AppTestCase, count_queries
+
+
+class TestMemoryCache(unittest.TestCase):
+    def test_evicts_least_recently_used(self):
+        cache = MemoryCache(max_entries=2)
+        cache.set('a', 1, ttl=60)
+        cache.set('b', 2, ttl=60)
+        cache.get('a')
+        cache.set('c', 3, ttl=60)
+        self.assertEqual((cache.get('a'), cache.get('b'), cache.get('c')), (1, None, 3))
+
+    def test_entries_expire(self):
+        cache = MemoryCache()
+        with mock.patch('app.cache.time.monotonic', return_value=100.0):
+            cache.set('a', 1, ttl=10)
+        with mock.patch('app.cache.time.monotonic', return_value=111.0):
+            self.assertIsNone(cache.get('a'))
+
+    def test_invalidate_bumps_only_its_tags(self):
+        cache = MemoryCache()
+        cache.invalidate('review')
+        self.assertEqual(cache.generations(['review', 'job_post']), [1, 0])
+
+
+class TestResponseCache(AppTestCase):
+    def _add_review(self, comment):
+        with self.app.app_context():
+            artisan = self._add_artisan(f'{comment}@example.com', None, None)
+            customer_id = self._add_user(f'customer-{comment}@example.com')
+            db.session.add(Review(customer_id=customer_id, artisan_id=artisan.id, rating=5, comment=comment))
+            db.session.commit()
+
+    def test_reviews_served_from_cache_until_a_review_is_added(self):
+        self._add_review('first')
+        self.assertEqual(len(self.client.get('/api/reviews').get_json()), 1)
+        with self.app.app_context():
+            engine = db.engine
+        with count_queries(engine) as statements:
+            self.assertEqual(len(self.client.get('/api/reviews').get_json()), 1)
+        self.assertEqual(statements, [])
+        self._add_review('second')
+        self.assertEqual(len(self.client.get('/api/reviews').get_json()), 2)
+
+    def test_conditional_get_returns_not_modified(self):
+        self._add_review('first')
+        response = self.client.get('/api/reviews')
+        self.assertIsNotNone(response.headers.get('ETag'))
+        self.assertIsNotNone(response.headers.get('Last-Modified'))
+        self.assertEqual(
+            self.client.get('/api/reviews', headers={'If-None-Match': response.headers['ETag']}).status_code, 304
+        )
+        self.assertEqual(
+            self.client.get('/api/reviews', headers={'If-Modified-Since': response.headers['Last-Modified']}).status_code,
+            304
+        )
+        self._add_review('second')
+        self.assertEqual(
+            self.client.get('/api/reviews', headers={'If-None-Match': response.headers['ETag']}).status_code, 200
+        )
+
+    def test_cached_page_gets_each_visitor_their_own_csrf_token(self):
+        pages = [self.app.test_client().get('/jobs').get_data(as_text=True) for _ in range(2)]
+        tokens = [re.search(r'name="csrf-token" content="([^"]+)"', page).group(1) for page in pages]
+        self.assertNotIn(CSRF_PLACEHOLDER, pages[1])
+        self.assertNotEqual(tokens[0], tokens[1])
+
+    def test_logged_in_pages_are_not_cached(self):
+        self.assertNotIn('Post a Job', self.client.get('/jobs').get_data(as_text=True))
+        with self.app.app_context():
+            user_id = self._add_user('me@example.com')
+        self._login(user_id)
+        response = self.client.get('/jobs')
+        self.assertIn('Post a Job', response.get_data(as_text=True))
+        self.assertIsNone(response.headers.get('ETag'))
+
+    def test_new_job_invalidates_job_list(self):
+        self.client.get('/jobs')
+        with self.app.app_context():
+            user_id = self._add_user('poster@example.com')
+            db.session.add(JobPost(title='Fix my sink', description='Leaking', location='Lagos', user_id=user_id))
+            db.session.commit()
+        self.assertIn('Fix my sink', self.client.get('/jobs').get_data(as_text=True))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,86 @@
+import os
+import tempfile
+import time
+import unittest
+from datetime import datetime, timedelta
+from app import db
+from app.models import Conversation, Message, MessageArchive, Notification, User
+from tests.helpers import AppTestCase
+
+
+class TestMaintenanceCommands(AppTestCase):
+    def invoke(self, *args):
+        result = self.app.test_cli_runner().invoke(args=list(args))
+        self.assertEqual(result.exit_code, 0, result.output)
+        return result.output
+
+    def test_purge_notifications_keeps_recent_and_unread(self):
+        old = datetime.utcnow() - timedelta(days=100)
+        with self.app.app_context():
+            user = self._add_user('me@example.com')
+            db.session.add_all([
+                Notification(user_id=user, type='message', message='old read', is_read=True, timestamp=old),
+                Notification(user_id=user, type='message', message='old unread', is_read=False, timestamp=old),
+                Notification(user_id=user, type='message', message='new read', is_read=True),
+            ])
+            db.session.commit()
+        output = self.invoke('purge-notifications', '--days', '90', '--batch-size', '1')
+        self.assertIn('notification: 1/1 rows', output)
+        with self.app.app_context():
+            self.assertEqual(sorted(n.message for n in Notification.query), ['new read', 'old unread'])
+        self.invoke('purge-notifications', '--days', '90', '--include-unread')
+        with self.app.app_context():
+            self.assertEqual([n.message for n in Notification.query], ['new read'])
+
+    def test_archive_messages_moves_threads_newest_first(self):
+        old = datetime.utcnow() - timedelta(days=400)
+        with self.app.app_context():
+            me = self._add_user('me@example.com')
+            partner = self._add_user('partner@example.com')
+            parent = Message(sender_id=me, recipient_id=partner, content='question', timestamp=old)
+            db.session.add(parent)
+            db.session.flush()
+            db.session.add(Message(sender_id=partner, recipient_id=me, content='answer', timestamp=old,
+                                   parent_id=parent.id))
+            db.session.add(Message(sender_id=me, recipient_id=partner, content='old but latest', timestamp=old))
+            db.session.commit()
+        output = self.invoke('archive-messages', '--days', '365', '--batch-size', '1')
+        self.assertIn('message: 2 rows', output)
+        with self.app.app_context():
+            self.assertEqual([m.content for m in Message.query], ['old but latest'])
+            archived = {m.content: m for m in MessageArchive.query}
+            self.assertEqual(set(archived), {'question', 'answer'})
+            self.assertEqual(archived['answer'].parent_id, archived['question'].id)
+            self.assertEqual(Conversation.query.one().last_message_snippet, 'old but latest')
+
+        # Archived messages stay readable through the chat history pages
+        self._login(me)
+        data = self.client.get(f'/api/messages/{partner}/history?limit=2').get_json()
+        self.assertEqual([m['content'] for m in data['messages']], ['answer', 'old but latest'])
+        data = self.client.get(f"/api/messages/{partner}/history?limit=2&before={data['next_cursor']}").get_json()
+        self.assertEqual([m['content'] for m in data['messages']], ['question'])
+        self.assertIsNone(data['next_cursor'])
+
+    def test_cleanup_uploads_removes_only_old_unreferenced_files(self):
+        with tempfile.TemporaryDirectory() as upload_path:
+            for name in ('kept.png', 'kept-thumb.webp', 'orphan.png', 'fresh.png'):
+                with open(os.path.join(upload_path, name), 'wb') as f:
+                    f.write(b'x' * 10)
+            stale = time.time() - 7200
+            for name in ('kept.png', 'kept-thumb.webp', 'orphan.png'):
+                os.utime(os.path.join(upload_path, name), (stale, stale))
+            with self.app.app_context():
+                user = db.session.get(User, self._add_user('me@example.com'))
+                user.profile_pic = '/static/uploads/kept.png'
+                user.profile_pic_thumb = '/static/uploads/kept-thumb.webp'
+                db.session.commit()
+            output = self.invoke('cleanup-uploads', '--path', upload_path, '--dry-run')
+            self.assertIn('Would remove orphan.png', output)
+            self.assertEqual(len(os.listdir(upload_path)), 4)
+            output = self.invoke('cleanup-uploads', '--path', upload_path)
+            self.assertIn('removed 1 files', output)
+            self.assertEqual(sorted(os.listdir(upload_path)), ['fresh.png', 'kept-thumb.webp', 'kept.png'])
+
+
+if __name__ == '__main__':
+    unittest.main()
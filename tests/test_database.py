@@ -0,0 +1,111 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+import email_validator
+from sqlalchemy.orm import Session
+from app import create_app, db
+from app.database import engine_options
+from app.database import PRIMARY_PIN_KEY
+from app.models import JobPost, Notification, User
+from tests.helpers import AppTestCase
+
+
+class TestDatabaseSetup(unittest.TestCase):
+    def test_file_sqlite_gets_pragmas(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            app = create_app({
+                'TESTING': True,
+                'SQLALCHEMY_DATABASE_URI': f"sqlite:///{os.path.join(tmp, 'test.db')}",
+                'SQLITE_BUSY_TIMEOUT_MS': 1234,
+            })
+            with app.app_context():
+                with db.engine.connect() as conn:
+                    pragma = lambda name: conn.exec_driver_sql(f'PRAGMA {name}').scalar()
+                    self.assertEqual(pragma('journal_mode'), 'wal')
+                    self.assertEqual(pragma('synchronous'), 1)  # NORMAL
+                    self.assertEqual(pragma('busy_timeout'), 1234)
+                    self.assertEqual(pragma('cache_size'), -20000)
+                db.engine.dispose()
+
+    def test_server_databases_get_pool_options(self):
+        app = create_app({'TESTING': True, 'SQLALCHEMY_DATABASE_URI': 'sqlite:///:memory:', 'DB_POOL_SIZE': 3})
+        options = engine_options('postgresql://user:secret@db/handyverse', app.config)
+        self.assertEqual(options['pool_size'], 3)
+        self.assertTrue(options['pool_pre_ping'])
+        self.assertEqual(engine_options('sqlite:///:memory:', app.config), {})
+
+
+class TestReadReplicas(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.app = create_app({
+            'TESTING': True,
+            'WTF_CSRF_ENABLED': False,
+            'PASSWORD_HASH_METHOD': 'pbkdf2:sha256:1000',
+            'SQLALCHEMY_DATABASE_URI': f"sqlite:///{os.path.join(self.tmp.name, 'primary.db')}",
+            'SQLALCHEMY_REPLICA_URIS': [f"sqlite:///{os.path.join(self.tmp.name, 'replica.db')}"],
+            'RESPONSE_CACHE_TTL': 0,
+        })
+        self.client = self.app.test_client()
+        with self.app.app_context():
+            db.create_all()
+            replica = self.app.extensions['replica_engines'][0]
+            db.metadata.create_all(replica)
+            # Give each database a job only it has, to see where reads went
+            for engine, title in ((db.engines[None], 'Primary job'), (replica, 'Replica job')):
+                with Session(engine) as session:
+                    owner = User(email='owner@example.com', name='owner')
+                    session.add(owner)
+                    session.flush()
+                    session.add(JobPost(user_id=owner.id, title=title, description='Fix it'))
+                    session.commit()
+
+    def tearDown(self):
+        with self.app.app_context():
+            for engine in [*db.engines.values(), *self.app.extensions['replica_engines']]:
+                engine.dispose()
+        self.tmp.cleanup()
+
+    @mock.patch.object(email_validator, 'CHECK_DELIVERABILITY', False)
+    def test_reads_use_replica_until_client_writes(self):
+        response = self.client.get('/jobs')
+        self.assertIn(b'Replica job', response.data)
+        self.assertNotIn(b'Primary job', response.data)
+
+        # Writes always go to the primary, and pin this client there for its next reads
+        response = self.client.post('/register', json={
+            'accountType': 'user', 'name': 'Ada', 'email': 'ada@example.com', 'password': 'Password123',
+            'phone_number': '0800', 'location': 'Lagos'
+        })
+        self.assertTrue(response.get_json()['success'])
+        with self.app.app_context():
+            self.assertEqual(User.query.filter_by(email='ada@example.com').count(), 1)
+        response = self.client.get('/jobs')
+        self.assertIn(b'Primary job', response.data)
+        self.assertNotIn(b'Replica job', response.data)
+
+    def test_response_cache_fills_from_primary(self):
+        self.app.config['RESPONSE_CACHE_TTL'] = 60
+        for _ in range(2):
+            response = self.client.get('/jobs')
+            self.assertIn(b'Primary job', response.data)
+            self.assertNotIn(b'Replica job', response.data)
+
+    def test_core_update_outside_read_only_view_pins_client(self):
+        with self.app.app_context():
+            for engine in (db.engines[None], self.app.extensions['replica_engines'][0]):
+                with Session(engine) as session:
+                    session.add_all([Notification(user_id=1, type='message', message=f'n{i}') for i in range(3)])
+                    session.commit()
+        AppTestCase._login(self, 1)
+        response = self.client.post('/api/notifications/read', json={'all': True})
+        self.assertEqual(response.get_json()['updated'], 3)
+        with self.client.session_transaction() as sess:
+            self.assertIn(PRIMARY_PIN_KEY, sess)
+        notifications = self.client.get('/api/notifications').get_json()
+        self.assertEqual([n['is_read'] for n in notifications], [True, True, True])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,75 @@
+import queue
+import time
+import unittest
+from app.events import EventBroker, RedisEventBroker, format_sse, redis
+
+
+class FakePubSubClient:
+    """Just enough of a Redis client for RedisEventBroker: one in-memory channel."""
+
+    def __init__(self):
+        self.listeners = []
+
+    def publish(self, channel, message):
+        for listener in self.listeners:
+            listener.put({'type': 'message', 'channel': channel, 'data': message})
+        return len(self.listeners)
+
+    def pubsub(self, ignore_subscribe_messages=False):
+        client = self
+
+        class PubSub:
+            def subscribe(self, channel):
+                self.messages = queue.Queue()
+                client.listeners.append(self.messages)
+
+            def listen(self):
+                while True:
+                    yield self.messages.get()
+
+            def close(self):
+                pass
+
+        return PubSub()
+
+
+class TestEventBroker(unittest.TestCase):
+    def test_publish_reaches_only_subscribed_user(self):
+        broker = EventBroker()
+        mine = broker.subscribe(1)
+        theirs = broker.subscribe(2)
+        self.assertEqual(broker.publish(1, 'message', {'id': 5}), 1)
+        self.assertEqual(mine.get_nowait(), ('message', {'id': 5}))
+        self.assertTrue(theirs.empty())
+
+    def test_unsubscribe_and_full_queue(self):
+        broker = EventBroker(max_queue_size=1)
+        q = broker.subscribe(1)
+        broker.publish(1, 'notification', {'id': 1})
+        broker.publish(1, 'notification', {'id': 2})  # Dropped, queue is full
+        self.assertEqual(q.qsize(), 1)
+        broker.unsubscribe(1, q)
+        self.assertEqual(broker.subscriber_count(), 0)
+        self.assertEqual(broker.publish(1, 'notification', {'id': 3}), 0)
+
+    @unittest.skipIf(redis is None, 'redis is not installed')
+    def test_redis_broker_fans_out_between_processes(self):
+        client = FakePubSubClient()
+        # Two brokers on one channel stand in for two worker processes
+        here, there = RedisEventBroker(client), RedisEventBroker(client)
+        q = there.subscribe(1)
+        # The listener thread subscribes to the channel shortly after the first local subscriber
+        deadline = time.monotonic() + 1
+        while not client.listeners and time.monotonic() < deadline:
+            time.sleep(0.01)
+        self.assertEqual(here.publish(1, 'message', {'id': 5}), 1)
+        self.assertEqual(q.get(timeout=1), ('message', {'id': 5}))
+        self.assertTrue(there.shared)
+        self.assertFalse(EventBroker.shared)
+
+    def test_format_sse(self):
+        self.assertEqual(format_sse('message', {'id': 1}), 'event: message\ndata: {"id": 1}\n\n')
+
+
+if __name__ == '__main__':
+    unittest.main()
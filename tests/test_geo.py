@@ -0,0 +1,44 @@
+import unittest
+from app.geo import haversine, grid_cell, bounding_box, cell_ranges_for_box, GeoIndex
+
+
+class TestGeo(unittest.TestCase):
+    def test_haversine_known_distance(self):
+        # Lagos to Abuja is roughly 525km
+        self.assertAlmostEqual(haversine(6.5244, 3.3792, 9.0765, 7.3986), 525, delta=5)
+
+    def test_box_cells_cover_radius(self):
+        lat, lng = 6.5244, 3.3792
+        ranges = cell_ranges_for_box(*bounding_box(lat, lng, 30))
+        cells = {cell for lo, hi in ranges for cell in range(lo, hi + 1)}
+        self.assertIn(grid_cell(lat, lng), cells)
+        self.assertIn(grid_cell(6.78, 3.55), cells)  # near the edge of the box
+        self.assertNotIn(grid_cell(9.0765, 7.3986), cells)
+
+    def test_huge_radius_skips_cells(self):
+        self.assertIsNone(cell_ranges_for_box(*bounding_box(0, 0, 5000)))
+
+    def test_index_radius_and_limit(self):
+        rows = [(1, 6.5244, 3.3792), (2, 6.60, 3.35), (3, 6.45, 3.40), (4, 9.0765, 7.3986)]
+        index = GeoIndex(lambda: rows)
+        hits = index.nearest(6.52, 3.37, radius_km=30)
+        self.assertEqual([i for i, _ in hits], [1, 3, 2])
+        self.assertEqual([i for i, _ in index.nearest(6.52, 3.37, radius_km=30, limit=2)], [1, 3])
+        for artisan_id, dist in hits:
+            lat, lng = {r[0]: r[1:] for r in rows}[artisan_id]
+            self.assertAlmostEqual(dist, haversine(6.52, 3.37, lat, lng), places=6)
+        # Unbounded radius falls back to a full scan
+        self.assertEqual(index.nearest(6.52, 3.37, limit=4)[-1][0], 4)
+
+    def test_index_rebuilds_after_invalidate(self):
+        rows = [(1, 6.5244, 3.3792)]
+        index = GeoIndex(lambda: rows)
+        self.assertEqual(len(index), 1)
+        rows.append((2, 6.53, 3.38))
+        self.assertEqual(len(index), 1)
+        index.invalidate()
+        self.assertEqual(len(index), 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
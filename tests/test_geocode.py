@@ -0,0 +1,90 @@
+import unittest
+from app import db
+from app.geocode import Geocoder, Place, tokenize
+from app.models import Artisan, JobPost, User
+from tests.helpers import AppTestCase
+
+
+class TestGeocoder(unittest.TestCase):
+    def setUp(self):
+        self.geocoder = Geocoder([
+            (Place('Lagos', 'Lagos', 6.52, 3.38), ['Lagos']),
+            (Place('Surulere', 'Lagos', 6.50, 3.35), ['Surulere']),
+            (Place('Victoria Island', 'Lagos', 6.43, 3.42), ['Victoria Island', 'VI']),
+            (Place('Victoria', 'Lagos', 1.0, 1.0), ['Victoria']),
+            (Place('Surulere', 'Oyo', 8.07, 4.33), ['Surulere']),
+            (Place('Ibadan', 'Oyo', 7.38, 3.95), ['Ibadan']),
+        ], cache_size=16)
+
+    def test_tokenize_normalizes_case_accents_and_punctuation(self):
+        self.assertEqual(tokenize('  Ìkẹja-GRA, LAGOS '), ['ikeja', 'gra', 'lagos'])
+
+    def test_most_specific_part_and_longest_name_win(self):
+        self.assertEqual(self.geocoder.resolve('12 Adeola Odeku St, Victoria Island, Lagos'), (6.43, 3.42))
+        self.assertEqual(self.geocoder.resolve('VI'), (6.43, 3.42))
+        self.assertEqual(self.geocoder.resolve('Lagos State, Nigeria'), (6.52, 3.38))
+
+    def test_other_places_settle_ambiguous_names(self):
+        self.assertEqual(self.geocoder.resolve('Surulere, Lagos'), (6.50, 3.35))
+        self.assertEqual(self.geocoder.resolve('Surulere, Ibadan'), (8.07, 4.33))
+        self.assertEqual(self.geocoder.resolve('Surulere'), (6.50, 3.35))
+
+    def test_unknown_places_are_cached_misses(self):
+        self.assertIsNone(self.geocoder.resolve('Atlantis'))
+        self.assertIsNone(self.geocoder.resolve(''))
+        self.geocoder.resolve('Atlantis')
+        self.assertEqual(self.geocoder.cache_info().hits, 1)
+
+
+class TestGeocodeOnWrite(AppTestCase):
+    def test_location_is_resolved_unless_coordinates_were_sent(self):
+        with self.app.app_context():
+            artisan = self._add_artisan('ade@example.com', None, None, location='Yaba, Lagos')
+            self.assertAlmostEqual(artisan.latitude, 6.5095)
+            user = User(email='chi@example.com', name='chi', location='Enugu')
+            db.session.add(user)
+            db.session.commit()
+            self.assertEqual((user.latitude, user.longitude), (6.5244, 7.5186))
+            pinned = self._add_artisan('bola@example.com', 6.6, 3.5, location='Kano')
+            self.assertEqual((pinned.latitude, pinned.longitude), (6.6, 3.5))
+
+            artisan.location = 'Garki, Abuja'
+            db.session.commit()
+            self.assertAlmostEqual(artisan.latitude, 9.03)
+            artisan.location = 'Somewhere unknown'
+            db.session.commit()
+            self.assertEqual((artisan.latitude, artisan.longitude), (None, None))
+            artisan.location = 'Another unknown town'
+            artisan.set_coordinates(7.1, 4.2)
+            db.session.commit()
+            self.assertEqual((artisan.latitude, artisan.longitude), (7.1, 4.2))
+            # The browser sending the same coordinates again still counts as sending them
+            db.session.expire_all()
+            artisan.location = 'Yet another town'
+            artisan.set_coordinates(7.1, 4.2)
+            db.session.commit()
+            self.assertEqual((artisan.latitude, artisan.longitude), (7.1, 4.2))
+
+    def test_backfill_command_fills_missing_coordinates(self):
+        with self.app.app_context():
+            owner = self._add_user('owner@example.com')
+            db.session.add(JobPost(user_id=owner, title='Fix sink', description='Leaking'))
+            db.session.commit()
+            db.session.execute(db.insert(JobPost), [
+                {'user_id': owner, 'title': 'Paint', 'description': 'Walls', 'location': 'Port Harcourt'},
+                {'user_id': owner, 'title': 'Tiles', 'description': 'Floor', 'location': 'Atlantis'},
+            ])
+            db.session.execute(db.update(User).values(location='Ikeja'))
+            db.session.commit()
+        result = self.app.test_cli_runner().invoke(args=['geocode-locations', '--batch-size', '1'])
+        self.assertRegex(result.output, r'user: 1/1 rows, .*; 0 unknown locations')
+        self.assertRegex(result.output, r'job_post: 2/2 rows, .*, last id 3; 1 unknown locations')
+        with self.app.app_context():
+            self.assertAlmostEqual(db.session.get(User, owner).latitude, 6.6018)
+            coordinates = dict(db.session.execute(db.select(JobPost.location, JobPost.latitude)).all())
+            self.assertEqual(coordinates, {None: None, 'Port Harcourt': 4.8156, 'Atlantis': None})
+            self.assertEqual(Artisan.query.count(), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,71 @@
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+from app import create_app, db
+from app.metrics import Histogram, Metrics
+from tests.helpers import AppTestCase
+
+
+class TestMetricsFormat(unittest.TestCase):
+    def test_histogram_buckets_are_cumulative(self):
+        histogram = Histogram((0.1, 1.0))
+        histogram.observe(('a',), 0.05)
+        histogram.observe(('a',), 0.5)
+        histogram.observe(('a',), 5)
+        self.assertEqual(histogram.snapshot()[('a',)], [1, 2, 3, 5.55])
+
+    def test_render_escapes_labels(self):
+        metrics = Metrics()
+        metrics.requests.inc(('say "hi"', 'GET', '200'))
+        self.assertIn('handyverse_requests_total{endpoint="say \\"hi\\"",method="GET",status="200"} 1',
+                      metrics.render())
+
+
+class TestMetricsEndpoint(AppTestCase):
+    def setUp(self):
+        self.profile_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.profile_dir)
+        self.app = create_app({
+            'TESTING': True,
+            'SQLALCHEMY_DATABASE_URI': 'sqlite:///:memory:',
+            'WTF_CSRF_ENABLED': False,
+            'NOTIFICATIONS_ASYNC': False,
+            'PASSWORD_HASH_METHOD': 'pbkdf2:sha256:1000',
+            'METRICS_ENABLED': True,
+            'METRICS_PROFILE_DIR': self.profile_dir,
+        })
+        self.client = self.app.test_client()
+        with self.app.app_context():
+            db.create_all()
+
+    def test_metrics_disabled_by_default(self):
+        app = create_app({'TESTING': True, 'SQLALCHEMY_DATABASE_URI': 'sqlite:///:memory:'})
+        self.assertEqual(app.test_client().get('/metrics').status_code, 404)
+
+    def test_records_latency_sql_and_templates(self):
+        self.client.get('/jobs')
+        body = self.client.get('/metrics').get_data(as_text=True)
+        self.assertIn('handyverse_request_duration_seconds_count{endpoint="main.list_jobs",method="GET"} 1', body)
+        self.assertIn('handyverse_requests_total{endpoint="main.list_jobs",method="GET",status="200"} 1', body)
+        self.assertIn('handyverse_sql_queries_total{endpoint="main.list_jobs"}', body)
+        self.assertIn('handyverse_template_render_seconds_count{template="jobs.html"} 1', body)
+
+    def test_token_required_when_configured(self):
+        self.app.config['METRICS_TOKEN'] = 'secret'
+        self.assertEqual(self.client.get('/metrics').status_code, 401)
+        self.assertEqual(self.client.get('/metrics', headers={'Authorization': 'Bearer secret'}).status_code, 200)
+
+    def test_slow_sampled_request_is_profiled(self):
+        self.app.config.update(METRICS_PROFILE_SAMPLE_RATE=1.0, METRICS_PROFILE_SLOW_MS=0)
+        with mock.patch('app.metrics.random.random', return_value=0.0):
+            self.client.get('/jobs')
+        profiles = os.listdir(self.profile_dir)
+        self.assertEqual(len(profiles), 1)
+        self.assertIn('main.list_jobs', profiles[0])
+
+
+if __name__ == '__main__':
+    unittest.main()
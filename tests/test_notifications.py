@@ -0,0 +1,35 @@
+import unittest
+from app import db
+from app.events import get_broker
+from app.models import Favorite, Notification
+from app.notifications import PENDING_KEY, create_notification, get_worker, notify_favoriters
+from tests.helpers import AppTestCase
+
+
+class TestNotificationWorker(AppTestCase):
+    def test_favoriter_fan_out_runs_on_worker(self):
+        self.app.config.update(NOTIFICATIONS_ASYNC=True)
+        with self.app.app_context():
+            artisan_id = self._add_artisan('art@example.com', None, None).id
+            fans = [self._add_user(f'fan{i}@example.com') for i in range(3)]
+            db.session.add_all([Favorite(user_id=fan, artisan_id=artisan_id) for fan in fans])
+            db.session.commit()
+            inbox = get_broker().subscribe(fans[0])
+            notify_favoriters(artisan_id, 'favorite_update', 'New services')
+            get_worker().join()
+            self.assertEqual(Notification.query.filter_by(type='favorite_update').count(), 3)
+            event, data = inbox.get_nowait()
+            self.assertEqual((event, data['message']), ('notification', 'New services'))
+
+    def test_failed_commit_discards_staged_notifications(self):
+        with self.app.app_context():
+            user_id = self._add_user('me@example.com')
+            create_notification(user_id, 'message', 'Hello')
+            db.session.rollback()
+            self.assertNotIn(PENDING_KEY, db.session.info)
+            db.session.commit()
+            self.assertEqual(Notification.query.count(), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,60 @@
+import threading
+import unittest
+from werkzeug.security import generate_password_hash
+from app import db
+from app.models import User
+from app.passwords import PasswordHasher, PasswordHasherBusy, _Pool
+from tests.helpers import AppTestCase
+
+
+class TestPasswordHasher(AppTestCase):
+    def test_login_rehashes_outdated_parameters(self):
+        with self.app.app_context():
+            user = User(email='me@example.com', name='me',
+                        password_hash=generate_password_hash('Password123', method='pbkdf2:sha256:500'))
+            db.session.add(user)
+            db.session.commit()
+            self.assertFalse(user.check_password('wrong'))
+            self.assertFalse(db.session.is_modified(user))
+            self.assertTrue(user.check_password('Password123'))
+            self.assertTrue(user.password_hash.startswith('pbkdf2:sha256:1000$'))
+            db.session.commit()
+            self.assertTrue(user.check_password('Password123'))
+            self.assertFalse(db.session.is_modified(user))
+
+    def test_saturated_pool_rejects_and_reports_depth(self):
+        pool = _Pool('verify', workers=1, max_queue=0)
+        started, release = threading.Event(), threading.Event()
+
+        def slow():
+            started.set()
+            release.wait(5)
+            return True
+
+        worker = threading.Thread(target=pool.run, args=(slow,))
+        worker.start()
+        started.wait(5)
+        with self.assertRaises(PasswordHasherBusy):
+            pool.run(lambda: True)
+        self.assertEqual(pool.stats(), {'workers': 1, 'active': 1, 'queued': 0, 'rejected': 1})
+        release.set()
+        worker.join(5)
+        self.assertTrue(pool.run(lambda: True))
+
+    def test_slow_pool_times_out_as_busy(self):
+        pool = _Pool('verify', workers=1, max_queue=1)
+        release = threading.Event()
+        with self.assertRaises(PasswordHasherBusy):
+            pool.run(lambda: release.wait(5), timeout=0.05)
+        self.assertEqual(pool.stats()['rejected'], 1)
+        release.set()
+        self.assertTrue(pool.run(lambda: True, timeout=5))
+
+    def test_method_prefix_includes_default_parameters(self):
+        hasher = PasswordHasher(method='pbkdf2:sha256', hash_workers=1, verify_workers=1)
+        self.assertTrue(hasher.needs_rehash(generate_password_hash('x', method='pbkdf2:sha256:1000')))
+        self.assertFalse(hasher.needs_rehash(hasher.hash('x')))
+
+
+if __name__ == '__main__':
+    unittest.main()
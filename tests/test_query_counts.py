@@ -0,0 +1,68 @@
+import unittest
+from itertools import count
+from app import db
+from app.models import User, Artisan, Favorite, JobPost, JobApplication, Review
+from tests.helpers import AppTestCase
+
+_seq = count()
+
+
+def _make_artisan():
+    n = next(_seq)
+    user = User(email=f'artisan{n}@example.com', name=f'Artisan {n}', is_artisan=True)
+    artisan = Artisan(user=user, skills='Plumber', location='Lagos')
+    db.session.add(artisan)
+    return artisan
+
+
+class TestQueryCounts(AppTestCase):
+    """Views must not issue one query per rendered row."""
+
+    def setUp(self):
+        super().setUp()
+        with self.app.app_context():
+            self.owner = self._add_user('owner@example.com')
+            job = JobPost(user_id=self.owner, title='Fix sink', description='Leaking')
+            db.session.add(job)
+            db.session.commit()
+            self.job_id = job.id
+
+    def _add_jobs(self, n):
+        for _ in range(n):
+            poster = User(email=f'poster{next(_seq)}@example.com', name='Poster')
+            db.session.add(JobPost(user=poster, title='Paint wall', description='Two rooms'))
+        db.session.commit()
+
+    def _add_applications(self, n):
+        for _ in range(n):
+            db.session.add(JobApplication(job_post_id=self.job_id, artisan=_make_artisan(), message='Hi'))
+        db.session.commit()
+
+    def _add_favorites(self, n):
+        for _ in range(n):
+            db.session.add(Favorite(user_id=self.owner, artisan=_make_artisan()))
+        db.session.commit()
+
+    def _add_reviews(self, n):
+        for _ in range(n):
+            customer = User(email=f'customer{next(_seq)}@example.com', name='Customer')
+            db.session.add(Review(customer=customer, artisan=_make_artisan(), comment='Great', rating=5))
+        db.session.commit()
+
+    def test_job_board(self):
+        self.assertQueryCountConstant('/jobs', self._add_jobs)
+
+    def test_job_detail_applicants(self):
+        self._login(self.owner)
+        self.assertQueryCountConstant(f'/jobs/{self.job_id}', self._add_applications)
+
+    def test_favorites(self):
+        self._login(self.owner)
+        self.assertQueryCountConstant('/favorites', self._add_favorites)
+
+    def test_reviews(self):
+        self.assertQueryCountConstant('/api/reviews', self._add_reviews)
+
+
+if __name__ == '__main__':
+    unittest.main()
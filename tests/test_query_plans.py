@@ -0,0 +1,68 @@
+import unittest
+from app import create_app, db
+from app.models import Message, Notification, Favorite, JobApplication, JobPost, Conversation
+
+
+class TestQueryPlans(unittest.TestCase):
+    """Guard the hot access paths against regressions to full table scans."""
+
+    def setUp(self):
+        self.app = create_app({
+            'TESTING': True,
+            'SQLALCHEMY_DATABASE_URI': 'sqlite:///:memory:',
+        })
+        self.ctx = self.app.app_context()
+        self.ctx.push()
+        db.create_all()
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.ctx.pop()
+
+    def _plan(self, query):
+        sql = str(query.statement.compile(db.engine, compile_kwargs={'literal_binds': True}))
+        rows = db.session.execute(db.text(f'EXPLAIN QUERY PLAN {sql}')).fetchall()
+        return [row[-1] for row in rows]
+
+    def assertNoFullScan(self, query):
+        plan = self._plan(query)
+        scans = [step for step in plan if step.startswith('SCAN')]
+        self.assertEqual(scans, [], f'Full scan in query plan: {plan}')
+        return plan
+
+    def test_inbox_uses_sender_and_recipient_indexes(self):
+        plan = self.assertNoFullScan(Message.query.filter(
+            (Message.sender_id == 1) | (Message.recipient_id == 1)
+        ).order_by(Message.timestamp.asc()))
+        # Both sides of the OR must be answered from an index
+        searches = [step for step in plan if step.startswith('SEARCH message USING INDEX')]
+        self.assertEqual(len(searches), 2, plan)
+
+    def test_top_level_messages(self):
+        plan = self.assertNoFullScan(Message.top_level_for_user(1))
+        self.assertTrue(any('ix_message_recipient_parent_timestamp' in step for step in plan), plan)
+
+    def test_conversation_delta(self):
+        self.assertNoFullScan(Message.between(1, 2).filter(Message.id > 10).order_by(Message.id.asc()))
+
+    def test_conversation_listing(self):
+        self.assertNoFullScan(Conversation.for_user(1).limit(50))
+
+    def test_latest_notifications(self):
+        plan = self.assertNoFullScan(
+            Notification.query.filter_by(user_id=1).order_by(Notification.timestamp.desc()).limit(20)
+        )
+        self.assertFalse(any('TEMP B-TREE' in step for step in plan), plan)
+
+    def test_favorite_and_application_lookups(self):
+        self.assertNoFullScan(Favorite.query.filter_by(user_id=1, artisan_id=2))
+        self.assertNoFullScan(JobApplication.query.filter_by(job_post_id=1, artisan_id=2))
+
+    def test_job_board_order_uses_index(self):
+        plan = self._plan(JobPost.query.order_by(JobPost.timestamp.desc()).limit(20))
+        self.assertFalse(any('TEMP B-TREE' in step for step in plan), plan)
+
+
+if __name__ == '__main__':
+    unittest.main()
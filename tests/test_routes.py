@@ -1,21 +1,16 @@
 import unittest
-from app import create_app, db
-from app.models import User, Artisan
-
-class TestRoutes(unittest.TestCase):
-    def setUp(self):
-        self.app = create_app()
-        self.app.config['TESTING'] = True
-        self.app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///:memory:'
-        self.client = self.app.test_client()
-        with self.app.app_context():
-            db.create_all()
-
-    def tearDown(self):
-        with self.app.app_context():
-            db.session.remove()
-            db.drop_all()
+from unittest import mock
+import email_validator
+from app import db
+from app.models import User, Artisan, Message, Conversation, Notification, JobPost, JobApplication, Review, Favorite
+from datetime import datetime, timedelta
+from app.events import get_broker
+from app.notifications import create_notification
+from app.passwords import PasswordHasherBusy
+from app.routes import MESSAGE_POLL_LIMIT
+from tests.helpers import AppTestCase, count_queries
 
+class TestRoutes(AppTestCase):
     def test_index_page(self):
         response = self.client.get('/')
         self.assertEqual(response.status_code, 200)
@@ -24,5 +19,363 @@ class TestRoutes(unittest.TestCase):
         response = self.client.get('/search?location=test')
         self.assertEqual(response.status_code, 200)
 
+    def test_search_by_coordinates_uses_radius(self):
+        with self.app.app_context():
+            self._add_artisan('near@example.com', 6.5244, 3.3792)
+            self._add_artisan('close@example.com', 6.6000, 3.3500)
+            self._add_artisan('far@example.com', 9.0765, 7.3986)  # Abuja
+            self._add_artisan('nowhere@example.com', None, None, location='Atlantis')
+        response = self.client.get('/search?lat=6.52&lng=3.37')
+        self.assertEqual(response.status_code, 200)
+        names = [a['name'] for a in response.get_json()]
+        self.assertEqual(names, ['near', 'close'])
+        response = self.client.get('/search?lat=6.52&lng=3.37&radius_km=1000&limit=1')
+        self.assertEqual([a['name'] for a in response.get_json()], ['near'])
+    def test_poll_messages_returns_only_new_messages(self):
+        with self.app.app_context():
+            me = self._add_user('me@example.com')
+            partner = self._add_user('partner@example.com')
+            other = self._add_user('other@example.com')
+            db.session.add_all([
+                Message(sender_id=partner, recipient_id=me, content='hello'),
+                Message(sender_id=other, recipient_id=me, content='unrelated'),
+            ])
+            db.session.commit()
+            first_id = Message.query.filter_by(content='hello').one().id
+        self._login(me)
+        data = self.client.get(f'/api/messages/{partner}').get_json()
+        self.assertEqual([m['content'] for m in data['messages']], ['hello'])
+        self.assertEqual(data['last_id'], first_id)
+
+        response = self.client.post(
+            f'/send_message/{partner}', data={'content': 'hi back'},
+            headers={'X-Requested-With': 'XMLHttpRequest'}
+        )
+        self.assertTrue(response.get_json()['success'])
+        data = self.client.get(f'/api/messages/{partner}?since_id={first_id}').get_json()
+        self.assertEqual([(m['content'], m['is_mine']) for m in data['messages']], [('hi back', True)])
+        data = self.client.get(f"/api/messages/{partner}?since_id={data['last_id']}").get_json()
+        self.assertEqual(data['messages'], [])
+
+    def test_poll_messages_without_cursor_returns_latest_page(self):
+        with self.app.app_context():
+            me = self._add_user('me@example.com')
+            partner = self._add_user('partner@example.com')
+            db.session.add_all([
+                Message(sender_id=partner, recipient_id=me, content=f'message {i}') for i in range(MESSAGE_POLL_LIMIT + 5)
+            ])
+            db.session.commit()
+            last_id = db.session.scalar(db.select(db.func.max(Message.id)))
+        self._login(me)
+        data = self.client.get(f'/api/messages/{partner}').get_json()
+        contents = [m['content'] for m in data['messages']]
+        self.assertEqual(contents[0], 'message 5')
+        self.assertEqual(contents[-1], f'message {MESSAGE_POLL_LIMIT + 4}')
+        self.assertEqual(data['last_id'], last_id)
+
+    def test_send_message_pushes_events_to_recipient(self):
+        with self.app.app_context():
+            me = self._add_user('me@example.com')
+            partner = self._add_user('partner@example.com')
+        self._login(me)
+        with self.app.app_context():
+            inbox = get_broker().subscribe(partner)
+        self.client.post(f'/send_message/{partner}', data={'content': 'ping'})
+        events = dict([inbox.get_nowait(), inbox.get_nowait()])
+        self.assertEqual(sorted(events), ['message', 'notification'])
+        self.assertEqual(events['message']['sender_id'], me)
+
+    def test_event_stream_and_long_poll(self):
+        with self.app.app_context():
+            me = self._add_user('me@example.com')
+        self._login(me)
+        response = self.client.get('/api/stream', buffered=False)
+        self.assertEqual(response.mimetype, 'text/event-stream')
+        with self.app.app_context():
+            get_broker().publish(me, 'notification', {'id': 7})
+        chunks = iter(response.response)
+        self.assertTrue(next(chunks).startswith(b'retry:'))
+        self.assertEqual(next(chunks), b'event: ready\ndata: {"shared": false}\n\n')
+        self.assertEqual(next(chunks), b'event: notification\ndata: {"id": 7}\n\n')
+        response.close()
+        with self.app.app_context():
+            self.assertEqual(get_broker().subscriber_count(me), 0)
+        self.assertEqual(self.client.get('/api/events?timeout=0').get_json(), [])
+
+    def test_event_streams_are_capped_per_process(self):
+        self.app.config['EVENT_STREAM_MAX_CLIENTS'] = 1
+        with self.app.app_context():
+            me = self._add_user('me@example.com')
+        self._login(me)
+        first = self.client.get('/api/stream', buffered=False)
+        self.assertEqual(first.status_code, 200)
+        second = self.client.get('/api/stream')
+        self.assertEqual(second.status_code, 503)
+        self.assertIn('Retry-After', second.headers)
+        self.assertEqual(self.client.get('/api/events?timeout=0').status_code, 503)
+        first.close()
+        self.assertEqual(self.client.get('/api/events?timeout=0').status_code, 200)
+
+    def test_duplicate_favorite_rejected_by_unique_index(self):
+        with self.app.app_context():
+            me = self._add_user('me@example.com')
+            artisan_id = self._add_artisan('art@example.com', None, None).id
+        self._login(me)
+        self.assertTrue(self.client.post(f'/favorite/{artisan_id}').get_json()['success'])
+        response = self.client.post(f'/favorite/{artisan_id}').get_json()
+        self.assertEqual(response, {'success': False, 'message': 'Already favorited.'})
+        self.assertEqual(len(self.client.get('/favorites').get_json()), 1)
+        self.assertEqual(self.client.post(f'/favorite/{artisan_id + 100}').status_code, 404)
+
+    def test_rating_totals_follow_review_changes(self):
+        with self.app.app_context():
+            me = self._add_user('me@example.com')
+            good = self._add_artisan('good@example.com', None, None).id
+            fair = self._add_artisan('fair@example.com', None, None).id
+            self._add_artisan('new@example.com', None, None)
+            first = Review(customer_id=me, artisan_id=good, comment='ok', rating=3)
+            second = Review(customer_id=me, artisan_id=good, comment='great', rating=5)
+            db.session.add_all([first, second, Review(customer_id=me, artisan_id=fair, comment='meh', rating=4)])
+            db.session.commit()
+            self.assertEqual((db.session.get(Artisan, good).rating_sum, db.session.get(Artisan, good).rating_count), (8, 2))
+
+            first.rating = 5
+            db.session.commit()
+            self.assertEqual(db.session.get(Artisan, good).average_rating, 5)
+            second.artisan_id = fair
+            db.session.commit()
+            self.assertEqual(db.session.get(Artisan, fair).rating_count, 2)
+            db.session.delete(first)
+            db.session.commit()
+            artisan = db.session.get(Artisan, good)
+            self.assertEqual((artisan.rating_sum, artisan.rating_count, artisan.average_rating), (0, 0, None))
+            for artisan_id in (good, fair):
+                db.session.add(Favorite(user_id=me, artisan_id=artisan_id))
+            db.session.commit()
+
+        results = self.client.get('/search?location=Lagos&sort=rating').get_json()
+        self.assertEqual([(r['name'], r['average_rating'], r['review_count']) for r in results],
+                         [('fair', 4.5, 2), ('good', None, 0), ('new', None, 0)])
+        self._login(me)
+        favorites = self.client.get('/favorites?sort=rating').get_json()
+        self.assertEqual([f['artisan_id'] for f in favorites], [fair, good])
+
+    def test_conversation_summary_tracks_messages_and_unread(self):
+        with self.app.app_context():
+            me = self._add_user('me@example.com')
+            partner = self._add_user('partner@example.com')
+            db.session.add(Message(sender_id=partner, recipient_id=me, content='first'))
+            db.session.commit()
+            db.session.add(Message(sender_id=partner, recipient_id=me, content='second'))
+            db.session.commit()
+            conversation = Conversation.for_user(me).one()
+            self.assertEqual(conversation.last_message_snippet, 'second')
+            self.assertEqual(conversation.unread_for(me), 2)
+            self.assertEqual(conversation.unread_for(partner), 0)
+        self._login(me)
+        response = self.client.get(f'/messages?partner_id={partner}')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(b'second', response.data)
+        with self.app.app_context():
+            self.assertEqual(Conversation.for_user(me).one().unread_for(me), 0)
+
+    def test_notifications_keyset_pagination(self):
+        with self.app.app_context():
+            me = self._add_user('me@example.com')
+            base = datetime(2026, 1, 1)
+            # Two notifications share a timestamp so the id tie-breaker is exercised
+            for i in range(25):
+                db.session.add(Notification(user_id=me, type='message', message=f'n{i}',
+                                            timestamp=base + timedelta(minutes=min(i, 20))))
+            db.session.commit()
+        self._login(me)
+        seen = []
+        url = '/api/notifications'
+        while url:
+            response = self.client.get(url)
+            seen.extend(n['message'] for n in response.get_json())
+            cursor = response.headers.get('X-Next-Cursor')
+            url = f'/api/notifications?before={cursor}' if cursor else None
+        self.assertEqual(len(seen), 25)
+        self.assertEqual(len(set(seen)), 25)
+        self.assertEqual(seen[0], 'n24')
+        self.assertEqual(self.client.get('/api/notifications?before=bogus').status_code, 400)
+
+    def test_job_board_is_paginated(self):
+        with self.app.app_context():
+            owner = self._add_user('owner@example.com')
+            for i in range(25):
+                db.session.add(JobPost(user_id=owner, title=f'Job {i}', description='Fix it',
+                                       timestamp=datetime(2026, 1, 1) + timedelta(hours=i)))
+            db.session.commit()
+        response = self.client.get('/jobs')
+        self.assertIn(b'Job 24', response.data)
+        self.assertNotIn(b'Job 4<', response.data)
+        self.assertIn(b'Load older jobs', response.data)
+
+    def test_message_and_notification_share_one_commit(self):
+        with self.app.app_context():
+            me = self._add_user('me@example.com')
+            partner = self._add_user('partner@example.com')
+            engine = db.engine
+        self._login(me)
+        with count_queries(engine) as statements:
+            self.client.post(f'/send_message/{partner}', data={'content': 'ping'})
+        self.assertEqual(sum(1 for s in statements if s.startswith('INSERT INTO notification')), 1)
+        with self.app.app_context():
+            self.assertEqual(Notification.query.filter_by(user_id=partner).count(), 1)
+
+    def test_profile_update_notifies_favoriters_in_batches(self):
+        self.app.config['NOTIFICATION_BATCH_SIZE'] = 2
+        with self.app.app_context():
+            artisan = self._add_artisan('art@example.com', None, None)
+            fans = [self._add_user(f'fan{i}@example.com') for i in range(5)]
+            db.session.add_all([Favorite(user_id=fan, artisan_id=artisan.id) for fan in fans])
+            db.session.commit()
+            artisan_user = artisan.user_id
+        self._login(artisan_user)
+        with self.app.app_context():
+            engine = db.engine
+        with count_queries(engine) as statements:
+            self.client.post('/artisan_profile', data={
+                'name': 'art', 'email': 'art@example.com', 'location': 'Abuja', 'skills': 'Tiler'
+            })
+        self.assertEqual(sum(1 for s in statements if s.startswith('INSERT INTO notification')), 3)
+        with self.app.app_context():
+            self.assertEqual(
+                sorted(n.user_id for n in Notification.query.filter_by(type='favorite_update')), sorted(fans)
+            )
+
+    def test_unread_count_is_cached_and_bulk_mark_read(self):
+        with self.app.app_context():
+            me = self._add_user('me@example.com')
+            db.session.add_all([Notification(user_id=me, type='message', message=f'n{i}') for i in range(3)])
+            db.session.commit()
+            first_id = Notification.query.filter_by(user_id=me).first().id
+            engine = db.engine
+        self._login(me)
+        self.assertEqual(self.client.get('/api/notifications/unread_count').get_json(), {'unread': 3})
+        with count_queries(engine) as statements:
+            self.client.get('/api/notifications/unread_count')
+        self.assertFalse([s for s in statements if 'notification' in s])
+
+        # A committed notification invalidates the cached count
+        with self.app.test_request_context():
+            create_notification(me, 'message', 'n3')
+            db.session.commit()
+        self.assertEqual(self.client.get('/api/notifications/unread_count').get_json(), {'unread': 4})
+
+        response = self.client.post('/api/notifications/read', json={'ids': [first_id]}).get_json()
+        self.assertEqual((response['updated'], response['unread']), (1, 3))
+        with count_queries(engine) as statements:
+            response = self.client.post('/api/notifications/read', json={'all': True}).get_json()
+        self.assertEqual((response['updated'], response['unread']), (3, 0))
+        self.assertEqual(sum(1 for s in statements if s.startswith('UPDATE notification')), 1)
+        self.assertEqual(self.client.post('/api/notifications/read', json={'ids': 'x'}).status_code, 400)
+        self.assertEqual(self.client.post('/api/notifications/read', json={'ids': [True]}).status_code, 400)
+
+    @mock.patch.object(email_validator, 'CHECK_DELIVERABILITY', False)
+    def test_busy_password_hasher_sends_html_clients_back(self):
+        with self.app.app_context():
+            self._add_user('me@example.com')
+        with mock.patch.object(User, 'check_password', side_effect=PasswordHasherBusy('queue full')):
+            response = self.client.post('/login', data={'email': 'me@example.com', 'password': 'Password123'},
+                                        headers={'Referer': 'http://localhost/login'})
+            self.assertEqual((response.status_code, response.location), (302, 'http://localhost/login'))
+            response = self.client.post('/login', json={'email': 'me@example.com', 'password': 'Password123'})
+            self.assertEqual(response.status_code, 503)
+            self.assertEqual(response.headers['Retry-After'], '1')
+
+    @mock.patch.object(email_validator, 'CHECK_DELIVERABILITY', False)
+    def test_register_artisan_in_one_transaction(self):
+        payload = {
+            'accountType': 'artisan', 'name': 'Ada', 'email': 'ada@example.com', 'password': 'Password123',
+            'phone_number': '0800', 'location': 'Lagos', 'trade': 'Welder'
+        }
+        with self.app.app_context():
+            engine = db.engine
+        with count_queries(engine) as statements:
+            response = self.client.post('/register', json=payload)
+        self.assertTrue(response.get_json()['success'])
+        # No existence pre-check; the unique index on email does that job
+        self.assertFalse([s for s in statements if 'user.email = ' in s])
+
+        again = self.client.post('/register', json=dict(payload, trade='Plumber'))
+        self.assertEqual(again.status_code, 400)
+        self.assertEqual(again.get_json()['message'], 'Email already registered.')
+        with self.app.app_context():
+            self.assertEqual(User.query.count(), 1)
+            self.assertEqual(Artisan.query.one().skills, 'Welder')
+
+    def test_text_search_for_artisans_and_jobs(self):
+        with self.app.app_context():
+            owner = self._add_user('owner@example.com')
+            self._add_artisan('chidi@example.com', None, None, skills='Electrician', location='Yaba, Lagos')
+            self._add_artisan('bola@example.com', None, None, skills='Plumber', location='Lagos')
+            db.session.add(JobPost(user_id=owner, title='Rewire flat', description='Old electrics'))
+            db.session.add(JobPost(user_id=owner, title='Paint fence', description='Two coats'))
+            db.session.commit()
+        results = self.client.get('/search?q=electric&location=lagos').get_json()
+        self.assertEqual([r['name'] for r in results], ['chidi'])
+        response = self.client.get('/jobs?q=rewire')
+        self.assertIn(b'Rewire flat', response.data)
+        self.assertNotIn(b'Paint fence', response.data)
+
+    def test_job_feed_ranks_near_matching_recent_jobs_first(self):
+        now = datetime.utcnow()
+        with self.app.app_context():
+            owner = self._add_user('owner@example.com')
+            artisan_user = self._add_artisan('pat@example.com', 6.5244, 3.3792, skills='Plumber, Tiler').user_id
+            jobs = [
+                # title, lat, lng, age in days
+                ('Plumber for leaking sink', 6.53, 3.38, 1),
+                ('Plumber needed in Abuja', 9.0765, 7.3986, 1),
+                ('Paint the fence', 6.53, 3.38, 1),
+                ('Old plumber job nearby', 6.53, 3.38, 60),
+            ]
+            for title, lat, lng, age in jobs:
+                job = JobPost(user_id=owner, title=title, description='Details', timestamp=now - timedelta(days=age))
+                job.set_coordinates(lat, lng)
+                db.session.add(job)
+            db.session.commit()
+        self._login(artisan_user)
+        feed = self.client.get('/jobs/feed', headers={'X-Requested-With': 'XMLHttpRequest'}).get_json()
+        self.assertEqual([job['title'] for job in feed], [
+            'Plumber for leaking sink', 'Old plumber job nearby', 'Plumber needed in Abuja', 'Paint the fence'
+        ])
+        self.assertLess(feed[0]['distance_km'], 2)
+        self.assertIn(b'Jobs for You', self.client.get('/jobs/feed').data)
+
+    def test_apply_to_job_uses_artisan_id_and_rejects_duplicates(self):
+        with self.app.app_context():
+            owner = self._add_user('owner@example.com')
+            customer = self._add_user('customer@example.com')
+            # An extra user shifts user ids away from artisan ids
+            artisan = self._add_artisan('pat@example.com', 6.5, 3.3)
+            artisan_id, artisan_user = artisan.id, artisan.user_id
+            job = JobPost(user_id=owner, title='Fix sink', description='Leaking')
+            db.session.add(job)
+            db.session.commit()
+            job_id = job.id
+        self.assertNotEqual(artisan_id, artisan_user)
+        self._login(artisan_user)
+        self.client.post(f'/jobs/{job_id}/apply', data={'message': 'Available'})
+        self.client.post(f'/jobs/{job_id}/apply', data={'message': 'Again'})
+        with self.app.app_context():
+            applications = JobApplication.query.filter_by(job_post_id=job_id).all()
+            self.assertEqual([a.artisan_id for a in applications], [artisan_id])
+        self._login(customer)
+        self.client.post(f'/jobs/{job_id}/apply')
+        with self.app.app_context():
+            self.assertEqual(JobApplication.query.filter_by(job_post_id=job_id).count(), 1)
+
+    def test_job_feed_is_for_artisans(self):
+        with self.app.app_context():
+            customer = self._add_user('customer@example.com')
+        self._login(customer)
+        self.assertEqual(self.client.get('/jobs/feed', headers={'X-Requested-With': 'XMLHttpRequest'}).status_code, 403)
+        self.assertEqual(self.client.get('/jobs/feed').status_code, 302)
+
+
 if __name__ == '__main__':
     unittest.main() 
\ No newline at end of file
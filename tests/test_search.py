@@ -0,0 +1,68 @@
+import unittest
+from app import db
+from app.models import User, JobPost
+from app.search import artisan_search, job_search, query_terms
+from tests.helpers import AppTestCase
+
+
+class TestSearch(AppTestCase):
+    def _search(self, index, text=None, **field_text):
+        return index.search(db.session.connection(), text, **field_text)
+
+    def test_query_terms_drop_operators(self):
+        self.assertEqual(query_terms('Plumb* OR "tiler" -x'), ['plumb', 'or', 'tiler', 'x'])
+        self.assertEqual(query_terms('  '), [])
+
+    def test_artisan_index_follows_inserts_updates_and_deletes(self):
+        with self.app.app_context():
+            plumber = self._add_artisan('chidi@example.com', None, None, skills='Plumber', location='Ikeja, Lagos')
+            tiler = self._add_artisan('bola@example.com', None, None, skills='Tiler', location='Abuja')
+            self.assertEqual(self._search(artisan_search, 'plumb'), [plumber.id])
+            self.assertEqual(self._search(artisan_search, 'chidi lagos'), [plumber.id])
+            self.assertEqual(self._search(artisan_search, location='abuja'), [tiler.id])
+            # Location terms only match the location field
+            self.assertEqual(self._search(artisan_search, location='tiler'), [])
+
+            tiler.skills = 'Plumber and tiler'
+            db.session.get(User, plumber.user_id).name = 'Emeka'
+            db.session.commit()
+            self.assertEqual(sorted(self._search(artisan_search, 'plumber')), sorted([plumber.id, tiler.id]))
+            self.assertEqual(self._search(artisan_search, 'emeka'), [plumber.id])
+            self.assertEqual(self._search(artisan_search, 'chidi'), [])
+
+            db.session.delete(tiler)
+            db.session.commit()
+            self.assertEqual(self._search(artisan_search, 'tiler'), [])
+
+    def test_rating_order_is_applied_before_the_limit(self):
+        with self.app.app_context():
+            best_match = self._add_artisan('ada@example.com', None, None, skills='Plumber')
+            unrated = self._add_artisan('bola@example.com', None, None, skills='Plumber')
+            # Only mentions plumbing in the location, so it ranks last on relevance
+            top_rated = self._add_artisan('chidi@example.com', None, None, skills='Tiler', location='Plumber Street')
+            top_rated.rating_sum, top_rated.rating_count = 9, 2
+            best_match.rating_sum, best_match.rating_count = 3, 1
+            db.session.commit()
+            self.assertEqual(self._search(artisan_search, 'plumber', limit=1), [best_match.id])
+            self.assertEqual(self._search(artisan_search, 'plumber', limit=1, order='rating'), [top_rated.id])
+            self.assertEqual(self._search(artisan_search, 'plumber', order='rating'),
+                             [top_rated.id, best_match.id, unrated.id])
+            terms = [(None, 'plumber')]
+            self.assertEqual(artisan_search._search_like(db.session.connection(), terms, 2, 'rating'),
+                             [top_rated.id, best_match.id])
+            with self.assertRaises(ValueError):
+                self._search(artisan_search, 'plumber', order='distance')
+
+    def test_job_search_ranks_title_matches_first(self):
+        with self.app.app_context():
+            owner = self._add_user('owner@example.com')
+            in_description = JobPost(user_id=owner, title='Bathroom work', description='Needs a roof check too')
+            in_title = JobPost(user_id=owner, title='Roof repair', description='Leaking after rain')
+            db.session.add_all([in_description, in_title])
+            db.session.commit()
+            self.assertEqual(self._search(job_search, 'roof'), [in_title.id, in_description.id])
+            self.assertEqual(self._search(job_search, 'roof leak'), [in_title.id])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,126 @@
+import hashlib
+import io
+import os
+import shutil
+import tempfile
+import unittest
+
+from app import db
+from app.models import User
+from app.uploads import Image, InvalidImage, UploadTooLarge, generate_variants, save_upload
+from tests.helpers import AppTestCase
+
+
+class TestSaveUpload(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_same_content_is_stored_once_under_its_hash(self):
+        first = save_upload(io.BytesIO(b'picture'), self.directory, 'PNG', max_bytes=100)
+        second = save_upload(io.BytesIO(b'picture'), self.directory, 'png', max_bytes=100)
+        self.assertEqual(first, f"{hashlib.sha256(b'picture').hexdigest()}.png")
+        self.assertEqual(first, second)
+        self.assertEqual(os.listdir(self.directory), [first])
+
+    def test_oversized_upload_is_rejected_without_leftovers(self):
+        with self.assertRaises(UploadTooLarge):
+            save_upload(io.BytesIO(b'x' * 101), self.directory, 'png', max_bytes=100)
+        self.assertEqual(os.listdir(self.directory), [])
+
+    def test_failed_validation_publishes_nothing(self):
+        def reject(path):
+            raise InvalidImage(path)
+
+        existing = save_upload(io.BytesIO(b'picture'), self.directory, 'png', max_bytes=100)
+        with self.assertRaises(InvalidImage):
+            save_upload(io.BytesIO(b'picture'), self.directory, 'png', max_bytes=100, validate=reject)
+        with self.assertRaises(InvalidImage):
+            save_upload(io.BytesIO(b'other'), self.directory, 'png', max_bytes=100, validate=reject)
+        self.assertEqual(os.listdir(self.directory), [existing])
+
+    @unittest.skipIf(Image is None, 'Pillow is not installed')
+    def test_variants_are_small_webp_copies(self):
+        buffer = io.BytesIO()
+        Image.new('RGB', (1200, 800), 'red').save(buffer, 'PNG')
+        buffer.seek(0)
+        filename = save_upload(buffer, self.directory, 'png', max_bytes=10 * 1024 * 1024)
+        variants = generate_variants(self.directory, filename)
+        with Image.open(os.path.join(self.directory, variants['thumb'])) as thumb:
+            self.assertEqual((thumb.format, max(thumb.size)), ('WEBP', 256))
+
+
+class TestUploadRoute(AppTestCase):
+    def setUp(self):
+        super().setUp()
+        self.upload_path = os.path.join(self.app.root_path, 'static', 'uploads')
+        self.app.config.update(PROFILE_PIC_MAX_BYTES=1024)
+        with self.app.app_context():
+            self.user_id = self._add_user('me@example.com')
+        self._login(self.user_id)
+
+    def _upload(self, content, filename='me.gif'):
+        return self.client.post('/upload_profile_pic', data={'file': (io.BytesIO(content), filename)},
+                                content_type='multipart/form-data')
+
+    @staticmethod
+    def _gif():
+        buffer = io.BytesIO()
+        Image.new('RGB', (32, 32), 'blue').save(buffer, 'GIF')
+        return buffer.getvalue()
+
+    @unittest.skipIf(Image is None, 'Pillow is not installed')
+    def test_upload_is_stored_by_content_hash(self):
+        content = self._gif()
+        filename = f'{hashlib.sha256(content).hexdigest()}.gif'
+        self.addCleanup(lambda: [
+            os.remove(os.path.join(self.upload_path, f)) for f in os.listdir(self.upload_path)
+            if f.startswith(filename[:-4])
+        ])
+        self.assertEqual(self._upload(content).status_code, 302)
+        with self.app.app_context():
+            self.assertEqual(db.session.get(User, self.user_id).profile_pic, f'/static/uploads/{filename}')
+
+    @unittest.skipIf(Image is None, 'Pillow is not installed')
+    def test_non_ascii_filename_keeps_its_extension(self):
+        content = self._gif()
+        filename = f'{hashlib.sha256(content).hexdigest()}.gif'
+        self.addCleanup(lambda: [
+            os.remove(os.path.join(self.upload_path, f)) for f in os.listdir(self.upload_path)
+            if f.startswith(filename[:-4])
+        ])
+        self._upload(content, 'фото.GIF')
+        with self.app.app_context():
+            self.assertEqual(db.session.get(User, self.user_id).profile_pic, f'/static/uploads/{filename}')
+
+    @unittest.skipIf(Image is None, 'Pillow is not installed')
+    def test_invalid_image_is_removed(self):
+        content = b'GIF89a' + os.urandom(64)
+        self.assertEqual(self._upload(content).status_code, 302)
+        self.assertFalse(os.path.exists(os.path.join(self.upload_path, f'{hashlib.sha256(content).hexdigest()}.gif')))
+        with self.app.app_context():
+            self.assertIsNone(db.session.get(User, self.user_id).profile_pic)
+
+    @unittest.skipIf(Image is None, 'Pillow is not installed')
+    def test_invalid_image_keeps_an_existing_file_with_the_same_hash(self):
+        content = b'GIF89a' + os.urandom(64)
+        path = os.path.join(self.upload_path, f'{hashlib.sha256(content).hexdigest()}.gif')
+        os.makedirs(self.upload_path, exist_ok=True)
+        with open(path, 'wb') as f:
+            f.write(content)
+        self.addCleanup(os.remove, path)
+        self.assertEqual(self._upload(content).status_code, 302)
+        self.assertTrue(os.path.exists(path))
+
+    def test_oversized_upload_is_refused(self):
+        content = b'GIF89a' + os.urandom(2048)
+        self._upload(content)
+        self.assertFalse(os.path.exists(os.path.join(self.upload_path, f'{hashlib.sha256(content).hexdigest()}.gif')))
+        with self.app.app_context():
+            self.assertIsNone(db.session.get(User, self.user_id).profile_pic)
+
+
+if __name__ == '__main__':
+    unittest.main()